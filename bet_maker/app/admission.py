@@ -0,0 +1,162 @@
+import asyncio
+import json
+import logging
+import math
+import time
+
+from aioredis import Redis
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.config import settings
+from app.metrics import ADMISSION_IN_FLIGHT, ADMISSION_LOAD, ADMISSION_REJECTED
+
+logger = logging.getLogger(__name__)
+
+READ_METHODS = frozenset({"GET", "HEAD"})
+
+
+class DecayingAverage:
+    """
+    Экспоненциальное скользящее среднее, которое без новых замеров затухает к нулю
+    с постоянной времени tau: после сброса нагрузки показатель сам возвращается к норме.
+    """
+
+    def __init__(self, tau: float = 1.0, weight: float = 0.2):
+        self.tau = tau
+        self.weight = weight
+        self._value = 0.0
+        self._updated_at = time.monotonic()
+
+    def get(self, now: float | None = None) -> float:
+        now = time.monotonic() if now is None else now
+        return self._value * math.exp(-max(now - self._updated_at, 0.0) / self.tau)
+
+    def add(self, sample: float, now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        value = self.get(now)
+        self._value = value + self.weight * (sample - value)
+        self._updated_at = now
+
+
+class AdmissionController:
+    """
+    Решает, принимать ли запрос, по загрузке сервиса: числу запросов в работе,
+    времени ожидания соединения из пула БД и задержке Redis.
+
+    Загрузка - наибольшее из отношений этих показателей к их лимитам. Запросы
+    на чтение отклоняются раньше ставок: при загрузке ADMISSION_READ_SHED_LEVEL,
+    остальные - при достижении лимита.
+    """
+
+    def __init__(
+            self,
+            max_in_flight: int,
+            max_pool_wait: float,
+            max_redis_latency: float,
+            read_shed_level: float,
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_pool_wait = max_pool_wait
+        self.max_redis_latency = max_redis_latency
+        self.read_shed_level = read_shed_level
+
+        self.in_flight = 0
+        self.pool_wait = DecayingAverage()
+        self.redis_latency = DecayingAverage(tau=5.0)
+        self.rejected = 0
+
+    def load(self) -> float:
+        return max(
+            self.in_flight / self.max_in_flight,
+            self.pool_wait.get() / self.max_pool_wait,
+            self.redis_latency.get() / self.max_redis_latency,
+        )
+
+    def admit(self, method: str) -> bool:
+        limit = self.read_shed_level if method in READ_METHODS else 1.0
+        if self.load() < limit:
+            return True
+        self.rejected += 1
+        return False
+
+
+admission_controller = AdmissionController(
+    max_in_flight=settings.ADMISSION_MAX_IN_FLIGHT,
+    max_pool_wait=settings.ADMISSION_MAX_POOL_WAIT_MS / 1000,
+    max_redis_latency=settings.ADMISSION_MAX_REDIS_LATENCY_MS / 1000,
+    read_shed_level=settings.ADMISSION_READ_SHED_LEVEL,
+)
+ADMISSION_IN_FLIGHT.set_function(lambda: admission_controller.in_flight)
+ADMISSION_LOAD.set_function(admission_controller.load)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Пул соединений, замеряющий время получения соединения для контроля нагрузки.
+    """
+
+    def _do_get(self):
+        started_at = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            admission_controller.pool_wait.add(time.perf_counter() - started_at)
+
+
+class AdmissionMiddleware:
+    """
+    Отклоняет запросы к API ответом 503 с Retry-After, пока сервис перегружен,
+    вместо того чтобы копить их в очереди к пулу соединений.
+    """
+
+    def __init__(self, app, controller: AdmissionController = admission_controller, prefix: str = "/bet_maker"):
+        self.app = app
+        self.controller = controller
+        self.prefix = prefix
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        if not self.controller.admit(scope["method"]):
+            ADMISSION_REJECTED.labels(scope["method"]).inc()
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"retry-after", str(settings.ADMISSION_RETRY_AFTER).encode()),
+                ],
+            })
+            await send({
+                "type": "http.response.body",
+                "body": json.dumps(
+                    {"detail": "Сервис перегружен, повторите запрос позже"}, ensure_ascii=False
+                ).encode(),
+            })
+            return
+
+        self.controller.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.in_flight -= 1
+
+
+async def redis_latency_probe(redis: Redis, interval: float = 0.5) -> None:
+    """
+    Периодически замеряет задержку Redis командой PING.
+    """
+    while True:
+        started_at = time.perf_counter()
+        try:
+            await asyncio.wait_for(redis.ping(), timeout=interval * 4)
+            admission_controller.redis_latency.add(time.perf_counter() - started_at)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Недоступный Redis считается предельно медленным
+            admission_controller.redis_latency.add(admission_controller.max_redis_latency * 2)
+            logger.error(f"Redis не ответил на PING: {e}")
+        await asyncio.sleep(interval)
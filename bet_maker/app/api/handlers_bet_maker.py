@@ -1,86 +1,329 @@
 import json
 import logging
+from collections.abc import AsyncIterator
 from datetime import datetime
 from decimal import Decimal
+from typing import Any
+from uuid import uuid4
 
 from aioredis import Redis
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
+from asyncpg import PostgresError
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import Select, insert, select, union_all
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.custom_models import BetAmount, BetOut
+from app.config import settings
+from app.db.custom_models import BetAmount, BetOut, BulkBetResult, EventExposure
 from app.db.db import get_db
-from app.db.schemas import Events, Status
-from app.redis.redis import get_redis_global
+from app.db.group_commit import bet_writer
+from app.db.raw_queries import fetch_bets_page
+from app.db.replicas import read_replicas
+from app.db.schemas import Bets, BetsArchive, Status
+from app.rabbit.codecs import odds_from_wire
+from app.redis.cache import EventsCache
+from app.redis.events import OPEN_STATUS
+from app.redis.exposure import get_exposure, release_exposure, reserve_exposure
+from app.redis.idempotency import release_idempotency_key, reserve_idempotency_key, save_idempotent_response
+from app.redis.redis import get_events_cache, get_redis_global
+from app.settlement.payouts import bet_exposure, from_minor_units
 
 logger = logging.getLogger(__name__)
 
 router_bet_maker = APIRouter()
 
+STREAM_CHUNK_SIZE = 1000
+LIABILITY_LIMIT_DETAIL = "Превышен лимит выплат по событию"
+
 @router_bet_maker.get("/events")
-async def get_events(redis: Redis = Depends(get_redis_global),):
-    events_data = await redis.get("available_events")
-    if not events_data:
-        return []
-    events_data = json.loads(events_data)
-    print("events_data", events_data)
-    available_events = [{"id": event["id"], "odds": event["odds"]} for event in events_data if event["deadline"] < int(datetime.now().timestamp()) and event["status"] == "незавершённое"]
-    return available_events
+async def get_events(events_cache: EventsCache = Depends(get_events_cache),):
+    open_events = await events_cache.get_open_events()
+    return Response(
+        content=open_events.response_body(int(datetime.now().timestamp())),
+        media_type="application/json",
+    )
 
-@router_bet_maker.post("/bet")
-async def post_bet(bet_amount: BetAmount = Depends(), session: AsyncSession = Depends(get_db), redis: Redis = Depends(get_redis_global), ):
-    try:
-        events_data = await redis.get("available_events")
-        events_data = json.loads(events_data)
-        event = next((e for e in events_data if int(e["id"]) == bet_amount.id), None)
+def check_event_open(event: dict | None, current_time: int) -> HTTPException | None:
+    """
+    Проверяет, что на событие можно поставить; возвращает ошибку для ответа или None.
+    """
+    if not event:
+        return HTTPException(status_code=404, detail="Событие не найдено")
 
-        if not event:
-            raise HTTPException(status_code=404, detail="Событие не найдено")
+    if event["status"] != OPEN_STATUS:
+        return HTTPException(status_code=400, detail="Ставки на завершенные события невозможны")
 
-        if event["status"] != "незавершённое":
-            raise HTTPException(status_code=400, detail="Ставки на завершенные события невозможны")
+    if event["deadline"] <= current_time:
+        return HTTPException(status_code=400, detail="Дедлайн события истек")
 
-        current_time = int(datetime.now().timestamp())
-        if event["deadline"] >= current_time:
-            raise HTTPException(status_code=400, detail="Дедлайн события истек")
-
-        existing_bet = await session.get(Events, bet_amount.id)
-        if existing_bet is not None:
-            raise HTTPException(
-                status_code=400,
-                detail="Ставка с таким ID уже существует"
-            )
+    return None
 
-        new_bet = Events(
-            id=bet_amount.id,
-            bet_amount=Decimal(str(bet_amount.amount)),
-            status=Status.IN_PROGRESS,
-        )
+@router_bet_maker.get("/events/{event_id}/exposure", response_model=EventExposure)
+async def get_event_exposure(
+        event_id: int,
+        redis: Redis = Depends(get_redis_global),
+        events_cache: EventsCache = Depends(get_events_cache),
+):
+    """
+    Сумма ставок и максимальная выплата по нерассчитанным ставкам события,
+    а также итоги по уже рассчитанным.
+    """
+    exposure = await get_exposure(redis, event_id)
+    if not any(exposure.values()) and await events_cache.get_event(event_id) is None:
+        raise HTTPException(status_code=404, detail="Событие не найдено")
 
-        session.add(new_bet)
-        await session.commit()
-        await session.refresh(new_bet)
-        return new_bet
+    return EventExposure(
+        event_id=event_id,
+        bets=exposure["bets"],
+        stake=from_minor_units(exposure["stake"]),
+        liability=from_minor_units(exposure["liability"]),
+        settled_bets=exposure["settled_bets"],
+        settled_stake=from_minor_units(exposure["settled_stake"]),
+        payout=from_minor_units(exposure["payout"]),
+        max_liability=settings.MAX_EVENT_LIABILITY,
+    )
 
+async def reserve_bet(
+        bet_amount: BetAmount,
+        events_cache: EventsCache,
+        redis: Redis,
+) -> tuple[dict[str, Any], tuple[int, int, int]]:
+    """
+    Проверяет событие и учитывает ставку в лимите выплат; возвращает строку для
+    вставки и учтённую выплату.
+    """
+    try:
+        event = await events_cache.get_event(bet_amount.id)
+
+        event_error = check_event_open(event, int(datetime.now().timestamp()))
+        if event_error is not None:
+            raise event_error
+
+        amount = Decimal(str(bet_amount.amount))
+        odds = odds_from_wire(event["odds"])
+        exposure = (bet_amount.id, *bet_exposure(amount, odds))
+        # Лимит проверяется в Redis до обращения к базе
+        if not (await reserve_exposure(redis, [exposure], settings.max_event_liability))[0]:
+            raise HTTPException(status_code=400, detail=LIABILITY_LIMIT_DETAIL)
+
+    except HTTPException:
+        raise
     except ValueError as e:
         print(f"Error: {e}")
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        await session.rollback()
         print(f"Error: {e}")
         raise HTTPException(status_code=500, detail=f"Ошибка при создании ставки: {str(e)}")
 
-@router_bet_maker.get("/bets", response_model=list[BetOut])
-async def get_bets(session: AsyncSession = Depends(get_db)):
+    return {"event_id": bet_amount.id, "amount": amount, "odds": odds, "status": Status.IN_PROGRESS}, exposure
+
+async def insert_bet(values: dict[str, Any], exposure: tuple[int, int, int], redis: Redis) -> dict:
+    """
+    Вставляет ставку, учтённую reserve_bet. Если ошибка вызвана не отказом базы
+    (PostgresError в __cause__), ставка могла быть записана.
+    """
+    try:
+        # Ставка вставляется вместе с одновременными ставками других запросов,
+        # ответ отдаётся после фиксации общей транзакции
+        return await bet_writer.insert(values)
+    except Exception as e:
+        logger.exception(f"Ошибка при создании ставки на событие {values['event_id']}")
+        # Учёт откатывается, только если база точно отклонила ставку. Иначе выплата
+        # остаётся учтённой, чтобы записанная ставка не вышла за лимит; лишний учёт
+        # исправляется пересчётом по базе при расчёте события
+        if isinstance(e, PostgresError):
+            await release_exposure(redis, [exposure])
+        raise HTTPException(status_code=500, detail=f"Ошибка при создании ставки: {str(e)}") from e
+
+async def place_bet(bet_amount: BetAmount, events_cache: EventsCache, redis: Redis) -> dict:
+    values, exposure = await reserve_bet(bet_amount, events_cache, redis)
+    return await insert_bet(values, exposure, redis)
+
+@router_bet_maker.post("/bet")
+async def post_bet(
+        bet_amount: BetAmount = Depends(),
+        events_cache: EventsCache = Depends(get_events_cache),
+        redis: Redis = Depends(get_redis_global),
+        idempotency_key: str | None = Header(default=None, alias="Idempotency-Key", max_length=255),
+):
+    """
+    С заголовком Idempotency-Key повтор запроса возвращает ответ первого запроса,
+    не обращаясь к базе; одновременные повторы ждут, пока первый запрос завершится.
+    """
+    if idempotency_key is None:
+        return await place_bet(bet_amount, events_cache, redis)
+
+    fingerprint = f"{bet_amount.id}:{bet_amount.amount.normalize()}"
+    token = uuid4().hex
+    stored = await reserve_idempotency_key(
+        redis, idempotency_key, fingerprint, token, settings.IDEMPOTENCY_PENDING_TTL, settings.IDEMPOTENCY_WAIT
+    )
+    if stored is not None:
+        if stored["fingerprint"] != fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key уже использован для другой ставки")
+        if "status_code" not in stored:
+            raise HTTPException(status_code=409, detail="Запрос с этим Idempotency-Key ещё обрабатывается")
+        return JSONResponse(content=stored["body"], status_code=stored["status_code"])
+
+    try:
+        values, exposure = await reserve_bet(bet_amount, events_cache, redis)
+    except HTTPException as e:
+        # Отказ по параметрам ставки повторяется при повторе, ошибку сервера можно повторить заново
+        if e.status_code < 500:
+            await save_idempotent_response(
+                redis, idempotency_key, fingerprint, token, e.status_code, {"detail": e.detail},
+                settings.IDEMPOTENCY_TTL,
+            )
+        else:
+            await release_idempotency_key(redis, idempotency_key, fingerprint, token)
+        raise
+    except BaseException:
+        await release_idempotency_key(redis, idempotency_key, fingerprint, token)
+        raise
+
     try:
-        stmt = select(Events.id, Events.status)
-        result = await session.execute(stmt)
-        bets = result.all()
+        bet = await insert_bet(values, exposure, redis)
+    except HTTPException as e:
+        # Ключ освобождается, только если база отклонила вставку. После обрыва соединения
+        # или отмены запроса ставка могла записаться: ключ остаётся занятым до истечения
+        # IDEMPOTENCY_PENDING_TTL, и повтор до этого получает 409
+        if isinstance(e.__cause__, PostgresError):
+            await release_idempotency_key(redis, idempotency_key, fingerprint, token)
+        raise
 
-        return [BetOut(id=bet.id, status=bet.status) for bet in bets]
+    if not await save_idempotent_response(
+            redis, idempotency_key, fingerprint, token, 200, bet, settings.IDEMPOTENCY_TTL
+    ):
+        logger.warning(f"Idempotency-Key {idempotency_key} занят повтором, ответ не сохранён")
+    return bet
 
+@router_bet_maker.post("/bets/bulk", response_model=list[BulkBetResult])
+async def post_bets_bulk(
+        bets: list[dict[str, Any]] = Body(...),
+        session: AsyncSession = Depends(get_db),
+        events_cache: EventsCache = Depends(get_events_cache),
+        redis: Redis = Depends(get_redis_global),
+):
+    """
+    Принимает список ставок и возвращает результат по каждой в том же порядке.
+    Ошибка в одной ставке не мешает принять остальные.
+    """
+    results: list[BulkBetResult] = []
+    accepted: list[tuple[BetAmount, BulkBetResult]] = []
+    for bet in bets:
+        event_id = bet.get("id") if isinstance(bet.get("id"), int) else None
+        try:
+            bet_amount = BetAmount.model_validate(bet)
+        except ValidationError as e:
+            detail = "; ".join(error["msg"] for error in e.errors())
+            results.append(BulkBetResult(event_id=event_id, accepted=False, detail=detail))
+            continue
+
+        result = BulkBetResult(event_id=bet_amount.id, accepted=True)
+        accepted.append((bet_amount, result))
+        results.append(result)
+
+    if accepted:
+        current_time = int(datetime.now().timestamp())
+        events = await events_cache.get_events([bet.id for bet, _ in accepted])
+
+        candidates = []
+        for bet, result in accepted:
+            event = events[bet.id]
+            event_error = check_event_open(event, current_time)
+            if event_error is not None:
+                result.accepted = False
+                result.detail = event_error.detail
+                continue
+            amount = Decimal(str(bet.amount))
+            odds = odds_from_wire(event["odds"])
+            candidates.append((result, (bet.id, *bet_exposure(amount, odds)), {
+                "event_id": bet.id,
+                "amount": amount,
+                "odds": odds,
+                "status": Status.IN_PROGRESS,
+            }))
+
+        new_bets = []
+        reserved = []
+        if candidates:
+            within_limit = await reserve_exposure(
+                redis, [exposure for _, exposure, _ in candidates], settings.max_event_liability
+            )
+            for (result, exposure, new_bet), is_within_limit in zip(candidates, within_limit):
+                if not is_within_limit:
+                    result.accepted = False
+                    result.detail = LIABILITY_LIMIT_DETAIL
+                    continue
+                reserved.append(exposure)
+                new_bets.append(new_bet)
+
+        if new_bets:
+            try:
+                inserted = await session.scalars(
+                    insert(Bets).returning(Bets.id, sort_by_parameter_order=True),
+                    new_bets,
+                )
+                bet_ids = iter(inserted.all())
+                for result in results:
+                    if result.accepted:
+                        result.bet_id = next(bet_ids)
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                await release_exposure(redis, reserved)
+                raise
+
+    return results
+
+
+def bets_page_query(after_id: int | None) -> Select:
+    """
+    История ставок по возрастанию id из рабочей таблицы и архива.
+    """
+    tables = [select(model.id, model.event_id, model.status) for model in (Bets, BetsArchive)]
+    if after_id is not None:
+        tables = [query.where(query.selected_columns.id > after_id) for query in tables]
+    bets = union_all(*tables).subquery("bets")
+    return select(bets).order_by(bets.c.id)
+
+
+async def stream_bets(after_id: int | None) -> AsyncIterator[str]:
+    """
+    Отдаёт историю ставок в формате NDJSON, читая её с реплики серверным курсором порциями.
+    """
+    async with read_replicas.sessionmaker()() as session:
+        result = await session.stream(
+            bets_page_query(after_id).execution_options(yield_per=STREAM_CHUNK_SIZE)
+        )
+        async for bets in result.partitions():
+            yield "".join(
+                json.dumps(
+                    {"id": bet.id, "event_id": bet.event_id, "status": bet.status.value}, ensure_ascii=False
+                ) + "\n"
+                for bet in bets
+            )
+
+
+@router_bet_maker.get("/bets", response_model=list[BetOut])
+async def get_bets(
+        after_id: int | None = None,
+        limit: int = Query(default=1000, ge=1, le=10000),
+        stream: bool = False,
+):
+    if stream:
+        return StreamingResponse(stream_bets(after_id), media_type="application/x-ndjson")
+
+    try:
+        body, next_cursor = await fetch_bets_page(after_id, limit)
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Ошибка при получении истории ставок: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+    response = Response(content=body, media_type="application/json")
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return response
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import settings
+from app.db.db import engine
+from app.metrics import BETS_ARCHIVED
+
+logger = logging.getLogger(__name__)
+
+SETTLED_MONTHS = text("""
+    SELECT DISTINCT date_trunc('month', settled_at, 'UTC') FROM bets WHERE settled_at < :cutoff
+""")
+
+# Ставки, которые в этот момент рассчитывает или переносит другой процесс, пропускаются
+MOVE_SETTLED_BETS = text("""
+    WITH moved AS (
+        DELETE FROM bets WHERE id IN (
+            SELECT id FROM bets
+            WHERE settled_at < :cutoff
+            ORDER BY settled_at
+            LIMIT :batch_size
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id, event_id, amount, odds, status, payout, settled_at
+    )
+    INSERT INTO bets_archive (id, event_id, amount, odds, status, payout, settled_at)
+    SELECT id, event_id, amount, odds, status, payout, settled_at FROM moved
+""")
+
+
+def month_partition(month: datetime) -> tuple[str, datetime, datetime]:
+    """
+    Имя и границы секции bets_archive для месяца, начинающегося в month (UTC).
+    """
+    start = month.astimezone(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    end = (start + timedelta(days=32)).replace(day=1)
+    return f"bets_archive_{start:%Y_%m}", start, end
+
+
+class BetsArchiver:
+    """
+    Переносит ставки, рассчитанные больше delay секунд назад, из bets в bets_archive.
+    """
+
+    def __init__(self, engine: AsyncEngine, interval: float, delay: float, batch_size: int):
+        self.engine = engine
+        self.interval = interval
+        self.delay = delay
+        self.batch_size = batch_size
+        self._partitions: set[str] = set()
+
+    async def ensure_partition(self, month: datetime) -> None:
+        name, start, end = month_partition(month)
+        if name in self._partitions:
+            return
+
+        async with self.engine.begin() as connection:
+            # CREATE TABLE IF NOT EXISTS не защищает от одновременного создания
+            await connection.execute(text("SELECT pg_advisory_xact_lock(hashtext('bets_archive_partitions'))"))
+            await connection.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF bets_archive "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            ))
+        self._partitions.add(name)
+
+    async def archive(self) -> int:
+        """
+        Переносит все ставки, рассчитанные раньше delay секунд назад; возвращает их число.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.delay)
+        async with self.engine.connect() as connection:
+            months = (await connection.scalars(SETTLED_MONTHS, {"cutoff": cutoff})).all()
+        for month in months:
+            await self.ensure_partition(month)
+
+        archived = 0
+        while True:
+            async with self.engine.begin() as connection:
+                result = await connection.execute(MOVE_SETTLED_BETS, {"cutoff": cutoff, "batch_size": self.batch_size})
+            archived += result.rowcount
+            BETS_ARCHIVED.inc(result.rowcount)
+            if result.rowcount < self.batch_size:
+                return archived
+
+    async def run(self) -> None:
+        while True:
+            try:
+                archived = await self.archive()
+                if archived:
+                    logger.info(f"Перенесено в архив {archived} рассчитанных ставок")
+            except Exception as e:
+                logger.error(f"Ошибка переноса ставок в архив: {e}")
+            await asyncio.sleep(self.interval)
+
+
+bets_archiver = BetsArchiver(
+    engine,
+    interval=settings.BET_ARCHIVE_INTERVAL,
+    delay=settings.BET_ARCHIVE_DELAY,
+    batch_size=settings.BET_ARCHIVE_BATCH_SIZE,
+)
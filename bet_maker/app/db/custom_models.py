@@ -4,6 +4,9 @@ from pydantic import BaseModel, validator
 
 from app.db.models import Status
 
+# Столбец amount — Numeric(12, 2): не больше 10 знаков до запятой
+MAX_BET_AMOUNT = Decimal("9999999999.99")
+
 
 class BetAmount(BaseModel):
     id: int
@@ -15,9 +18,30 @@ class BetAmount(BaseModel):
             raise ValueError("Сумма ставки должна быть положительной")
         if abs(amount.as_tuple().exponent) > 2:
             raise ValueError("Сумма должна иметь не более 2 знаков после запятой")
+        if amount > MAX_BET_AMOUNT:
+            raise ValueError(f"Сумма ставки не должна превышать {MAX_BET_AMOUNT}")
         return amount
 
 
 class BetOut(BaseModel):
     id: int
-    status: Status
\ No newline at end of file
+    event_id: int
+    status: Status
+
+
+class BulkBetResult(BaseModel):
+    event_id: int | None
+    bet_id: int | None = None
+    accepted: bool
+    detail: str | None = None
+
+
+class EventExposure(BaseModel):
+    event_id: int
+    bets: int
+    stake: Decimal
+    liability: Decimal
+    settled_bets: int
+    settled_stake: Decimal
+    payout: Decimal
+    max_liability: Decimal | None
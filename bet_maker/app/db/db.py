@@ -3,9 +3,12 @@ from collections.abc import AsyncGenerator
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
+from app.admission import TimedQueuePool
 from app.config import settings
+from app.metrics import instrument_engine
 
-engine = create_async_engine(settings.get_db_url, echo=False)
+engine = create_async_engine(settings.get_db_url, echo=False, poolclass=TimedQueuePool)
+instrument_engine(engine.sync_engine)
 
 AsyncSessionLocal = async_sessionmaker(
     bind=engine,
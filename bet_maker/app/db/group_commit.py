@@ -0,0 +1,113 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from asyncpg import PostgresError
+
+from app.config import settings
+from app.db.raw_queries import insert_bets
+from app.metrics import GROUP_COMMIT_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class GroupCommitWriter:
+    """
+    Групповая фиксация: вставки одновременных запросов уходят в insert_rows одной пачкой.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            insert_rows: Callable[[list[dict[str, Any]]], Awaitable[list[Any]]],
+            max_batch: int = 500,
+            max_wait: float = 0.001,
+            row_errors: tuple[type[Exception], ...] = (Exception,),
+    ):
+        self.name = name
+        self.insert_rows = insert_rows
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.row_errors = row_errors
+        self._pending: list[tuple[dict[str, Any], asyncio.Future]] = []
+        self._batch_full: asyncio.Future | None = None
+        self._worker: asyncio.Task | None = None
+
+    async def insert(self, values: dict[str, Any]) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((values, future))
+        if len(self._pending) >= self.max_batch and self._batch_full is not None and not self._batch_full.done():
+            self._batch_full.set_result(None)
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+        return await future
+
+    async def close(self) -> None:
+        """
+        Дожидается фиксации всех принятых строк.
+        """
+        if self._worker is not None:
+            await asyncio.shield(self._worker)
+
+    async def _run(self) -> None:
+        try:
+            while self._pending:
+                if len(self._pending) < self.max_batch:
+                    self._batch_full = asyncio.get_running_loop().create_future()
+                    try:
+                        await asyncio.wait_for(self._batch_full, self.max_wait)
+                    except asyncio.TimeoutError:
+                        pass
+                    self._batch_full = None
+                batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+                await self._flush(batch)
+        finally:
+            self._worker = None
+
+    async def _flush(self, batch: list[tuple[dict[str, Any], asyncio.Future]]) -> None:
+        # Запросы, отменённые до начала вставки, в базу не попадают
+        batch = [(values, future) for values, future in batch if not future.done()]
+        if not batch:
+            return
+
+        GROUP_COMMIT_BATCH_SIZE.observe(len(batch))
+        try:
+            rows = await self.insert_rows([values for values, _ in batch])
+        except Exception as e:
+            logger.error(f"Не удалось зафиксировать пачку из {len(batch)} строк {self.name}: {e}")
+            if len(batch) > 1 and isinstance(e, self.row_errors):
+                # Пачка отклонена целиком и не записана: строки вставляются по одной,
+                # чтобы ошибку получила только строка, которая её вызвала
+                for item in batch:
+                    await self._flush_one(*item)
+                return
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), row in zip(batch, rows):
+            if not future.done():
+                future.set_result(row)
+
+    async def _flush_one(self, values: dict[str, Any], future: asyncio.Future) -> None:
+        if future.done():
+            return
+        try:
+            row, = await self.insert_rows([values])
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(row)
+
+
+bet_writer = GroupCommitWriter(
+    "bets",
+    insert_bets,
+    max_batch=settings.BET_GROUP_COMMIT_MAX_BATCH,
+    max_wait=settings.BET_GROUP_COMMIT_WAIT_MS / 1000,
+    row_errors=(PostgresError,),
+)
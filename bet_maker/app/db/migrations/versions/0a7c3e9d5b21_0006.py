@@ -0,0 +1,27 @@
+"""0006
+
+Revision ID: 0a7c3e9d5b21
+Revises: b5e2d8a1c3f6
+Create Date: 2026-10-18 16:04:51.773210
+
+"""
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0a7c3e9d5b21"
+down_revision: str | None = "b5e2d8a1c3f6"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Пересчёт счётчиков выплат ищет ставки события и в архиве
+    op.create_index("ix_bets_archive_event_id", "bets_archive", ["event_id"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_bets_archive_event_id", table_name="bets_archive")
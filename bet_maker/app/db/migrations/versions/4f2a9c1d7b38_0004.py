@@ -0,0 +1,55 @@
+"""0004
+
+Revision ID: 4f2a9c1d7b38
+Revises: d93e6f07b1c5
+Create Date: 2026-10-18 11:32:40.215087
+
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "4f2a9c1d7b38"
+down_revision: str | None = "d93e6f07b1c5"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+status_enum = postgresql.ENUM("IN_PROGRESS", "WIN", "FAIL", name="status", create_type=False)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("bets", sa.Column("settled_at", sa.DateTime(timezone=True), nullable=True))
+    # Время расчёта ранее рассчитанных ставок не сохранялось: они попадут в архив
+    # за месяц применения миграции
+    op.execute("UPDATE bets SET settled_at = now() WHERE status != 'IN_PROGRESS'")
+    op.create_index(
+        "ix_bets_settled_at", "bets", ["settled_at"], unique=False,
+        postgresql_where=sa.text("settled_at IS NOT NULL"),
+    )
+
+    op.create_table("bets_archive",
+    sa.Column("id", sa.BigInteger(), autoincrement=False, nullable=False),
+    sa.Column("event_id", sa.Integer(), nullable=False),
+    sa.Column("amount", sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column("odds", sa.Numeric(precision=10, scale=4), nullable=False),
+    sa.Column("status", status_enum, nullable=False),
+    sa.Column("payout", sa.Numeric(precision=14, scale=2), nullable=True),
+    sa.Column("settled_at", sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint("id", "settled_at"),
+    postgresql_partition_by="RANGE (settled_at)",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(
+        "INSERT INTO bets (id, event_id, amount, odds, status, payout, settled_at) "
+        "SELECT id, event_id, amount, odds, status, payout, settled_at FROM bets_archive"
+    )
+    op.drop_table("bets_archive")
+    op.drop_index("ix_bets_settled_at", table_name="bets")
+    op.drop_column("bets", "settled_at")
@@ -0,0 +1,57 @@
+"""0002
+
+Revision ID: 8c41d0b5a2e7
+Revises: e7133d2eb0f3
+Create Date: 2026-10-18 10:21:07.540193
+
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "8c41d0b5a2e7"
+down_revision: str | None = "e7133d2eb0f3"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+status_enum = postgresql.ENUM("IN_PROGRESS", "WIN", "FAIL", name="status", create_type=False)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table("bets",
+    sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column("event_id", sa.Integer(), nullable=False),
+    sa.Column("amount", sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column("odds", sa.Numeric(), nullable=False),
+    sa.Column("status", status_enum, nullable=False),
+    sa.PrimaryKeyConstraint("id")
+    )
+    op.create_index("ix_bets_event_id_status", "bets", ["event_id", "status"], unique=False)
+
+    # До этой ревизии id ставки совпадал с id события, а коэффициент не сохранялся:
+    # старые ставки переносятся с коэффициентом 1, то есть с возвратом суммы при выигрыше.
+    op.execute(
+        "INSERT INTO bets (event_id, amount, odds, status) "
+        "SELECT id, bet_amount, 1, status FROM events ORDER BY id"
+    )
+    op.drop_table("events")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_table("events",
+    sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column("bet_amount", sa.Numeric(), nullable=False),
+    sa.Column("status", status_enum, nullable=False),
+    sa.PrimaryKeyConstraint("id")
+    )
+    op.execute(
+        "INSERT INTO events (id, bet_amount, status) "
+        "SELECT DISTINCT ON (event_id) event_id, amount, status FROM bets ORDER BY event_id, id"
+    )
+    op.drop_index("ix_bets_event_id_status", table_name="bets")
+    op.drop_table("bets")
@@ -0,0 +1,36 @@
+"""0005
+
+Revision ID: b5e2d8a1c3f6
+Revises: 4f2a9c1d7b38
+Create Date: 2026-10-18 15:12:08.402931
+
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b5e2d8a1c3f6"
+down_revision: str | None = "4f2a9c1d7b38"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Ставка до 10^10 на коэффициент до 10^6 даёт выплату до 16 знаков до запятой
+    for table_name in ("bets", "bets_archive"):
+        op.alter_column(table_name, "payout",
+                   existing_type=sa.Numeric(precision=14, scale=2),
+                   type_=sa.Numeric(precision=24, scale=2),
+                   existing_nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table_name in ("bets", "bets_archive"):
+        op.alter_column(table_name, "payout",
+                   existing_type=sa.Numeric(precision=24, scale=2),
+                   type_=sa.Numeric(precision=14, scale=2),
+                   existing_nullable=True)
@@ -0,0 +1,35 @@
+"""0003
+
+Revision ID: d93e6f07b1c5
+Revises: 8c41d0b5a2e7
+Create Date: 2026-10-18 10:34:52.118736
+
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d93e6f07b1c5"
+down_revision: str | None = "8c41d0b5a2e7"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column("bets", "odds",
+               existing_type=sa.Numeric(),
+               type_=sa.Numeric(precision=10, scale=4),
+               existing_nullable=False)
+    op.add_column("bets", sa.Column("payout", sa.Numeric(precision=14, scale=2), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("bets", "payout")
+    op.alter_column("bets", "odds",
+               existing_type=sa.Numeric(precision=10, scale=4),
+               type_=sa.Numeric(),
+               existing_nullable=False)
@@ -9,7 +9,10 @@ class Status(enum.Enum):
     WIN = "выиграла"
     FAIL = "проиграла"
 
-class EventsModel(BaseModel):
+class BetsModel(BaseModel):
     id: int
-    bet_amount: Decimal
+    event_id: int
+    amount: Decimal
+    odds: Decimal
     status: Status
+    payout: Decimal | None = None
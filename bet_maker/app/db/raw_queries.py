@@ -0,0 +1,114 @@
+"""
+Запросы горячих путей API напрямую через asyncpg, в обход ORM.
+
+Соединения берутся из пула engine, поэтому ожидание пула по-прежнему
+учитывается контролем нагрузки. asyncpg кэширует подготовленные выражения на
+соединении, так что каждый запрос разбирается сервером один раз. Остальной код
+работает через ORM.
+"""
+import json
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
+from asyncpg import Connection, Record
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.db.db import engine
+from app.db.replicas import read_replicas
+from app.db.schemas import Status
+from app.metrics import DB_QUERY_DURATION
+
+INSERT_BETS = """
+    INSERT INTO bets (event_id, amount, odds, status)
+    SELECT event_id, amount, odds, status
+    FROM unnest($1::integer[], $2::numeric[], $3::numeric[], $4::status[])
+        WITH ORDINALITY AS rows (event_id, amount, odds, status, position)
+    ORDER BY position
+    RETURNING id, event_id, amount, odds, status, payout
+"""
+
+# Каждая ставка в момент чтения лежит ровно в одной из таблиц: архиватор
+# переносит её одним запросом
+SELECT_BETS_PAGE = """
+    (SELECT id, event_id, status FROM bets WHERE id > $1 ORDER BY id LIMIT $2)
+    UNION ALL
+    (SELECT id, event_id, status FROM bets_archive WHERE id > $1 ORDER BY id LIMIT $2)
+    ORDER BY id
+    LIMIT $2
+"""
+
+STATUS_VALUES = {status.name: status.value for status in Status}
+
+
+@asynccontextmanager
+async def raw_connection(source: AsyncEngine | None = None) -> AsyncIterator[Connection]:
+    """
+    Соединение asyncpg из пула source (по умолчанию первичного engine) на время блока.
+    """
+    async with (source or engine).connect() as connection:
+        raw = await connection.get_raw_connection()
+        yield raw.driver_connection
+
+
+async def insert_bets(bets: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """
+    Вставляет ставки одним запросом и возвращает их в порядке аргумента в том
+    же виде, что jsonable_encoder для строки Bets.
+    """
+    started_at = time.perf_counter()
+    outcome = "error"
+    try:
+        async with raw_connection() as connection:
+            rows = await connection.fetch(
+                INSERT_BETS,
+                [bet["event_id"] for bet in bets],
+                [bet["amount"] for bet in bets],
+                [bet["odds"] for bet in bets],
+                [bet["status"].name for bet in bets],
+            )
+        outcome = "ok"
+    finally:
+        DB_QUERY_DURATION.observe(("INSERT", outcome), time.perf_counter() - started_at)
+    # Ответы раздаются ставкам по позиции: лишняя или пропавшая строка сдвинула бы их
+    if len(rows) != len(bets):
+        raise RuntimeError(f"Вставлено {len(rows)} ставок из {len(bets)}")
+
+    # Идентификаторы выдаются в порядке ORDER BY, а RETURNING свой порядок не гарантирует
+    rows.sort(key=lambda row: row["id"])
+    return [bet_to_json(row) for row in rows]
+
+
+def bet_to_json(row: Record) -> dict[str, Any]:
+    return {
+        "id": row["id"],
+        "event_id": row["event_id"],
+        "amount": float(row["amount"]),
+        "odds": float(row["odds"]),
+        "status": STATUS_VALUES[row["status"]],
+        "payout": None if row["payout"] is None else float(row["payout"]),
+    }
+
+
+async def fetch_bets_page(after_id: int | None, limit: int) -> tuple[bytes, int | None]:
+    """
+    Страница истории ставок с реплики, сразу сериализованная в JSON, и курсор
+    следующей страницы, если страница заполнена целиком.
+    """
+    started_at = time.perf_counter()
+    outcome = "error"
+    try:
+        async with raw_connection(read_replicas.replica_engine()) as connection:
+            rows = await connection.fetch(SELECT_BETS_PAGE, -1 if after_id is None else after_id, limit)
+        outcome = "ok"
+    finally:
+        DB_QUERY_DURATION.observe(("SELECT", outcome), time.perf_counter() - started_at)
+
+    body = json.dumps(
+        [{"id": row["id"], "event_id": row["event_id"], "status": STATUS_VALUES[row["status"]]} for row in rows],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode()
+    next_cursor = rows[-1]["id"] if len(rows) == limit else None
+    return body, next_cursor
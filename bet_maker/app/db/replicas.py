@@ -0,0 +1,133 @@
+import asyncio
+import itertools
+import logging
+from collections.abc import Sequence
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from app.admission import TimedQueuePool
+from app.config import settings
+from app.db.db import AsyncSessionLocal
+from app.metrics import REPLICA_LAG, instrument_engine
+
+logger = logging.getLogger(__name__)
+
+# На первичном сервере и на полностью догнавшей реплике отставание нулевое;
+# иначе это время с последней применённой транзакции первичного. Реплика, которая
+# не получает журнал, применила всё полученное, но отстаёт неограниченно: для неё
+# возвращается NULL. Без прав pg_read_all_stats статус WAL receiver не виден,
+# тогда достаточно того, что процесс запущен
+REPLICATION_LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN NOT EXISTS (
+            SELECT 1 FROM pg_stat_wal_receiver WHERE COALESCE(status, 'streaming') = 'streaming'
+        ) THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class Replica:
+    def __init__(self, url: str):
+        self.engine: AsyncEngine = create_async_engine(url, echo=False, poolclass=TimedQueuePool)
+        instrument_engine(self.engine.sync_engine)
+        self.sessionmaker = async_sessionmaker(
+            bind=self.engine,
+            autocommit=False,
+            autoflush=False,
+            expire_on_commit=False,
+        )
+        self.host = self.engine.url.host
+        self.lag: float | None = None
+        self.healthy = False
+
+
+class ReplicaRouter:
+    """
+    Распределяет читающие запросы по репликам по кругу.
+
+    Отставание реплик проверяется в monitor раз в check_interval секунд:
+    реплика, отставшая больше чем на max_lag секунд или недоступная,
+    исключается до следующей успешной проверки. Пока подходящих реплик нет
+    (в том числе до первой проверки и без настроенных реплик), чтение идёт в
+    первичный сервер.
+    """
+
+    def __init__(
+            self,
+            urls: Sequence[str],
+            max_lag: float,
+            check_interval: float,
+            primary: async_sessionmaker[AsyncSession] = AsyncSessionLocal,
+    ):
+        self.replicas = [Replica(url) for url in urls]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.primary = primary
+        self._order = itertools.cycle(self.replicas)
+
+    def next_replica(self) -> Replica | None:
+        for _ in range(len(self.replicas)):
+            replica = next(self._order)
+            if replica.healthy:
+                return replica
+        return None
+
+    def sessionmaker(self) -> async_sessionmaker[AsyncSession]:
+        replica = self.next_replica()
+        return self.primary if replica is None else replica.sessionmaker
+
+    def replica_engine(self) -> AsyncEngine | None:
+        """
+        Движок следующей подходящей реплики для запросов в обход ORM или None.
+        """
+        replica = self.next_replica()
+        return None if replica is None else replica.engine
+
+    async def check(self, replica: Replica) -> None:
+        try:
+            async with replica.engine.connect() as connection:
+                lag = await asyncio.wait_for(connection.scalar(REPLICATION_LAG_QUERY), self.check_interval)
+        except (SQLAlchemyError, OSError, asyncio.TimeoutError) as e:
+            self._unavailable(replica, e)
+            return
+        if lag is None:
+            self._unavailable(replica, "WAL receiver не получает журнал")
+            return
+
+        replica.lag = float(lag)
+        REPLICA_LAG.labels(replica.host).set(replica.lag)
+        healthy = replica.lag <= self.max_lag
+        if healthy != replica.healthy:
+            logger.warning(
+                f"Отставание реплики {replica.host} {replica.lag:.3f} с, "
+                f"{'реплика снова используется' if healthy else 'чтение идёт с первичного сервера'}"
+            )
+        replica.healthy = healthy
+
+    def _unavailable(self, replica: Replica, reason: object) -> None:
+        replica.lag = None
+        if replica.healthy:
+            logger.warning(f"Реплика {replica.host} недоступна, чтение идёт с первичного сервера: {reason}")
+        replica.healthy = False
+
+    async def monitor(self) -> None:
+        while True:
+            await asyncio.gather(*(self.check(replica) for replica in self.replicas))
+            await asyncio.sleep(self.check_interval)
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+
+read_replicas = ReplicaRouter(
+    settings.DB_REPLICA_URLS,
+    max_lag=settings.DB_REPLICA_MAX_LAG,
+    check_interval=settings.DB_REPLICA_CHECK_INTERVAL,
+)
+
@@ -1,6 +1,7 @@
+from datetime import datetime
 from decimal import Decimal
 
-from sqlalchemy import Numeric
+from sqlalchemy import BigInteger, DateTime, Index, Numeric, text
 from sqlalchemy.ext.asyncio import AsyncAttrs, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, Mapped, declared_attr, mapped_column
 from stringcase import snakecase
@@ -20,7 +21,34 @@ class Base(AsyncAttrs, DeclarativeBase):
     def __tablename__(cls) -> str:
         return snakecase(cls.__name__)
 
-class Events(Base):
-    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True, nullable=False)
-    bet_amount: Mapped[Decimal] = mapped_column(Numeric, nullable=False)
+class Bets(Base):
+    __table_args__ = (
+        Index("ix_bets_event_id_status", "event_id", "status"),
+        Index("ix_bets_settled_at", "settled_at", postgresql_where=text("settled_at IS NOT NULL")),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True, nullable=False)
+    event_id: Mapped[int] = mapped_column(nullable=False)
+    amount: Mapped[Decimal] = mapped_column(Numeric(12, 2), nullable=False)
+    odds: Mapped[Decimal] = mapped_column(Numeric(10, 4), nullable=False)
+    status: Mapped[Status] = mapped_column(nullable=False)
+    payout: Mapped[Decimal | None] = mapped_column(Numeric(24, 2), nullable=True)
+    settled_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+class BetsArchive(Base):
+    """
+    Рассчитанные ставки, перенесённые из bets архиватором. Таблица разбита на
+    помесячные секции по settled_at, секции создаются при переносе.
+    """
+    __table_args__ = (
+        Index("ix_bets_archive_event_id", "event_id"),
+        {"postgresql_partition_by": "RANGE (settled_at)"},
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False, nullable=False)
+    event_id: Mapped[int] = mapped_column(nullable=False)
+    amount: Mapped[Decimal] = mapped_column(Numeric(12, 2), nullable=False)
+    odds: Mapped[Decimal] = mapped_column(Numeric(10, 4), nullable=False)
     status: Mapped[Status] = mapped_column(nullable=False)
+    payout: Mapped[Decimal | None] = mapped_column(Numeric(24, 2), nullable=True)
+    settled_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True, nullable=False)
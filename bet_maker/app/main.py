@@ -2,36 +2,70 @@ import asyncio
 import logging
 from contextlib import asynccontextmanager
 
-import aioredis
 from fastapi import FastAPI
 
+from app.admission import AdmissionMiddleware, redis_latency_probe
 from app.api.routers_bind import router_base
 from app.config import settings, setup_logging
+from app.db.archive import bets_archiver
 from app.db.db import engine
+from app.db.group_commit import bet_writer
+from app.db.replicas import read_replicas
+from app.metrics import MetricsMiddleware, metrics_endpoint
+from app.profiling import ProfilerMiddleware, profile_endpoint, profiler
 from app.rabbit.queues import events_consumer, status_update_consumer
+from app.redis.cache import EventsCache, events_cache_listener
+from app.redis.redis import create_redis
 
 setup_logging(settings.LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    redis = await aioredis.from_url(settings.get_redis_url)
+    redis = await create_redis()
     app.state.redis = redis
+    app.state.events_cache = EventsCache(
+        redis,
+        max_size=settings.EVENTS_CACHE_SIZE,
+        max_age=settings.EVENTS_CACHE_MAX_AGE,
+    )
 
     consumer_task = asyncio.create_task(events_consumer())
     status_consumer = asyncio.create_task(status_update_consumer())
+    cache_listener = asyncio.create_task(events_cache_listener(redis, app.state.events_cache))
+    latency_probe = asyncio.create_task(redis_latency_probe(redis))
+    replicas_monitor = asyncio.create_task(read_replicas.monitor())
+    archiver_task = asyncio.create_task(bets_archiver.run())
+    if settings.PROFILER_ENABLED and settings.PROFILER_BACKGROUND_TASKS:
+        profiler.track("task events_consumer", consumer_task)
+        profiler.track("task status_update_consumer", status_consumer)
 
     yield
     consumer_task.cancel()
     status_consumer.cancel()
+    cache_listener.cancel()
+    latency_probe.cancel()
+    replicas_monitor.cancel()
+    archiver_task.cancel()
+    await bet_writer.close()
     await redis.close()
+    await read_replicas.dispose()
     await engine.dispose()
     try:
-        await asyncio.gather(consumer_task, status_consumer)
+        await asyncio.gather(
+            consumer_task, status_consumer, cache_listener, latency_probe, replicas_monitor, archiver_task
+        )
     except asyncio.CancelledError:
         print("Consumer остановлен")
 
 app = FastAPI(lifespan=lifespan, title="bet_maker", description="API responsible for delivering bets on events by users", version="0.0.1")
 
+if settings.PROFILER_ENABLED:
+    app.add_middleware(ProfilerMiddleware, sample_rate=settings.PROFILER_SAMPLE_RATE, header=settings.PROFILER_HEADER)
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(MetricsMiddleware)
 
-app.include_router(router_base)
\ No newline at end of file
+app.include_router(router_base)
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+if settings.PROFILER_ENABLED:
+    app.add_route("/admin/profile", profile_endpoint, methods=["GET", "DELETE"], include_in_schema=False)
@@ -1,35 +1,105 @@
 import asyncio
-import json
 import logging
+import time
+from functools import partial
 
 import aioredis
 from app.config import settings
 from app.db.db import AsyncSessionLocal
-from app.db.schemas import Events
+from app.db.models import Status
+from app.db.schemas import Bets, BetsArchive
+from app.metrics import SETTLEMENT_BETS, SETTLEMENT_DURATION
 from app.rabbit.rabbit import RabbitMQSessionManager
 from app.rabbit.utils import map_producer_to_consumer_status
-from sqlalchemy import select
+from app.redis.events import apply_events_delta, close_events, replace_events
+from app.redis.exposure import EXPOSURE_FIELDS, events_with_open_bets, set_exposure, settle_exposure
+from app.redis.redis import create_redis
+from app.settlement.payouts import AMOUNT_SCALE, ODDS_SCALE, settle
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    ColumnElement,
+    Integer,
+    Numeric,
+    Select,
+    String,
+    Update,
+    bindparam,
+    case,
+    cast,
+    column,
+    func,
+    select,
+    union_all,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
 
 logger = logging.getLogger(__name__)
 
+async def request_events_resync(rabbit_manager: RabbitMQSessionManager, revision: int | None) -> None:
+    await rabbit_manager.publish_message(
+        queue_name="events_resync_queue",
+        message={"revision": revision}
+    )
+    logger.warning(f"Запрошен полный снимок событий, текущая ревизия {revision}")
+
+
 async def events_consumer() -> None:
+    """
+    Применяет ленту изменений из events_queue к каталогу событий в Redis.
+
+    Снимок заменяет каталог целиком. Дельта применяется, только если её
+    from_revision совпадает с текущей ревизией каталога; при разрыве
+    последовательности у line_provider запрашивается полный снимок.
+    Уведомление о наступившем дедлайне убирает события из незавершённых сразу,
+    не дожидаясь следующей дельты.
+    """
     logger.info("Запуск consumer для обработки событий")
 
     rabbit_manager = RabbitMQSessionManager(prefetch_count=10)
-    redis = aioredis.from_url(settings.get_redis_url)
+    redis = create_redis()
+    resync_requested = False
 
     try:
         message_generator = rabbit_manager.consume_messages("events_queue")
         async for message_data in message_generator:
             try:
-                logger.info(f"Получено сообщение: {message_data}")
+                logger.info(
+                    f"Получено сообщение: {message_data.get('type')}, ревизия {message_data.get('revision')}"
+                )
+
+                if message_data["type"] == "close":
+                    closed_ids = await close_events(redis, message_data["events"])
+                    logger.debug(f"Закрыт приём ставок на события {closed_ids}")
+                    continue
+
+                if message_data["type"] == "snapshot":
+                    if await replace_events(redis, message_data["events"], message_data["revision"]):
+                        resync_requested = False
+                        logger.debug("Снимок событий сохранен в Redis")
+                    else:
+                        logger.debug(f"Пропущен устаревший снимок ревизии {message_data['revision']}")
+                    continue
 
-                await redis.set(
-                    "available_events",
-                    json.dumps(message_data),
-                    ex=3600
+                # Ревизия сверяется и обновляется атомарно с применением дельты
+                revision = await apply_events_delta(
+                    redis,
+                    message_data["events"],
+                    message_data["deleted"],
+                    message_data["from_revision"],
+                    message_data["revision"],
                 )
-                logger.debug("Данные успешно сохранены в Redis")
+                if revision != message_data["from_revision"]:
+                    if revision is not None and message_data["revision"] <= revision:
+                        logger.debug(f"Пропущена устаревшая дельта до ревизии {message_data['revision']}")
+                    elif not resync_requested:
+                        await request_events_resync(rabbit_manager, revision)
+                        resync_requested = True
+                    continue
+
+                logger.debug("Изменения событий сохранены в Redis")
 
             except Exception as e:
                 logger.error(f"Ошибка обработки сообщения: {e}")
@@ -40,50 +110,191 @@ async def events_consumer() -> None:
         logger.critical(f"Критическая ошибка в consumer: {e}")
     finally:
         await redis.close()
+        await rabbit_manager.close()
         logger.info("Consumer остановлен")
 
 
+def build_unsettled_bets_query(settlements: dict[int, Status]) -> Select:
+    """
+    Возвращает незавершённые ставки на рассчитываемые события одной строкой массивов:
+    id, событие, суммы в копейках, коэффициенты в базисных пунктах и признак выигрыша.
+    События передаются как VALUES (event_id, status).
+    """
+    rows = values(
+        column("event_id", Integer),
+        column("status", String),
+        name="settlements",
+    ).data([(event_id, status.name) for event_id, status in settlements.items()])
 
-async def status_update_consumer() -> None:
-    logger.info("Запуск консьюмера для обновления статусов событий")
+    unsettled = (
+        select(
+            Bets.id,
+            Bets.event_id,
+            cast(Bets.amount * AMOUNT_SCALE, BigInteger).label("amount"),
+            cast(Bets.odds * ODDS_SCALE, BigInteger).label("odds"),
+            (rows.c.status == Status.WIN.name).label("won"),
+        )
+        .join(rows, Bets.event_id == rows.c.event_id)
+        .where(Bets.status == Status.IN_PROGRESS)
+        .subquery("unsettled")
+    )
+    return select(
+        func.array_agg(unsettled.c.id),
+        func.array_agg(unsettled.c.event_id),
+        func.array_agg(unsettled.c.amount),
+        func.array_agg(unsettled.c.odds),
+        func.array_agg(unsettled.c.won),
+    )
 
-    session = AsyncSessionLocal()
-    rabbit_manager = RabbitMQSessionManager(prefetch_count=10)
 
-    try:
-        async for data in rabbit_manager.consume_messages("event_status_update_queue"):
-            try:
-                logger.info(f"Получено обновление статуса: {data}")
+def build_settlement_update() -> Update:
+    """
+    Записывает статусы и выплаты одним UPDATE bets ... FROM unnest(:bet_ids, :payouts, :won).
+    Уже рассчитанные к этому моменту ставки не перезаписываются.
+    """
+    settled = func.unnest(
+        bindparam("bet_ids", type_=ARRAY(BigInteger)),
+        bindparam("payouts", type_=ARRAY(BigInteger)),
+        bindparam("won", type_=ARRAY(Boolean)),
+    ).table_valued("id", "payout", "won").render_derived(name="settled")
 
-                event_id = data["event_id"]
-                producer_status_value = data["new_status"]
+    return (
+        update(Bets)
+        .where(Bets.id == settled.c.id, Bets.status == Status.IN_PROGRESS)
+        .values(
+            status=cast(
+                case((settled.c.won, Status.WIN.name), else_=Status.FAIL.name),
+                Bets.__table__.c.status.type,
+            ),
+            payout=cast(settled.c.payout, Numeric) / AMOUNT_SCALE,
+            settled_at=func.now(),
+        )
+        .execution_options(synchronize_session=False)
+    )
 
-                try:
-                    new_status = map_producer_to_consumer_status(producer_status_value)
-                except ValueError:
-                    logger.error(f"Неизвестный статус: {producer_status_value}")
-                    continue
 
-                result = await session.execute(
-                    select(Events).where(Events.id == event_id)
+def _minor_units(total: ColumnElement) -> ColumnElement:
+    return cast(func.coalesce(total, 0) * AMOUNT_SCALE, BigInteger)
+
+
+def build_exposure_query(event_ids: list[int]) -> Select:
+    """
+    Счётчики событий для Redis в копейках, посчитанные по ставкам в bets и в архиве.
+    Максимальная выплата округляется так же, как при приёме ставки.
+    """
+    bets = union_all(*(
+        select(table.event_id, table.amount, table.odds, table.status, table.payout)
+        .where(table.event_id.in_(event_ids))
+        for table in (Bets, BetsArchive)
+    )).subquery("bets")
+
+    is_open = bets.c.status == Status.IN_PROGRESS
+    return select(
+        bets.c.event_id,
+        func.count().filter(is_open).label("bets"),
+        _minor_units(func.sum(bets.c.amount).filter(is_open)).label("stake"),
+        _minor_units(func.sum(func.round(bets.c.amount * bets.c.odds, 2)).filter(is_open)).label("liability"),
+        func.count().filter(~is_open).label("settled_bets"),
+        _minor_units(func.sum(bets.c.amount).filter(~is_open)).label("settled_stake"),
+        _minor_units(func.sum(bets.c.payout).filter(~is_open)).label("payout"),
+    ).group_by(bets.c.event_id)
+
+
+async def rebuild_exposure(redis: aioredis.Redis, event_ids: list[int]) -> None:
+    """
+    Пересчитывает счётчики событий в Redis по базе.
+    """
+    exposure = {event_id: dict.fromkeys(EXPOSURE_FIELDS, 0) for event_id in event_ids}
+    async with AsyncSessionLocal() as session:
+        for row in (await session.execute(build_exposure_query(event_ids))).mappings():
+            exposure[row["event_id"]] = {field: row[field] for field in EXPOSURE_FIELDS}
+    await set_exposure(redis, exposure)
+    logger.warning(f"Счётчики выплат по событиям {event_ids} пересчитаны по базе")
+
+
+async def apply_status_updates(batch: list[dict], redis: aioredis.Redis) -> None:
+    settlements: dict[int, Status] = {}
+    for data in batch:
+        try:
+            event_id = data["event_id"]
+            producer_status_value = data["new_status"]
+        except KeyError as e:
+            logger.error(f"Отсутствует обязательное поле в сообщении: {e}")
+            continue
+
+        try:
+            new_status = map_producer_to_consumer_status(producer_status_value)
+        except ValueError:
+            logger.error(f"Неизвестный статус: {producer_status_value}")
+            continue
+
+        # Более позднее сообщение о том же событии перекрывает предыдущее
+        if new_status == Status.IN_PROGRESS:
+            settlements.pop(event_id, None)
+        else:
+            settlements[event_id] = new_status
+
+    if not settlements:
+        return
+
+    started_at = time.perf_counter()
+    async with AsyncSessionLocal() as session, session.begin():
+        result = await session.execute(build_unsettled_bets_query(settlements))
+        bet_ids, event_ids, amounts, odds, won = (column_values or [] for column_values in result.one())
+        settlement = settle(bet_ids, event_ids, amounts, odds, won)
+        if bet_ids:
+            updated = await session.execute(
+                build_settlement_update(),
+                {"bet_ids": bet_ids, "payouts": settlement.payouts.tolist(), "won": won},
+            )
+            # Часть ставок успела рассчитать параллельная обработка: пачка откатывается
+            # и возвращается в очередь, чтобы итоги по событиям не учитывались дважды
+            if updated.rowcount != len(bet_ids):
+                raise RuntimeError(
+                    f"Рассчитано {updated.rowcount} ставок из {len(bet_ids)}, пачка будет обработана повторно"
                 )
-                event = result.scalar_one_or_none()
+    commit_seconds = time.perf_counter() - started_at
+    SETTLEMENT_DURATION.observe(commit_seconds)
+    SETTLEMENT_BETS.observe(len(settlement.bet_ids))
 
-                if not event:
-                    logger.error(f"Событие с ID {event_id} не найдено")
-                    continue
+    totals = settlement.totals_by_event()
+    try:
+        await settle_exposure(redis, totals)
+        # После расчёта в счётчиках события не должно остаться нерассчитанных ставок.
+        # Иначе их не удалось обновить при прошлой обработке пачки, или в них учтена
+        # ставка, которая после сбоя вставки не записалась
+        stale = await events_with_open_bets(redis, list(settlements))
+    except Exception as e:
+        logger.error(f"Не удалось обновить счётчики выплат по событиям {list(settlements)}: {e}")
+        stale = list(settlements)
+    # Ставки в базе уже рассчитаны: если пересчёт не удастся, пачка вернётся в очередь
+    # и счётчики будут пересчитаны при повторной обработке
+    if stale:
+        await rebuild_exposure(redis, stale)
 
-                event.status = new_status
-                await session.commit()
-                logger.info(f"Статус события {event_id} обновлен на {new_status}")
+    logger.info(
+        f"Рассчитано {len(settlement.bet_ids)} ставок по {len(settlements)} событиям "
+        f"(пачка из {len(batch)} сообщений) за {commit_seconds * 1000:.1f} мс: оборот {settlement.turnover}, "
+        f"выплаты {settlement.payout_total}, результат букмекера {settlement.house_pnl} коп."
+    )
 
-            except KeyError as e:
-                logger.error(f"Отсутствует обязательное поле в сообщении: {e}")
-            except Exception as e:
-                logger.error(f"Ошибка обработки сообщения: {e}")
-                await session.rollback()
 
+async def status_update_consumer() -> None:
+    logger.info("Запуск консьюмера для обновления статусов событий")
+
+    rabbit_manager = RabbitMQSessionManager(prefetch_count=10)
+    redis = create_redis()
+
+    try:
+        await rabbit_manager.consume_batches(
+            "event_status_update_queue",
+            partial(apply_status_updates, redis=redis),
+            batch_size=settings.STATUS_BATCH_SIZE,
+            batch_wait=settings.STATUS_BATCH_WAIT_MS / 1000,
+        )
+    except asyncio.CancelledError:
+        logger.info("Получен сигнал остановки консьюмера статусов")
     except Exception as e:
         logger.error(f"Ошибка в консьюмере статусов: {e}")
     finally:
-        await session.close()
\ No newline at end of file
+        await redis.close()
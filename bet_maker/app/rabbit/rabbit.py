@@ -1,17 +1,104 @@
-import json
+import asyncio
 import logging
-from collections.abc import AsyncIterator
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
 from typing import Any
 
 import aio_pika
 from app.config import settings
+from app.metrics import (
+    RABBIT_COMPRESSION_BYTES,
+    RABBIT_COMPRESSION_CPU,
+    RABBIT_MESSAGE_SIZE,
+    RABBIT_MESSAGES_CONSUMED,
+    RABBIT_MESSAGES_FAILED,
+    RABBIT_PUBLISH_DURATION,
+)
+from app.rabbit.codecs import GZIP_ENCODING, CompressionStats, compress_body, decode_compressed, get_codec
 
 logger = logging.getLogger(__name__)
 
+ATTEMPTS_HEADER = "delivery-attempts"
+DEAD_LETTER_SUFFIX = ".dead"
+
 
 class RabbitMQSessionManager:
     def __init__(self, prefetch_count: int = 10):
         self.prefetch_count = prefetch_count
+        self._connection: aio_pika.RobustConnection | None = None
+        self.compression_stats = CompressionStats()
+        self.decompression_stats = CompressionStats()
+
+    async def connect(self) -> None:
+        if not self._connection or self._connection.is_closed:
+            self._connection = await aio_pika.connect_robust(settings.get_rabbitmq_url)
+
+    async def close(self) -> None:
+        if self._connection and not self._connection.is_closed:
+            await self._connection.close()
+
+    async def publish_message(self, queue_name: str, message: dict | list) -> None:
+        started_at = time.perf_counter()
+        await self.connect()
+        codec = get_codec(settings.RABBIT_CONTENT_TYPE)
+        body, content_encoding = await self._compress(codec.encode(message), queue_name)
+        RABBIT_MESSAGE_SIZE.labels(queue_name).observe(len(body))
+        async with self._connection.channel() as channel:
+            await channel.declare_queue(
+                queue_name,
+                durable=True,
+                auto_delete=False
+            )
+            await channel.default_exchange.publish(
+                aio_pika.Message(
+                    body=body,
+                    content_type=codec.content_type,
+                    content_encoding=content_encoding,
+                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT
+                ),
+                routing_key=queue_name
+            )
+            RABBIT_PUBLISH_DURATION.labels(queue_name).observe(time.perf_counter() - started_at)
+            logger.debug(f"Сообщение отправлено в {queue_name}")
+
+    async def _compress(self, body: bytes, queue_name: str) -> tuple[bytes, str | None]:
+        """
+        Сжимает тело не меньше RABBIT_COMPRESS_MIN_SIZE байт вне event loop;
+        если сжатие не уменьшило размер, тело уходит как есть.
+        """
+        if len(body) < settings.RABBIT_COMPRESS_MIN_SIZE:
+            return body, None
+        compressed, cpu_seconds = await asyncio.to_thread(compress_body, body, settings.RABBIT_COMPRESS_LEVEL)
+        self.compression_stats.record(len(body), len(compressed), cpu_seconds)
+        RABBIT_COMPRESSION_BYTES.labels("compress", "raw").inc(len(body))
+        RABBIT_COMPRESSION_BYTES.labels("compress", "compressed").inc(len(compressed))
+        RABBIT_COMPRESSION_CPU.labels("compress").inc(cpu_seconds)
+        logger.info(
+            f"Сообщение в {queue_name} сжато: {len(body)} -> {len(compressed)} байт "
+            f"за {cpu_seconds * 1000:.1f} мс CPU, общая степень сжатия {self.compression_stats.ratio:.1f}"
+        )
+        if len(compressed) >= len(body):
+            return body, None
+        return compressed, GZIP_ENCODING
+
+    async def _decode(self, message: aio_pika.abc.AbstractIncomingMessage) -> Any:
+        if not message.content_encoding:
+            return get_codec(message.content_type).decode(message.body)
+        data, raw_size, cpu_seconds = await asyncio.to_thread(
+            decode_compressed,
+            message.body,
+            message.content_type,
+            message.content_encoding,
+            settings.RABBIT_MAX_DECOMPRESSED_SIZE,
+        )
+        self.decompression_stats.record(raw_size, len(message.body), cpu_seconds)
+        RABBIT_COMPRESSION_BYTES.labels("decompress", "raw").inc(raw_size)
+        RABBIT_COMPRESSION_BYTES.labels("decompress", "compressed").inc(len(message.body))
+        RABBIT_COMPRESSION_CPU.labels("decompress").inc(cpu_seconds)
+        logger.debug(
+            f"Сообщение распаковано: {len(message.body)} -> {raw_size} байт за {cpu_seconds * 1000:.1f} мс CPU"
+        )
+        return data
 
     async def consume_messages(self, queue_name: str) -> AsyncIterator[dict[str, Any]]:
         connection = await aio_pika.connect_robust(settings.get_rabbitmq_url)
@@ -32,13 +119,122 @@ class RabbitMQSessionManager:
                 async for message in queue_iter:
                     try:
                         async with message.process():
-                            data = json.loads(message.body.decode())
+                            data = await self._decode(message)
                             logger.debug(f"Получено сообщение: {data}")
+                            RABBIT_MESSAGES_CONSUMED.labels(queue_name).inc()
                             yield data
-                    except json.JSONDecodeError as e:
-                        logger.error(f"Ошибка декодирования JSON: {e}")
+                    except ValueError as e:
+                        RABBIT_MESSAGES_FAILED.labels(queue_name).inc()
+                        logger.error(f"Ошибка декодирования сообщения: {e}")
                     except Exception as e:
+                        RABBIT_MESSAGES_FAILED.labels(queue_name).inc()
                         logger.error(f"Ошибка обработки сообщения: {e}")
                         raise
         finally:
-            await connection.close()
\ No newline at end of file
+            await connection.close()
+
+    async def consume_batches(
+            self,
+            queue_name: str,
+            handler: Callable[[list[dict[str, Any]]], Awaitable[None]],
+            batch_size: int,
+            batch_wait: float,
+    ) -> None:
+        """
+        Передаёт в handler пачки сообщений: до batch_size штук или всё, что пришло
+        за batch_wait секунд после первого сообщения пачки. Если пачка не обработана,
+        сообщения обрабатываются по одному, а не прошедшие возвращаются в очередь.
+        """
+        connection = await aio_pika.connect_robust(settings.get_rabbitmq_url)
+
+        try:
+            channel = await connection.channel()
+            await channel.set_qos(prefetch_count=max(self.prefetch_count, batch_size))
+
+            queue = await channel.declare_queue(
+                queue_name,
+                durable=True,
+                auto_delete=False
+            )
+            incoming: asyncio.Queue[aio_pika.abc.AbstractIncomingMessage] = asyncio.Queue()
+            await queue.consume(incoming.put)
+
+            logger.info(f"Очередь '{queue_name}' готова к получению сообщений пачками по {batch_size}")
+
+            loop = asyncio.get_running_loop()
+            while True:
+                messages = [await incoming.get()]
+                deadline = loop.time() + batch_wait
+                while len(messages) < batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        messages.append(await asyncio.wait_for(incoming.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+
+                decoded = []
+                for message in messages:
+                    try:
+                        decoded.append((message, await self._decode(message)))
+                    except ValueError as e:
+                        RABBIT_MESSAGES_FAILED.labels(queue_name).inc()
+                        logger.error(f"Ошибка декодирования сообщения: {e}")
+
+                try:
+                    await handler([data for _, data in decoded])
+                    failed = []
+                except Exception as e:
+                    logger.error(f"Ошибка обработки пачки из {len(messages)} сообщений: {e}")
+                    failed = [message for message, _ in decoded]
+                    if len(decoded) > 1:
+                        # Сообщение, которое не обрабатывается, не должно задерживать остальные
+                        failed = []
+                        for message, data in decoded:
+                            try:
+                                await handler([data])
+                            except Exception as error:
+                                logger.error(f"Ошибка обработки сообщения: {error}")
+                                failed.append(message)
+
+                RABBIT_MESSAGES_CONSUMED.labels(queue_name).inc(len(decoded) - len(failed))
+                RABBIT_MESSAGES_FAILED.labels(queue_name).inc(len(failed))
+                if failed:
+                    await asyncio.sleep(1)
+                for message in failed:
+                    await self._retry(channel, queue_name, message)
+                await messages[-1].ack(multiple=True)
+        finally:
+            await connection.close()
+
+    async def _retry(
+            self,
+            channel: aio_pika.abc.AbstractChannel,
+            queue_name: str,
+            message: aio_pika.abc.AbstractIncomingMessage,
+    ) -> None:
+        """
+        Публикует копию необработанного сообщения в конец очереди, считая попытки
+        в заголовке; после RABBIT_MAX_ATTEMPTS попыток — в очередь queue_name.dead.
+        Исходное сообщение подтверждает вызывающий.
+        """
+        headers = dict(message.headers or {})
+        attempts = int(headers.get(ATTEMPTS_HEADER, 0)) + 1
+        headers[ATTEMPTS_HEADER] = attempts
+        routing_key = queue_name
+        if attempts >= settings.RABBIT_MAX_ATTEMPTS:
+            routing_key = queue_name + DEAD_LETTER_SUFFIX
+            await channel.declare_queue(routing_key, durable=True, auto_delete=False)
+            logger.error(f"Сообщение не обработано за {attempts} попыток, перенесено в {routing_key}")
+
+        await channel.default_exchange.publish(
+            aio_pika.Message(
+                body=message.body,
+                headers=headers,
+                content_type=message.content_type,
+                content_encoding=message.content_encoding,
+                delivery_mode=aio_pika.DeliveryMode.PERSISTENT
+            ),
+            routing_key=routing_key
+        )
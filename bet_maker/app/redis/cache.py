@@ -0,0 +1,169 @@
+import asyncio
+import bisect
+import json
+import logging
+import time
+from collections import OrderedDict
+
+from aioredis import Redis
+
+from app.rabbit.codecs import format_odds
+from app.redis.events import EVENTS_CHANNEL, get_event, get_events, get_events_revision, get_open_events
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class OpenEvents:
+    """
+    Незавершённые события, упорядоченные по дедлайну, с заранее закодированным JSON.
+
+    Событие открыто, пока его дедлайн позже текущего времени, поэтому открытые
+    события образуют хвост списка, начало которого находится бинарным поиском.
+    Тело ответа собирается заново, только когда это начало сдвигается.
+    """
+
+    def __init__(self, events: list[dict]):
+        self.deadlines = [event["deadline"] for event in events]
+        self._fragments = [
+            json.dumps(
+                {"id": event["id"], "odds": format_odds(event["odds"])}, ensure_ascii=False, separators=(",", ":")
+            ).encode()
+            for event in events
+        ]
+        self._start: int | None = None
+        self._body = b"[]"
+
+    def response_body(self, now: int) -> bytes:
+        start = bisect.bisect_right(self.deadlines, now)
+        if start != self._start:
+            self._body = b"[" + b",".join(self._fragments[start:]) + b"]"
+            self._start = start
+        return self._body
+
+
+class EventsCache:
+    """
+    Локальный кэш каталога событий воркера (L1) поверх Redis (L2).
+
+    Записи сбрасываются по уведомлениям из канала events_updates, которые
+    events_consumer публикует вместе с изменением каталога. На случай
+    потерянного уведомления ревизия в Redis сверяется не реже, чем раз в
+    max_age секунд. Число закэшированных событий ограничено max_size,
+    вытесняются давно не запрошенные.
+    """
+
+    def __init__(self, redis: Redis, max_size: int = 10000, max_age: float = 5.0):
+        self._redis = redis
+        self.max_size = max_size
+        self.max_age = max_age
+
+        self.revision: int | None = None
+        self._events: OrderedDict[int, dict | None] = OrderedDict()
+        self._open_events: OpenEvents | None = None
+        self._generation = 0
+        self._validated_at = 0.0
+
+    def invalidate(self, revision: int | None = None, event_ids: list[int] | None = None) -> None:
+        """
+        Сбрасывает изменённые события или, без event_ids, весь кэш.
+        """
+        self._generation += 1
+        self.revision = revision
+        self._open_events = None
+        if event_ids is None:
+            self._events.clear()
+        else:
+            for event_id in event_ids:
+                self._events.pop(event_id, None)
+
+    async def _validate(self) -> None:
+        now = time.monotonic()
+        if now - self._validated_at < self.max_age:
+            return
+        self._validated_at = now
+        revision = await get_events_revision(self._redis)
+        if revision != self.revision:
+            self.invalidate(revision)
+
+    async def get_event(self, event_id: int) -> dict | None:
+        await self._validate()
+        event = self._events.get(event_id, _MISSING)
+        if event is not _MISSING:
+            self._events.move_to_end(event_id)
+            return event
+
+        generation = self._generation
+        event = await get_event(self._redis, event_id)
+        # Не кэшируем ответ, если каталог поменялся, пока шёл запрос в Redis
+        if generation == self._generation:
+            self._remember(event_id, event)
+        return event
+
+    async def get_events(self, event_ids: list[int]) -> dict[int, dict | None]:
+        """
+        Возвращает события по списку id; недостающие в кэше читаются из Redis одним запросом.
+        """
+        await self._validate()
+        events = {}
+        missing = []
+        for event_id in dict.fromkeys(event_ids):
+            event = self._events.get(event_id, _MISSING)
+            if event is _MISSING:
+                missing.append(event_id)
+            else:
+                self._events.move_to_end(event_id)
+                events[event_id] = event
+
+        if missing:
+            generation = self._generation
+            fetched = await get_events(self._redis, missing)
+            if generation == self._generation:
+                for event_id, event in fetched.items():
+                    self._remember(event_id, event)
+            events.update(fetched)
+        return events
+
+    def _remember(self, event_id: int, event: dict | None) -> None:
+        self._events[event_id] = event
+        if len(self._events) > self.max_size:
+            self._events.popitem(last=False)
+
+    async def get_open_events(self) -> OpenEvents:
+        """
+        Возвращает все незавершённые события, упорядоченные по дедлайну.
+        """
+        await self._validate()
+        if self._open_events is not None:
+            return self._open_events
+
+        generation = self._generation
+        open_events = OpenEvents(await get_open_events(self._redis))
+        if generation == self._generation:
+            self._open_events = open_events
+        return open_events
+
+
+async def events_cache_listener(redis: Redis, cache: EventsCache) -> None:
+    """
+    Подписывается на events_updates и сбрасывает локальный кэш при изменении каталога.
+    """
+    while True:
+        pubsub = redis.pubsub()
+        try:
+            await pubsub.subscribe(EVENTS_CHANNEL)
+            # Пока подписки не было, уведомления могли потеряться
+            cache.invalidate()
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                data = json.loads(message["data"])
+                cache.invalidate(data["revision"], data["ids"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Ошибка подписки на обновления событий: {e}")
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.close()
@@ -0,0 +1,150 @@
+import json
+
+from aioredis import Redis
+from aioredis.client import Pipeline
+from aioredis.exceptions import WatchError
+
+EVENTS_KEY = "events"
+OPEN_EVENTS_KEY = "events_open"
+REVISION_KEY = "events_revision"
+EVENTS_CHANNEL = "events_updates"
+EVENTS_TTL = 3600
+
+OPEN_STATUS = "незавершённое"
+
+
+async def get_events_revision(redis: Redis) -> int | None:
+    revision = await redis.get(REVISION_KEY)
+    return int(revision) if revision is not None else None
+
+
+async def get_event(redis: Redis, event_id: int) -> dict | None:
+    event = await redis.hget(EVENTS_KEY, event_id)
+    return json.loads(event) if event is not None else None
+
+
+async def get_events(redis: Redis, event_ids: list[int]) -> dict[int, dict | None]:
+    events = await redis.hmget(EVENTS_KEY, event_ids)
+    return {
+        event_id: json.loads(event) if event is not None else None
+        for event_id, event in zip(event_ids, events)
+    }
+
+
+async def get_open_events(redis: Redis, now: int | None = None) -> list[dict]:
+    """
+    Возвращает незавершённые события с дедлайном позже now, упорядоченные по дедлайну.
+    Без now возвращаются все незавершённые события.
+    """
+    min_deadline = f"({now}" if now is not None else "-inf"
+    event_ids = await redis.zrangebyscore(OPEN_EVENTS_KEY, min_deadline, "+inf")
+    if not event_ids:
+        return []
+    events = await redis.hmget(EVENTS_KEY, event_ids)
+    return [json.loads(event) for event in events if event is not None]
+
+
+def _stage_events(pipe, events: list[dict]) -> None:
+    if not events:
+        return
+    pipe.hset(EVENTS_KEY, mapping={event["id"]: json.dumps(event) for event in events})
+
+    open_events = {event["id"]: event["deadline"] for event in events if event["status"] == OPEN_STATUS}
+    closed_ids = [event["id"] for event in events if event["status"] != OPEN_STATUS]
+    if open_events:
+        pipe.zadd(OPEN_EVENTS_KEY, open_events)
+    if closed_ids:
+        pipe.zrem(OPEN_EVENTS_KEY, *closed_ids)
+
+
+def _stage_revision(pipe, revision: int, changed_ids: list[int] | None) -> None:
+    pipe.set(REVISION_KEY, revision, ex=EVENTS_TTL)
+    pipe.expire(EVENTS_KEY, EVENTS_TTL)
+    pipe.expire(OPEN_EVENTS_KEY, EVENTS_TTL)
+    # Уведомление для локальных кэшей воркеров; changed_ids=None означает замену всего каталога
+    pipe.publish(EVENTS_CHANNEL, json.dumps({"revision": revision, "ids": changed_ids}))
+
+
+async def _watch_revision(pipe: Pipeline) -> int | None:
+    """
+    Начинает оптимистичную транзакцию: если ревизию каталога изменит кто-то другой,
+    execute завершится WatchError и ничего не запишет.
+    """
+    await pipe.watch(REVISION_KEY)
+    revision = await pipe.get(REVISION_KEY)
+    return int(revision) if revision is not None else None
+
+
+async def replace_events(redis: Redis, events: list[dict], revision: int) -> bool:
+    """
+    Заменяет каталог событий полным снимком, если снимок не старше каталога.
+    Возвращает, заменён ли каталог.
+    """
+    async with redis.pipeline(transaction=True) as pipe:
+        while True:
+            try:
+                current = await _watch_revision(pipe)
+                if current is not None and revision < current:
+                    return False
+                pipe.multi()
+                pipe.delete(EVENTS_KEY, OPEN_EVENTS_KEY)
+                _stage_events(pipe, events)
+                _stage_revision(pipe, revision, None)
+                await pipe.execute()
+                return True
+            except WatchError:
+                continue
+
+
+async def apply_events_delta(
+        redis: Redis,
+        events: list[dict],
+        deleted: list[int],
+        from_revision: int,
+        revision: int,
+) -> int | None:
+    """
+    Применяет изменения к каталогу событий, если его ревизия равна from_revision:
+    изменённые события заменяются, удалённые убираются. Возвращает ревизию каталога
+    до применения; дельта применена, только если она равна from_revision.
+    """
+    async with redis.pipeline(transaction=True) as pipe:
+        while True:
+            try:
+                current = await _watch_revision(pipe)
+                if current != from_revision:
+                    return current
+                pipe.multi()
+                _stage_events(pipe, events)
+                if deleted:
+                    pipe.hdel(EVENTS_KEY, *deleted)
+                    pipe.zrem(OPEN_EVENTS_KEY, *deleted)
+                _stage_revision(pipe, revision, [event["id"] for event in events] + deleted)
+                await pipe.execute()
+                return current
+            except WatchError:
+                continue
+
+
+async def close_events(redis: Redis, events: list[dict]) -> list[int]:
+    """
+    Убирает из незавершённых события, у которых наступил дедлайн.
+    Событие с перенесённым на более поздний срок дедлайном остаётся открытым.
+    """
+    async with redis.pipeline(transaction=False) as pipe:
+        for event in events:
+            pipe.zscore(OPEN_EVENTS_KEY, event["id"])
+        deadlines = await pipe.execute()
+    closed_ids = [
+        event["id"] for event, deadline in zip(events, deadlines)
+        if deadline is not None and deadline <= event["deadline"]
+    ]
+    if not closed_ids:
+        return []
+
+    revision = await get_events_revision(redis)
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.zrem(OPEN_EVENTS_KEY, *closed_ids)
+        pipe.publish(EVENTS_CHANNEL, json.dumps({"revision": revision, "ids": closed_ids}))
+        await pipe.execute()
+    return closed_ids
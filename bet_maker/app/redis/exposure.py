@@ -0,0 +1,105 @@
+from aioredis import Redis
+
+from app.settlement.payouts import EventTotals
+
+EXPOSURE_KEY = "event_exposure:{}"
+EXPOSURE_FIELDS = ("bets", "stake", "liability", "settled_bets", "settled_stake", "payout")
+SETTLED_EXPOSURE_TTL = 86400
+
+# Принимает ставку, только если максимальная выплата по событию не превысит лимит;
+# проверка и увеличение выполняются атомарно. Лимит 0 означает отсутствие лимита.
+RESERVE_SCRIPT = """
+local limit = tonumber(ARGV[3])
+if limit > 0 then
+    local liability = tonumber(redis.call('HGET', KEYS[1], 'liability') or '0')
+    if liability + tonumber(ARGV[2]) > limit then
+        return 0
+    end
+end
+redis.call('HINCRBY', KEYS[1], 'bets', 1)
+redis.call('HINCRBY', KEYS[1], 'stake', ARGV[1])
+redis.call('HINCRBY', KEYS[1], 'liability', ARGV[2])
+return 1
+"""
+
+
+def exposure_key(event_id: int) -> str:
+    return EXPOSURE_KEY.format(event_id)
+
+
+async def get_exposure(redis: Redis, event_id: int) -> dict[str, int]:
+    """
+    Возвращает счётчики события в копейках: bets, stake и liability по нерассчитанным
+    ставкам, settled_bets, settled_stake и payout по рассчитанным.
+    """
+    exposure = await redis.hgetall(exposure_key(event_id))
+    return {field: int(exposure.get(field.encode(), 0)) for field in EXPOSURE_FIELDS}
+
+
+async def reserve_exposure(redis: Redis, bets: list[tuple[int, int, int]], max_liability: int) -> list[bool]:
+    """
+    Учитывает ставки (event_id, stake, liability) в счётчиках событий.
+    Возвращает по каждой ставке, принята ли она с учётом лимита max_liability.
+    """
+    script = redis.register_script(RESERVE_SCRIPT)
+    async with redis.pipeline(transaction=False) as pipe:
+        for event_id, stake, liability in bets:
+            await script(keys=[exposure_key(event_id)], args=[stake, liability, max_liability], client=pipe)
+        results = await pipe.execute()
+    return [bool(result) for result in results]
+
+
+async def release_exposure(redis: Redis, bets: list[tuple[int, int, int]]) -> None:
+    """
+    Откатывает учёт ставок, которые не удалось сохранить.
+    """
+    async with redis.pipeline(transaction=True) as pipe:
+        for event_id, stake, liability in bets:
+            key = exposure_key(event_id)
+            pipe.hincrby(key, "bets", -1)
+            pipe.hincrby(key, "stake", -stake)
+            pipe.hincrby(key, "liability", -liability)
+        await pipe.execute()
+
+
+async def settle_exposure(redis: Redis, totals: dict[int, EventTotals]) -> None:
+    """
+    Переносит рассчитанные ставки из открытых счётчиков событий в рассчитанные.
+    """
+    async with redis.pipeline(transaction=True) as pipe:
+        for event_id, event_totals in totals.items():
+            key = exposure_key(event_id)
+            pipe.hincrby(key, "bets", -event_totals.bets)
+            pipe.hincrby(key, "stake", -event_totals.stake)
+            pipe.hincrby(key, "liability", -event_totals.liability)
+            pipe.hincrby(key, "settled_bets", event_totals.bets)
+            pipe.hincrby(key, "settled_stake", event_totals.stake)
+            pipe.hincrby(key, "payout", event_totals.payout)
+            pipe.expire(key, SETTLED_EXPOSURE_TTL)
+        await pipe.execute()
+
+
+async def events_with_open_bets(redis: Redis, event_ids: list[int]) -> list[int]:
+    """
+    События из event_ids, в счётчиках которых остались нерассчитанные ставки.
+    """
+    async with redis.pipeline(transaction=False) as pipe:
+        for event_id in event_ids:
+            pipe.hget(exposure_key(event_id), "bets")
+        results = await pipe.execute()
+    return [event_id for event_id, bets in zip(event_ids, results) if int(bets or 0)]
+
+
+async def set_exposure(redis: Redis, exposure: dict[int, dict[str, int]]) -> None:
+    """
+    Записывает счётчики событий целиком, например пересчитанные по базе.
+    """
+    async with redis.pipeline(transaction=True) as pipe:
+        for event_id, counters in exposure.items():
+            key = exposure_key(event_id)
+            pipe.hset(key, mapping=counters)
+            if counters["bets"]:
+                pipe.persist(key)
+            else:
+                pipe.expire(key, SETTLED_EXPOSURE_TTL)
+        await pipe.execute()
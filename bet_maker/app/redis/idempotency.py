@@ -0,0 +1,89 @@
+import asyncio
+import json
+import time
+
+from aioredis import Redis
+
+IDEMPOTENCY_KEY = "idempotency:bet:{}"
+IDEMPOTENCY_POLL_INTERVAL = 0.05
+
+# Запись меняет только запрос, который зарезервировал ключ: если он работал дольше
+# pending_ttl, ключ мог зарезервировать повтор
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+SAVE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+
+
+def idempotency_key(key: str) -> str:
+    return IDEMPOTENCY_KEY.format(key)
+
+
+def pending_record(fingerprint: str, token: str) -> str:
+    return json.dumps({"fingerprint": fingerprint, "token": token})
+
+
+async def reserve_idempotency_key(
+        redis: Redis,
+        key: str,
+        fingerprint: str,
+        token: str,
+        pending_ttl: int,
+        wait: float,
+) -> dict | None:
+    """
+    Резервирует ключ идемпотентности (SET NX) на время обработки запроса;
+    token отличает этот запрос от повторов.
+
+    Возвращает None, если ключ зарезервирован этим запросом, иначе запись
+    первого запроса. Пока первый запрос обрабатывается, повтор ждёт его ответа
+    до wait секунд; если ответа так и нет, возвращается запись без status_code.
+    """
+    pending = pending_record(fingerprint, token)
+    deadline = time.monotonic() + wait
+    while True:
+        if await redis.set(idempotency_key(key), pending, ex=pending_ttl, nx=True):
+            return None
+
+        stored = await redis.get(idempotency_key(key))
+        if stored is None:
+            # Первый запрос завершился ошибкой и освободил ключ
+            continue
+        record = json.loads(stored)
+        if "status_code" in record or time.monotonic() >= deadline:
+            return record
+        await asyncio.sleep(IDEMPOTENCY_POLL_INTERVAL)
+
+
+async def save_idempotent_response(
+        redis: Redis,
+        key: str,
+        fingerprint: str,
+        token: str,
+        status_code: int,
+        body: dict,
+        ttl: int,
+) -> bool:
+    """
+    Сохраняет ответ, если ключ по-прежнему зарезервирован запросом token.
+    """
+    record = json.dumps({"fingerprint": fingerprint, "status_code": status_code, "body": body}, ensure_ascii=False)
+    script = redis.register_script(SAVE_SCRIPT)
+    return bool(await script(keys=[idempotency_key(key)], args=[pending_record(fingerprint, token), record, ttl]))
+
+
+async def release_idempotency_key(redis: Redis, key: str, fingerprint: str, token: str) -> bool:
+    """
+    Освобождает ключ, если он по-прежнему зарезервирован запросом token.
+    """
+    script = redis.register_script(RELEASE_SCRIPT)
+    return bool(await script(keys=[idempotency_key(key)], args=[pending_record(fingerprint, token)]))
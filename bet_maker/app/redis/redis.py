@@ -1,8 +1,50 @@
-
+import time
 
 from aioredis import Redis
+from aioredis.client import Pipeline
 from fastapi import Request
 
+from app.config import settings
+from app.metrics import REDIS_COMMAND_DURATION
+from app.redis.cache import EventsCache
+
+
+class InstrumentedPipeline(Pipeline):
+    """
+    Пайплайн, замеряющий время выполнения всей пачки команд.
+    """
+
+    async def execute(self, raise_on_error: bool = True):
+        started_at = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            REDIS_COMMAND_DURATION.observe(("PIPELINE",), time.perf_counter() - started_at)
+
+
+class InstrumentedRedis(Redis):
+    """
+    Клиент Redis, замеряющий задержку каждой команды.
+    """
+
+    async def execute_command(self, *args, **options):
+        started_at = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            REDIS_COMMAND_DURATION.observe((str(args[0]).upper(),), time.perf_counter() - started_at)
+
+    def pipeline(self, transaction: bool = True, shard_hint: str | None = None) -> InstrumentedPipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+def create_redis() -> InstrumentedRedis:
+    return InstrumentedRedis.from_url(settings.get_redis_url)
+
 
 async def get_redis_global(request: Request) -> Redis:
-    return request.app.state.redis
\ No newline at end of file
+    return request.app.state.redis
+
+
+async def get_events_cache(request: Request) -> EventsCache:
+    return request.app.state.events_cache
@@ -0,0 +1,113 @@
+from dataclasses import dataclass
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+
+# Суммы считаются в копейках, коэффициенты в базисных пунктах (1.5 -> 15000)
+AMOUNT_SCALE = 100
+ODDS_SCALE = 10_000
+MONEY_QUANT = Decimal("0.01")
+ODDS_QUANT = Decimal("0.0001")
+
+_INT64_MAX = np.iinfo(np.int64).max
+
+
+@dataclass(frozen=True)
+class EventTotals:
+    bets: int
+    stake: int
+    liability: int
+    payout: int
+
+
+@dataclass(frozen=True)
+class Settlement:
+    bet_ids: np.ndarray
+    event_ids: np.ndarray
+    amounts: np.ndarray
+    liabilities: np.ndarray
+    payouts: np.ndarray
+    turnover: int
+    payout_total: int
+
+    @property
+    def house_pnl(self) -> int:
+        return self.turnover - self.payout_total
+
+    def totals_by_event(self) -> dict[int, EventTotals]:
+        """
+        Число ставок, сумма ставок, максимальная и фактическая выплата по каждому событию.
+        """
+        event_ids, index, bets = np.unique(self.event_ids, return_inverse=True, return_counts=True)
+        sums = []
+        for values in (self.amounts, self.liabilities, self.payouts):
+            total = np.zeros(len(event_ids), dtype=values.dtype)
+            np.add.at(total, index, values)
+            sums.append(total.tolist())
+        return {
+            event_id: EventTotals(bets=count, stake=stake, liability=liability, payout=payout)
+            for event_id, count, stake, liability, payout in zip(event_ids.tolist(), bets.tolist(), *sums)
+        }
+
+
+def payout_decimal(amount: Decimal, odds: Decimal, won: bool) -> Decimal:
+    """
+    Эталонный расчёт выплаты в Decimal: сумма ставки на коэффициент,
+    округление до копеек половиной вверх; проигравшая ставка не выплачивается.
+    """
+    if not won:
+        return Decimal("0.00")
+    return (amount * odds).quantize(MONEY_QUANT, rounding=ROUND_HALF_UP)
+
+
+def from_minor_units(value: int) -> Decimal:
+    return Decimal(value) * MONEY_QUANT
+
+
+def bet_exposure(amount: Decimal, odds: Decimal) -> tuple[int, int]:
+    """
+    Сумма ставки и выплата при выигрыше в копейках для одной ставки.
+    """
+    liability = payout_decimal(amount, odds.quantize(ODDS_QUANT, rounding=ROUND_HALF_UP), True)
+    return int(amount * AMOUNT_SCALE), int(liability * AMOUNT_SCALE)
+
+
+def calculate_liabilities(amounts: np.ndarray, odds: np.ndarray) -> np.ndarray:
+    """
+    Выплаты при выигрыше в копейках по массивам сумм (копейки) и коэффициентов
+    (базисные пункты). Совпадает с payout_decimal; если произведение может не
+    поместиться в int64, считает на целых Python.
+    """
+    if len(amounts) and int(amounts.max()) * int(odds.max()) > _INT64_MAX - ODDS_SCALE:
+        amounts = amounts.astype(object)
+        odds = odds.astype(object)
+
+    return (amounts * odds + ODDS_SCALE // 2) // ODDS_SCALE
+
+
+def calculate_payouts(amounts: np.ndarray, odds: np.ndarray, won: np.ndarray) -> np.ndarray:
+    """
+    Выплаты в копейках с учётом исхода: проигравшие ставки не выплачиваются.
+    """
+    return np.where(won, calculate_liabilities(amounts, odds), 0)
+
+
+def settle(
+        bet_ids: list[int],
+        event_ids: list[int],
+        amounts: list[int],
+        odds: list[int],
+        won: list[bool],
+) -> Settlement:
+    amounts_array = np.array(amounts, dtype=np.int64)
+    liabilities = calculate_liabilities(amounts_array, np.array(odds, dtype=np.int64))
+    payouts = np.where(np.array(won, dtype=bool), liabilities, 0)
+    return Settlement(
+        bet_ids=np.array(bet_ids, dtype=np.int64),
+        event_ids=np.array(event_ids, dtype=np.int64),
+        amounts=amounts_array,
+        liabilities=liabilities,
+        payouts=payouts,
+        turnover=int(amounts_array.sum()),
+        payout_total=int(payouts.sum()),
+    )
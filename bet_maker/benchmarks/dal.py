@@ -0,0 +1,181 @@
+"""
+Сравнение ORM и прямых запросов asyncpg (app.db.raw_queries) на горячих путях
+bet_maker без HTTP-слоя: вставка ставки и чтение страницы истории ставок.
+
+Вставка замеряется по одной ставке на запрос, как без групповой фиксации, и
+пачками, как её выполняет GroupCommitWriter. Каждый сценарий выполняется в
+concurrency параллельных потоков. Результат сохраняется в JSON; с --baseline
+выводится сравнение с прошлым прогоном.
+
+Нужен доступный Postgres (по умолчанию из настроек DB_*): для прогона на нём
+создаётся и затем удаляется отдельная база. Запуск из каталога bet_maker:
+    python -m benchmarks.dal [--operations 5000] [--concurrency 20]
+        [--batch-size 50] [--page-size 100] [--output results.json]
+        [--baseline previous.json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+from unittest.mock import patch
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import insert, select
+
+from app.config import settings
+from app.db import raw_queries
+from app.db.custom_models import BetOut
+from app.db.db import AsyncSessionLocal
+from app.db.raw_queries import fetch_bets_page, insert_bets
+from app.db.schemas import Bets, Status
+from benchmarks.load import compare, current_commit, summarize
+from benchmarks.stand_ins import disposable_database
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def new_bet(index: int) -> dict:
+    return {
+        "event_id": index % 1000 + 1,
+        "amount": Decimal("10.00"),
+        "odds": Decimal("1.5"),
+        "status": Status.IN_PROGRESS,
+    }
+
+
+async def orm_insert_bet(index: int) -> None:
+    async with AsyncSessionLocal() as session:
+        bet = Bets(**new_bet(index))
+        session.add(bet)
+        await session.commit()
+        await session.refresh(bet)
+        jsonable_encoder(bet)
+
+
+async def raw_insert_bet(index: int) -> None:
+    await insert_bets([new_bet(index)])
+
+
+def batch_insert(
+        insert_rows: Callable[[list[dict]], Awaitable[list]], batch_size: int
+) -> Callable[[int], Awaitable[None]]:
+    async def run(index: int) -> None:
+        await insert_rows([new_bet(index * batch_size + offset) for offset in range(batch_size)])
+
+    return run
+
+
+async def orm_insert_bets(bets: list[dict]) -> list:
+    async with AsyncSessionLocal() as session, session.begin():
+        result = await session.scalars(insert(Bets).returning(Bets, sort_by_parameter_order=True), bets)
+        return [jsonable_encoder(bet) for bet in result.all()]
+
+
+def orm_get_bets(rng: random.Random, page_size: int, total_bets: int) -> Callable[[int], Awaitable[None]]:
+    async def run(index: int) -> None:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(Bets.id, Bets.event_id, Bets.status)
+                .where(Bets.id > rng.randrange(total_bets))
+                .order_by(Bets.id)
+                .limit(page_size)
+            )
+            bets = [BetOut(id=bet.id, event_id=bet.event_id, status=bet.status) for bet in result.all()]
+            json.dumps(jsonable_encoder(bets), ensure_ascii=False, separators=(",", ":")).encode()
+
+    return run
+
+
+def raw_get_bets(rng: random.Random, page_size: int, total_bets: int) -> Callable[[int], Awaitable[None]]:
+    async def run(index: int) -> None:
+        await fetch_bets_page(rng.randrange(total_bets), page_size)
+
+    return run
+
+
+async def run_operations(total: int, concurrency: int, operation: Callable[[int], Awaitable[None]]) -> dict:
+    latencies = []
+    indexes = iter(range(total))
+
+    async def worker() -> None:
+        for index in indexes:
+            started_at = time.perf_counter()
+            await operation(index)
+            latencies.append(time.perf_counter() - started_at)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return {"operations": total, **summarize(latencies, time.perf_counter() - started_at)}
+
+
+async def run(args: argparse.Namespace) -> dict:
+    results = {}
+    async with disposable_database(args.database_url or settings.get_db_url) as engine:
+        AsyncSessionLocal.configure(bind=engine)
+        with patch.object(raw_queries, "engine", engine):
+            batches = args.operations // args.batch_size
+            scenarios = {
+                "insert_orm": (args.operations, orm_insert_bet),
+                "insert_raw": (args.operations, raw_insert_bet),
+                "insert_batch_orm": (batches, batch_insert(orm_insert_bets, args.batch_size)),
+                "insert_batch_raw": (batches, batch_insert(insert_bets, args.batch_size)),
+            }
+            for name, (total, operation) in scenarios.items():
+                results[name] = await run_operations(total, args.concurrency, operation)
+                if name.startswith("insert_batch"):
+                    results[name]["rows_per_second"] = round(total * args.batch_size / results[name]["seconds"], 1)
+
+            total_bets = args.operations * 4
+            for name, operation in (("get_bets_orm", orm_get_bets), ("get_bets_raw", raw_get_bets)):
+                results[name] = await run_operations(
+                    args.operations,
+                    args.concurrency,
+                    operation(random.Random(0), args.page_size, total_bets),
+                )
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--operations", type=int, default=5_000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--database-url", help="сервер Postgres для временной базы, по умолчанию из настроек")
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--baseline", type=Path)
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(args.log_level)
+
+    report = {
+        "service": "bet_maker",
+        "benchmark": "dal",
+        "commit": current_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "parameters": {
+            key: value for key, value in vars(args).items() if key not in ("output", "baseline", "database_url")
+        },
+        "results": asyncio.run(run(args)),
+    }
+
+    output = args.output or RESULTS_DIR / f"dal-{report['commit'] or 'unknown'}-{int(time.time())}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+    print(json.dumps(report["results"], ensure_ascii=False, indent=2))
+    print(f"Результаты сохранены в {output}")
+
+    if args.baseline:
+        compare(json.loads(args.baseline.read_text()), report)
+
+
+if __name__ == "__main__":
+    main()
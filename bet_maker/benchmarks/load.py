@@ -0,0 +1,269 @@
+"""
+Нагрузочный прогон bet_maker в одном процессе: реальное ASGI-приложение и
+консьюмеры поверх локальных заменителей RabbitMQ, Redis и Postgres.
+
+Замеряются пропускная способность и p50/p99 задержки POST /bet, GET /events и
+GET /bets, а также скорость events_consumer и status_update_consumer. Результат
+сохраняется в JSON; с --baseline выводится сравнение с прошлым прогоном.
+
+Нужен доступный Postgres (по умолчанию из настроек DB_*): для прогона на нём
+создаётся и затем удаляется отдельная база. Запуск из каталога bet_maker:
+    python -m benchmarks.load [--events 10000] [--bets 100000] [--requests 2000]
+        [--concurrency 50] [--output results.json] [--baseline previous.json]
+
+Ответы 503 контроля нагрузки считаются ошибками и видны в разбивке по кодам;
+с --no-admission замеряется предельная производительность без отклонений.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import subprocess
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest.mock import patch
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.admission import DecayingAverage, admission_controller
+from app.config import settings
+from app.db import raw_queries
+from app.db.db import AsyncSessionLocal
+from app.main import app
+from app.rabbit import queues
+from app.rabbit.queues import events_consumer, status_update_consumer
+from app.redis.cache import EventsCache, events_cache_listener
+from benchmarks.stand_ins import InMemoryBroker, create_fake_redis, disposable_database
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+STATUS_QUEUE = "event_status_update_queue"
+COMPARED_METRICS = ("throughput_per_second", "p50_ms", "p99_ms", "seconds")
+
+
+def summarize(latencies: list[float], elapsed: float) -> dict:
+    ordered = sorted(latencies)
+
+    def percentile(q: float) -> float:
+        return round(ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000, 3)
+
+    return {
+        "seconds": round(elapsed, 3),
+        "throughput_per_second": round(len(ordered) / elapsed, 1),
+        "p50_ms": percentile(0.5),
+        "p99_ms": percentile(0.99),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+async def run_load(total: int, concurrency: int, request: Callable[[int], Awaitable[int]]) -> dict:
+    """
+    Выполняет total запросов в concurrency параллельных потоков; request
+    возвращает HTTP-статус, ответы 4xx и 5xx считаются ошибками.
+    """
+    latencies = []
+    statuses = Counter()
+    indexes = iter(range(total))
+
+    async def worker() -> None:
+        for index in indexes:
+            started_at = time.perf_counter()
+            statuses[await request(index)] += 1
+            latencies.append(time.perf_counter() - started_at)
+
+    # Сценарии не должны отклоняться из-за нагрузки, накопленной предыдущим
+    admission_controller.pool_wait = DecayingAverage()
+    admission_controller.redis_latency = DecayingAverage(tau=5.0)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return {
+        "requests": total,
+        "errors": sum(count for status_code, count in statuses.items() if status_code >= 400),
+        "statuses": {str(status_code): count for status_code, count in sorted(statuses.items())},
+        **summarize(latencies, time.perf_counter() - started_at),
+    }
+
+
+def build_snapshot(events: int) -> dict:
+    rng = random.Random(0)
+    deadline = int(time.time()) + 86_400
+    return {
+        "type": "snapshot",
+        "revision": events,
+        "events": [
+            {"id": event_id, "odds": rng.randint(10_100, 100_000), "deadline": deadline, "status": "незавершённое"}
+            for event_id in range(1, events + 1)
+        ],
+    }
+
+
+async def bench_events_consumer(broker: InMemoryBroker, events: int) -> dict:
+    started_at = time.perf_counter()
+    await broker.publish_message("events_queue", build_snapshot(events))
+    await broker.join("events_queue")
+    elapsed = time.perf_counter() - started_at
+    return {"events": events, "seconds": round(elapsed, 3), "events_per_second": round(events / elapsed, 1)}
+
+
+async def seed_bets(engine: AsyncEngine, bets: int, events: int) -> dict:
+    started_at = time.perf_counter()
+    async with engine.begin() as connection:
+        await connection.execute(
+            text(
+                "INSERT INTO bets (event_id, amount, odds, status) "
+                "SELECT 1 + g % :events, 10.00, 1.5, 'IN_PROGRESS' FROM generate_series(1, :bets) AS g"
+            ),
+            {"events": events, "bets": bets},
+        )
+    return {"bets": bets, "seconds": round(time.perf_counter() - started_at, 3)}
+
+
+async def bench_status_consumer(engine: AsyncEngine, broker: InMemoryBroker, events: int) -> dict:
+    statuses = ("завершено выигрышем первой команды", "завершено выигрышем второй команды")
+    started_at = time.perf_counter()
+    for event_id in range(1, events + 1):
+        await broker.publish_message(STATUS_QUEUE, {"event_id": event_id, "new_status": statuses[event_id % 2]})
+    await broker.join(STATUS_QUEUE)
+    elapsed = time.perf_counter() - started_at
+
+    async with engine.connect() as connection:
+        settled = await connection.scalar(text("SELECT count(*) FROM bets WHERE status != 'IN_PROGRESS'"))
+    return {
+        "messages": events,
+        "failed_messages": broker.failed[STATUS_QUEUE],
+        "bets_settled": settled,
+        "seconds": round(elapsed, 3),
+        "messages_per_second": round(events / elapsed, 1),
+        "bets_per_second": round(settled / elapsed, 1),
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    broker = InMemoryBroker()
+    redis = create_fake_redis()
+    results = {}
+
+    async with disposable_database(args.database_url or settings.get_db_url) as engine:
+        AsyncSessionLocal.configure(bind=engine)
+        app.state.redis = redis
+        app.state.events_cache = EventsCache(
+            redis,
+            max_size=settings.EVENTS_CACHE_SIZE,
+            max_age=settings.EVENTS_CACHE_MAX_AGE,
+        )
+
+        with (
+            patch.object(raw_queries, "engine", engine),
+            patch.object(queues, "RabbitMQSessionManager", return_value=broker),
+            patch.object(queues, "create_redis", return_value=redis),
+        ):
+            tasks = [
+                asyncio.create_task(events_consumer()),
+                asyncio.create_task(status_update_consumer()),
+                asyncio.create_task(events_cache_listener(redis, app.state.events_cache)),
+            ]
+            rng = random.Random(0)
+            try:
+                results["events_consumer"] = await bench_events_consumer(broker, args.events)
+                results["seed_bets"] = await seed_bets(engine, args.bets, args.events)
+
+                async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+                    async def post_bet(index: int) -> int:
+                        response = await client.post(
+                            "/bet_maker/bet",
+                            params={"id": index % args.events + 1, "amount": "10.00"},
+                        )
+                        return response.status_code
+
+                    async def get_events(index: int) -> int:
+                        return (await client.get("/bet_maker/events")).status_code
+
+                    async def get_bets(index: int) -> int:
+                        response = await client.get(
+                            "/bet_maker/bets",
+                            params={"after_id": rng.randrange(args.bets + args.requests), "limit": args.page_size},
+                        )
+                        return response.status_code
+
+                    results["post_bet"] = await run_load(args.requests, args.concurrency, post_bet)
+                    results["get_events"] = await run_load(args.requests, args.concurrency, get_events)
+                    results["get_bets"] = await run_load(args.requests, args.concurrency, get_bets)
+
+                results["status_update_consumer"] = await bench_status_consumer(engine, broker, args.events)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    return results
+
+
+def current_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: dict, report: dict) -> None:
+    print(f"Сравнение с {baseline.get('commit')} ({baseline.get('created_at')})")
+    for scenario, metrics in report["results"].items():
+        previous = baseline.get("results", {}).get(scenario, {})
+        for metric in COMPARED_METRICS:
+            if metric in metrics and previous.get(metric):
+                change = (metrics[metric] - previous[metric]) / previous[metric] * 100
+                print(f"{scenario:<28}{metric:<24}{previous[metric]:>12}{metrics[metric]:>12}{change:>+9.1f}%")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=10_000)
+    parser.add_argument("--bets", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--database-url", help="сервер Postgres для временной базы, по умолчанию из настроек")
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--baseline", type=Path)
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--no-admission", action="store_true", help="не отклонять запросы при перегрузке (503)")
+    args = parser.parse_args()
+
+    if args.no_admission:
+        admission_controller.max_in_flight = float("inf")
+        admission_controller.max_pool_wait = float("inf")
+        admission_controller.max_redis_latency = float("inf")
+
+    # Логи запросов на уровне INFO заметно искажают замеры
+    logging.getLogger().setLevel(args.log_level)
+
+    report = {
+        "service": "bet_maker",
+        "commit": current_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "parameters": {
+            key: value for key, value in vars(args).items() if key not in ("output", "baseline", "database_url")
+        },
+        "results": asyncio.run(run(args)),
+    }
+
+    output = args.output or RESULTS_DIR / f"load-{report['commit'] or 'unknown'}-{int(time.time())}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+    print(json.dumps(report["results"], ensure_ascii=False, indent=2))
+    print(f"Результаты сохранены в {output}")
+
+    if args.baseline:
+        compare(json.loads(args.baseline.read_text()), report)
+
+
+if __name__ == "__main__":
+    main()
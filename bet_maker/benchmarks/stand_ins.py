@@ -0,0 +1,127 @@
+"""
+Локальные заменители внешних сервисов для нагрузочных прогонов: брокер в
+памяти процесса, fakeredis и одноразовая база в локальном Postgres.
+"""
+import asyncio
+import logging
+import uuid
+from collections import defaultdict
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any
+
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.admission import TimedQueuePool
+from app.config import settings
+from app.db.schemas import Base
+from app.rabbit.codecs import get_codec
+from app.rabbit.rabbit import RabbitMQSessionManager
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class InMemoryMessage:
+    body: bytes
+    content_type: str | None
+    content_encoding: str | None
+
+
+class InMemoryBroker(RabbitMQSessionManager):
+    """
+    Брокер в памяти процесса с интерфейсом RabbitMQSessionManager.
+
+    Сообщения проходят те же кодеки и сжатие, что и при работе с RabbitMQ,
+    поэтому их стоимость входит в замеры. join ждёт, пока консьюмеры
+    обработают всё опубликованное в очередь.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.queues: defaultdict[str, asyncio.Queue[InMemoryMessage]] = defaultdict(asyncio.Queue)
+        self.failed: defaultdict[str, int] = defaultdict(int)
+
+    async def connect(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def publish_message(self, queue_name: str, message: dict | list) -> None:
+        codec = get_codec(settings.RABBIT_CONTENT_TYPE)
+        body, content_encoding = await self._compress(codec.encode(message), queue_name)
+        await self.queues[queue_name].put(InMemoryMessage(body, codec.content_type, content_encoding))
+
+    async def consume_messages(self, queue_name: str) -> AsyncIterator[dict[str, Any]]:
+        queue = self.queues[queue_name]
+        while True:
+            message = await queue.get()
+            try:
+                yield await self._decode(message)
+            finally:
+                queue.task_done()
+
+    async def consume_batches(
+            self,
+            queue_name: str,
+            handler: Callable[[list[dict[str, Any]]], Awaitable[None]],
+            batch_size: int,
+            batch_wait: float,
+    ) -> None:
+        queue = self.queues[queue_name]
+        loop = asyncio.get_running_loop()
+        while True:
+            messages = [await queue.get()]
+            deadline = loop.time() + batch_wait
+            while len(messages) < batch_size:
+                try:
+                    messages.append(await asyncio.wait_for(queue.get(), deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await handler([await self._decode(message) for message in messages])
+            except Exception as e:
+                # В отличие от RabbitMQ пачка не возвращается в очередь: прогон
+                # учитывает её как ошибку и идёт дальше
+                self.failed[queue_name] += len(messages)
+                logger.error(f"Ошибка обработки пачки из {len(messages)} сообщений: {e}")
+            finally:
+                for _ in messages:
+                    queue.task_done()
+
+    async def join(self, queue_name: str) -> None:
+        await self.queues[queue_name].join()
+
+
+def create_fake_redis() -> FakeRedis:
+    return FakeRedis(server=FakeServer())
+
+
+@asynccontextmanager
+async def disposable_database(server_url: str) -> AsyncIterator[AsyncEngine]:
+    """
+    Создаёт на сервере Postgres временную базу со схемой bet_maker и удаляет её после прогона.
+    """
+    url = make_url(server_url)
+    name = f"bench_{uuid.uuid4().hex[:12]}"
+    admin = create_async_engine(url.set(database="postgres"), isolation_level="AUTOCOMMIT")
+    async with admin.connect() as connection:
+        await connection.execute(text(f'CREATE DATABASE "{name}"'))
+
+    engine = create_async_engine(url.set(database=name), poolclass=TimedQueuePool)
+    try:
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        yield engine
+    finally:
+        await engine.dispose()
+        async with admin.connect() as connection:
+            await connection.execute(text(f'DROP DATABASE IF EXISTS "{name}"'))
+        await admin.dispose()
@@ -0,0 +1,61 @@
+import time
+from unittest.mock import patch
+
+import pytest_asyncio
+from fakeredis.aioredis import FakeRedis
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.config import settings
+from app.db import raw_queries
+from app.db.db import AsyncSessionLocal
+from app.db.group_commit import bet_writer
+from app.db.schemas import Base
+from app.main import app
+from app.redis.cache import EventsCache
+from app.redis.events import OPEN_STATUS, replace_events
+
+OPEN_DEADLINE = int(time.time()) + 3600
+
+
+def wire_event(event_id: int, deadline: int = OPEN_DEADLINE, status: str = OPEN_STATUS, odds: int = 15000) -> dict:
+    """Событие в том виде, в каком его публикует line_provider"""
+    return {"id": event_id, "odds": odds, "deadline": deadline, "status": status}
+
+
+@pytest_asyncio.fixture
+async def test_db():
+    """Тестовая БД: таблицы создаются на время теста, запросы приложения идут в неё"""
+    engine = create_async_engine(settings.get_test_db_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    bind = AsyncSessionLocal.kw["bind"]
+    AsyncSessionLocal.configure(bind=engine)
+    with patch.object(raw_queries, "engine", engine):
+        yield engine
+        await bet_writer.close()
+    AsyncSessionLocal.configure(bind=bind)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def redis():
+    """Redis в памяти с каталогом из трёх открытых событий"""
+    redis = FakeRedis()
+    await replace_events(redis, [wire_event(1), wire_event(2), wire_event(3)], 1)
+    yield redis
+    await redis.aclose()
+
+
+@pytest_asyncio.fixture
+async def client(test_db, redis):
+    """Тестовый клиент приложения поверх тестовой БД и Redis в памяти"""
+    app.state.redis = redis
+    app.state.events_cache = EventsCache(redis)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        yield ac
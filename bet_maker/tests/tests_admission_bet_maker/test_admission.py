@@ -0,0 +1,33 @@
+from app.admission import AdmissionController, DecayingAverage
+
+
+def make_controller() -> AdmissionController:
+    return AdmissionController(max_in_flight=10, max_pool_wait=0.1, max_redis_latency=0.05, read_shed_level=0.8)
+
+
+def test_reads_shed_before_writes() -> None:
+    controller = make_controller()
+    controller.in_flight = 8
+
+    assert not controller.admit("GET")
+    assert controller.admit("POST")
+
+    controller.in_flight = 10
+    assert not controller.admit("POST")
+    assert controller.rejected == 2
+
+
+def test_pool_wait_limits_admission() -> None:
+    controller = make_controller()
+    for _ in range(20):
+        controller.pool_wait.add(0.5)
+
+    assert not controller.admit("POST")
+
+
+def test_decaying_average_recovers_without_samples() -> None:
+    average = DecayingAverage(tau=1.0, weight=1.0)
+    average.add(1.0, now=100.0)
+
+    assert average.get(now=100.0) == 1.0
+    assert average.get(now=105.0) < 0.01
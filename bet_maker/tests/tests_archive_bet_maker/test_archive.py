@@ -0,0 +1,100 @@
+import json
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.db.archive import BetsArchiver, month_partition
+from app.db.raw_queries import insert_bets
+from app.db.schemas import Bets, BetsArchive, Status
+
+UTC = timezone.utc
+
+
+@pytest.mark.parametrize(("month", "name", "start", "end"), [
+    (datetime(2026, 10, 1, tzinfo=UTC), "bets_archive_2026_10",
+     datetime(2026, 10, 1, tzinfo=UTC), datetime(2026, 11, 1, tzinfo=UTC)),
+    (datetime(2026, 12, 1, tzinfo=UTC), "bets_archive_2026_12",
+     datetime(2026, 12, 1, tzinfo=UTC), datetime(2027, 1, 1, tzinfo=UTC)),
+    (datetime(2027, 2, 1, tzinfo=UTC), "bets_archive_2027_02",
+     datetime(2027, 2, 1, tzinfo=UTC), datetime(2027, 3, 1, tzinfo=UTC)),
+])
+def test_month_partition_bounds(month: datetime, name: str, start: datetime, end: datetime) -> None:
+    assert month_partition(month) == (name, start, end)
+
+
+def test_month_partition_uses_utc_month() -> None:
+    # 1 ноября 02:00 по Москве — ещё октябрь по UTC
+    month = datetime(2026, 11, 1, 2, 0, tzinfo=timezone(timedelta(hours=3)))
+
+    assert month_partition(month)[0] == "bets_archive_2026_10"
+
+
+async def settle_bets(engine: AsyncEngine, settled: dict[int, datetime]) -> None:
+    async with engine.begin() as connection:
+        for bet_id, settled_at in settled.items():
+            await connection.execute(
+                update(Bets)
+                .where(Bets.id == bet_id)
+                .values(status=Status.FAIL, payout=Decimal("0"), settled_at=settled_at)
+            )
+
+
+async def table_ids(engine: AsyncEngine, table) -> list[int]:
+    async with engine.connect() as connection:
+        return list(await connection.scalars(select(table.id).order_by(table.id)))
+
+
+async def history_ids(client: AsyncClient) -> tuple[list[int], list[int]]:
+    page = await client.get("/bet_maker/bets", params={"limit": 100})
+    stream = await client.get("/bet_maker/bets", params={"stream": "true"})
+    return [bet["id"] for bet in page.json()], [json.loads(line)["id"] for line in stream.text.splitlines()]
+
+
+async def test_archive_moves_settled_bets_once(client: AsyncClient, test_db: AsyncEngine) -> None:
+    bets = await insert_bets([
+        {"event_id": 1, "amount": Decimal("10.00"), "odds": Decimal("1.5"), "status": Status.IN_PROGRESS}
+        for _ in range(6)
+    ])
+    ids = [bet["id"] for bet in bets]
+    now = datetime.now(UTC)
+    await settle_bets(test_db, {
+        ids[0]: datetime(2026, 9, 30, 23, 59, tzinfo=UTC),
+        ids[1]: datetime(2026, 10, 1, tzinfo=UTC),
+        ids[2]: now - timedelta(hours=2),
+        ids[3]: now - timedelta(hours=2),
+        ids[4]: now,
+    })
+    archiver = BetsArchiver(test_db, interval=60, delay=3600, batch_size=2)
+
+    assert await archiver.archive() == 4
+
+    assert await table_ids(test_db, Bets) == [ids[4], ids[5]]
+    assert await table_ids(test_db, BetsArchive) == ids[:4]
+    assert {"bets_archive_2026_09", "bets_archive_2026_10"} <= archiver._partitions
+    assert await history_ids(client) == (ids, ids)
+    assert await archiver.archive() == 0
+
+
+async def test_archive_skips_locked_bets(test_db: AsyncEngine) -> None:
+    bets = await insert_bets([
+        {"event_id": 1, "amount": Decimal("10.00"), "odds": Decimal("1.5"), "status": Status.IN_PROGRESS}
+        for _ in range(3)
+    ])
+    ids = [bet["id"] for bet in bets]
+    settled_at = datetime.now(UTC) - timedelta(hours=2)
+    await settle_bets(test_db, dict.fromkeys(ids, settled_at))
+    archiver = BetsArchiver(test_db, interval=60, delay=3600, batch_size=10)
+
+    async with test_db.connect() as locker:
+        # Ставку в этот момент держит другая транзакция
+        await locker.execute(select(Bets.id).where(Bets.id == ids[1]).with_for_update())
+        assert await archiver.archive() == 2
+        await locker.rollback()
+
+    assert await table_ids(test_db, Bets) == [ids[1]]
+    assert await archiver.archive() == 1
+    assert await table_ids(test_db, BetsArchive) == ids
@@ -0,0 +1,84 @@
+import time
+from decimal import Decimal
+from unittest.mock import patch
+
+from fakeredis.aioredis import FakeRedis
+from httpx import AsyncClient
+from sqlalchemy import func, select
+
+from app.api.handlers_bet_maker import LIABILITY_LIMIT_DETAIL
+from app.config import settings
+from app.db.schemas import Bets
+from app.redis.events import replace_events
+from app.redis.exposure import get_exposure
+from tests.conftest import wire_event
+
+
+async def count_bets(test_db) -> int:
+    async with test_db.connect() as connection:
+        return await connection.scalar(select(func.count()).select_from(Bets))
+
+
+async def test_bulk_returns_result_per_row_in_order(client: AsyncClient, test_db) -> None:
+    response = await client.post("/bet_maker/bets/bulk", json=[
+        {"id": 1, "amount": "10.00"},
+        {"id": 2, "amount": "-5"},
+        {"id": 404, "amount": "10.00"},
+        {"amount": "10.00"},
+        {"id": 3, "amount": "20.50"},
+    ])
+
+    assert response.status_code == 200
+    results = response.json()
+    assert [result["event_id"] for result in results] == [1, 2, 404, None, 3]
+    assert [result["accepted"] for result in results] == [True, False, False, False, True]
+    assert results[2]["detail"] == "Событие не найдено"
+    assert all(result["bet_id"] is None for result in results if not result["accepted"])
+    assert results[0]["bet_id"] < results[4]["bet_id"]
+    assert await count_bets(test_db) == 2
+
+
+async def test_bulk_accepts_duplicate_rows_as_separate_bets(client: AsyncClient, redis: FakeRedis, test_db) -> None:
+    response = await client.post("/bet_maker/bets/bulk", json=[{"id": 1, "amount": "10.00"}] * 3)
+
+    results = response.json()
+    assert all(result["accepted"] for result in results)
+    assert len({result["bet_id"] for result in results}) == 3
+    assert await count_bets(test_db) == 3
+    assert (await get_exposure(redis, 1))["bets"] == 3
+
+
+async def test_bulk_rejects_closed_events(client: AsyncClient, redis: FakeRedis, test_db) -> None:
+    await replace_events(redis, [
+        wire_event(1),
+        wire_event(2, status="завершено выигрышем первой команды"),
+        wire_event(3, deadline=int(time.time()) - 60),
+    ], 2)
+
+    response = await client.post("/bet_maker/bets/bulk", json=[
+        {"id": 1, "amount": "10.00"},
+        {"id": 2, "amount": "10.00"},
+        {"id": 3, "amount": "10.00"},
+    ])
+
+    results = response.json()
+    assert [result["accepted"] for result in results] == [True, False, False]
+    assert results[1]["detail"] == "Ставки на завершенные события невозможны"
+    assert results[2]["detail"] == "Дедлайн события истек"
+    assert await count_bets(test_db) == 1
+
+
+async def test_bulk_rejects_rows_over_liability_limit(client: AsyncClient, redis: FakeRedis, test_db) -> None:
+    with patch.object(settings, "MAX_EVENT_LIABILITY", Decimal("20.00")):
+        response = await client.post("/bet_maker/bets/bulk", json=[
+            {"id": 1, "amount": "10.00"},
+            {"id": 1, "amount": "10.00"},
+            {"id": 2, "amount": "10.00"},
+        ])
+
+    results = response.json()
+    assert [result["accepted"] for result in results] == [True, False, True]
+    assert results[1]["detail"] == LIABILITY_LIMIT_DETAIL
+    assert results[1]["bet_id"] is None
+    assert await count_bets(test_db) == 2
+    assert (await get_exposure(redis, 1))["bets"] == 1
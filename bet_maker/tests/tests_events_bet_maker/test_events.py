@@ -0,0 +1,51 @@
+from unittest.mock import patch
+
+from fakeredis.aioredis import FakeRedis
+from redis.exceptions import WatchError
+
+from app.redis import events
+from app.redis.events import REVISION_KEY, apply_events_delta, get_event, get_events_revision, replace_events
+from tests.conftest import wire_event
+
+
+async def test_delta_applied_only_on_matching_revision() -> None:
+    redis = FakeRedis()
+    await replace_events(redis, [wire_event(1)], 5)
+
+    assert await apply_events_delta(redis, [wire_event(2)], [], 4, 6) == 5
+    assert await apply_events_delta(redis, [wire_event(2)], [1], 5, 6) == 5
+
+    assert await get_events_revision(redis) == 6
+    assert await get_event(redis, 1) is None
+    assert await get_event(redis, 2) is not None
+
+
+async def test_delta_not_applied_over_concurrent_update() -> None:
+    redis = FakeRedis()
+    await replace_events(redis, [], 5)
+
+    async def racing_watch(pipe) -> int | None:
+        revision = await watch_revision(pipe)
+        if revision == 5:
+            # Другой consumer успевает применить дельту между проверкой и записью
+            await redis.set(REVISION_KEY, 6)
+        return revision
+
+    watch_revision = events._watch_revision
+    # fakeredis построен на redis-py, у которого свой класс WatchError
+    with patch.object(events, "WatchError", WatchError), patch.object(events, "_watch_revision", racing_watch):
+        assert await apply_events_delta(redis, [wire_event(1)], [], 5, 6) == 6
+
+    assert await get_event(redis, 1) is None
+
+
+async def test_older_snapshot_does_not_replace_catalog() -> None:
+    redis = FakeRedis()
+    await replace_events(redis, [wire_event(1)], 7)
+
+    assert not await replace_events(redis, [wire_event(2)], 6)
+    assert await replace_events(redis, [wire_event(3)], 7)
+
+    assert await get_events_revision(redis) == 7
+    assert await get_event(redis, 1) is None
+    assert await get_event(redis, 3) is not None
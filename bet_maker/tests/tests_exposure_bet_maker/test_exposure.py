@@ -0,0 +1,132 @@
+from decimal import Decimal
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from asyncpg.exceptions import NumericValueOutOfRangeError
+from fakeredis.aioredis import FakeRedis
+from httpx import AsyncClient
+
+from app.config import settings
+from app.db.group_commit import bet_writer
+from app.rabbit.queues import apply_status_updates
+from app.redis.exposure import get_exposure, reserve_exposure
+
+WON = "завершено выигрышем первой команды"
+
+
+async def test_reserve_accepts_bets_up_to_limit() -> None:
+    redis = FakeRedis()
+
+    accepted = await reserve_exposure(redis, [(1, 1000, 1500), (1, 1000, 1500), (1, 1, 1)], max_liability=3000)
+
+    assert accepted == [True, True, False]
+    assert await get_exposure(redis, 1) == {
+        "bets": 2, "stake": 2000, "liability": 3000, "settled_bets": 0, "settled_stake": 0, "payout": 0,
+    }
+
+
+async def test_reserve_without_limit() -> None:
+    redis = FakeRedis()
+
+    assert await reserve_exposure(redis, [(1, 10**9, 10**12)], max_liability=0) == [True]
+
+
+async def test_get_event_exposure(client: AsyncClient) -> None:
+    for _ in range(2):
+        await client.post("/bet_maker/bet", params={"id": 1, "amount": "10.00"})
+
+    response = await client.get("/bet_maker/events/1/exposure")
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "event_id": 1,
+        "bets": 2,
+        "stake": "20.00",
+        "liability": "30.00",
+        "settled_bets": 0,
+        "settled_stake": "0.00",
+        "payout": "0.00",
+        "max_liability": None,
+    }
+
+
+async def test_get_exposure_of_unknown_event(client: AsyncClient) -> None:
+    response = await client.get("/bet_maker/events/404/exposure")
+
+    assert response.status_code == 404
+
+
+async def test_bet_over_limit_is_rejected(client: AsyncClient) -> None:
+    with patch.object(settings, "MAX_EVENT_LIABILITY", Decimal("20.00")):
+        accepted = await client.post("/bet_maker/bet", params={"id": 1, "amount": "10.00"})
+        rejected = await client.post("/bet_maker/bet", params={"id": 1, "amount": "10.00"})
+
+    assert accepted.status_code == 200
+    assert rejected.status_code == 400
+    assert (await client.get("/bet_maker/events/1/exposure")).json()["bets"] == 1
+
+
+async def test_reservation_released_when_insert_rejected(client: AsyncClient, redis: FakeRedis) -> None:
+    rejected = AsyncMock(side_effect=NumericValueOutOfRangeError("numeric field overflow"))
+    with patch.object(bet_writer, "insert", rejected):
+        response = await client.post("/bet_maker/bet", params={"id": 1, "amount": "10.00"})
+
+    assert response.status_code == 500
+    assert await get_exposure(redis, 1) == dict.fromkeys(
+        ("bets", "stake", "liability", "settled_bets", "settled_stake", "payout"), 0
+    )
+
+
+async def test_reservation_kept_when_bet_may_be_written(client: AsyncClient, redis: FakeRedis) -> None:
+    dropped = AsyncMock(side_effect=ConnectionResetError("connection lost during COMMIT"))
+    with patch.object(settings, "MAX_EVENT_LIABILITY", Decimal("20.00")):
+        with patch.object(bet_writer, "insert", dropped):
+            assert (await client.post("/bet_maker/bet", params={"id": 1, "amount": "10.00"})).status_code == 500
+
+        # Ставка могла записаться: её выплата остаётся в лимите
+        response = await client.post("/bet_maker/bet", params={"id": 1, "amount": "10.00"})
+
+    assert response.status_code == 400
+    assert (await get_exposure(redis, 1))["liability"] == 1500
+
+
+async def test_unwritten_reservation_dropped_at_settlement(client: AsyncClient, redis: FakeRedis) -> None:
+    dropped = AsyncMock(side_effect=ConnectionResetError("connection lost during COMMIT"))
+    with patch.object(bet_writer, "insert", dropped):
+        await client.post("/bet_maker/bet", params={"id": 1, "amount": "5.00"})
+    await client.post("/bet_maker/bet", params={"id": 1, "amount": "10.00"})
+
+    await apply_status_updates([{"event_id": 1, "new_status": WON}], redis)
+
+    assert await get_exposure(redis, 1) == {
+        "bets": 0, "stake": 0, "liability": 0, "settled_bets": 1, "settled_stake": 1000, "payout": 1500,
+    }
+
+
+async def test_settlement_moves_bets_to_settled(client: AsyncClient, redis: FakeRedis) -> None:
+    await client.post("/bet_maker/bet", params={"id": 1, "amount": "10.00"})
+
+    await apply_status_updates([{"event_id": 1, "new_status": WON}], redis)
+
+    assert await get_exposure(redis, 1) == {
+        "bets": 0, "stake": 0, "liability": 0, "settled_bets": 1, "settled_stake": 1000, "payout": 1500,
+    }
+
+
+async def test_exposure_rebuilt_when_settlement_update_fails(client: AsyncClient, redis: FakeRedis) -> None:
+    for amount in ("10.00", "5.55"):
+        await client.post("/bet_maker/bet", params={"id": 1, "amount": amount})
+    await client.post("/bet_maker/bet", params={"id": 2, "amount": "1.00"})
+
+    failure = AsyncMock(side_effect=ConnectionError("redis is down"))
+    with patch("app.rabbit.queues.settle_exposure", failure), patch("app.rabbit.queues.set_exposure", failure):
+        with pytest.raises(ConnectionError):
+            await apply_status_updates([{"event_id": 1, "new_status": WON}], redis)
+
+    # Повторная обработка пачки: рассчитывать нечего, но счётчики устарели
+    await apply_status_updates([{"event_id": 1, "new_status": WON}], redis)
+
+    assert await get_exposure(redis, 1) == {
+        "bets": 0, "stake": 0, "liability": 0, "settled_bets": 2, "settled_stake": 1555, "payout": 2333,
+    }
+    assert (await get_exposure(redis, 2))["bets"] == 1
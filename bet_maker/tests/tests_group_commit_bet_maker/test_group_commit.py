@@ -0,0 +1,116 @@
+import asyncio
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from pydantic import ValidationError
+
+from app.db.custom_models import BetAmount
+from app.db.group_commit import GroupCommitWriter
+from app.db.schemas import Status
+
+
+class RejectedRow(Exception):
+    pass
+
+
+class RecordingInsert:
+    """
+    Вставка, которая запоминает пачки и отдаёт строки с последовательными id.
+    """
+
+    def __init__(self, fail: bool = False, reject_event_id: int | None = None):
+        self.batches: list[list[dict]] = []
+        self.fail = fail
+        self.reject_event_id = reject_event_id
+
+    async def __call__(self, rows: list[dict]) -> list[SimpleNamespace]:
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("insert failed")
+        if any(row["event_id"] == self.reject_event_id for row in rows):
+            raise RejectedRow("value out of range")
+        first_id = sum(map(len, self.batches)) + 1
+        self.batches.append(rows)
+        return [SimpleNamespace(id=first_id + index, **values) for index, values in enumerate(rows)]
+
+
+def bet(event_id: int) -> dict:
+    return {"event_id": event_id, "amount": 10, "odds": 2, "status": Status.IN_PROGRESS}
+
+
+async def test_concurrent_inserts_share_one_statement():
+    insert_rows = RecordingInsert()
+    writer = GroupCommitWriter("bets", insert_rows, max_batch=100, max_wait=0.01)
+
+    rows = await asyncio.gather(*(writer.insert(bet(event_id)) for event_id in range(10)))
+
+    assert len(insert_rows.batches) == 1
+    assert [row.event_id for row in rows] == list(range(10))
+    assert len({row.id for row in rows}) == 10
+
+
+async def test_full_batch_is_flushed_without_waiting():
+    insert_rows = RecordingInsert()
+    writer = GroupCommitWriter("bets", insert_rows, max_batch=4, max_wait=10)
+
+    await asyncio.wait_for(asyncio.gather(*(writer.insert(bet(event_id)) for event_id in range(8))), 1)
+
+    assert [len(batch) for batch in insert_rows.batches] == [4, 4]
+
+
+async def test_failure_is_returned_to_every_caller():
+    writer = GroupCommitWriter("bets", RecordingInsert(fail=True), max_batch=100, max_wait=0.01)
+
+    results = await asyncio.gather(*(writer.insert(bet(event_id)) for event_id in range(3)), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+async def test_rejected_batch_is_retried_row_by_row():
+    insert_rows = RecordingInsert(reject_event_id=1)
+    writer = GroupCommitWriter("bets", insert_rows, max_batch=100, max_wait=0.01, row_errors=(RejectedRow,))
+
+    results = await asyncio.gather(*(writer.insert(bet(event_id)) for event_id in range(3)), return_exceptions=True)
+
+    assert isinstance(results[1], RejectedRow)
+    assert [results[0].event_id, results[2].event_id] == [0, 2]
+    assert insert_rows.batches == [[bet(0)], [bet(2)]]
+
+
+async def test_other_errors_are_not_retried():
+    insert_rows = RecordingInsert(fail=True)
+    writer = GroupCommitWriter("bets", insert_rows, max_batch=100, max_wait=0.01, row_errors=(RejectedRow,))
+
+    results = await asyncio.gather(*(writer.insert(bet(event_id)) for event_id in range(3)), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert insert_rows.batches == []
+
+
+@pytest.mark.parametrize("amount, valid", [
+    ("9999999999.99", True),
+    ("10000000000", False),
+    ("10000000000.00", False),
+])
+def test_bet_amount_fits_column(amount: str, valid: bool):
+    if valid:
+        assert BetAmount(id=1, amount=Decimal(amount)).amount == Decimal(amount)
+    else:
+        with pytest.raises(ValidationError):
+            BetAmount(id=1, amount=Decimal(amount))
+
+
+async def test_cancelled_insert_is_skipped():
+    insert_rows = RecordingInsert()
+    writer = GroupCommitWriter("bets", insert_rows, max_batch=100, max_wait=0.01)
+
+    cancelled = asyncio.create_task(writer.insert(bet(1)))
+    kept = asyncio.create_task(writer.insert(bet(2)))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    row = await kept
+    await writer.close()
+
+    assert row.event_id == 2
+    assert insert_rows.batches == [[bet(2)]]
@@ -0,0 +1,98 @@
+import asyncio
+import json
+from decimal import Decimal
+from unittest.mock import AsyncMock, patch
+
+from asyncpg.exceptions import NumericValueOutOfRangeError
+from fakeredis.aioredis import FakeRedis
+from httpx import AsyncClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import settings
+from app.db.group_commit import bet_writer
+from app.db.schemas import Bets
+from app.redis.idempotency import (
+    idempotency_key,
+    release_idempotency_key,
+    reserve_idempotency_key,
+    save_idempotent_response,
+)
+
+
+async def post_bet(client: AsyncClient, key: str, event_id: int = 1, amount: str = "10.00"):
+    return await client.post(
+        "/bet_maker/bet", params={"id": event_id, "amount": amount}, headers={"Idempotency-Key": key}
+    )
+
+
+async def count_bets(engine: AsyncEngine) -> int:
+    async with engine.connect() as connection:
+        return await connection.scalar(select(func.count()).select_from(Bets))
+
+
+async def test_replay_returns_first_response(client: AsyncClient, test_db: AsyncEngine) -> None:
+    first = await post_bet(client, "replay")
+    second = await post_bet(client, "replay")
+
+    assert first.status_code == second.status_code == 200
+    assert second.json() == first.json()
+    assert await count_bets(test_db) == 1
+
+
+async def test_concurrent_requests_collapse(client: AsyncClient, test_db: AsyncEngine) -> None:
+    responses = await asyncio.gather(*(post_bet(client, "concurrent") for _ in range(5)))
+
+    assert {response.status_code for response in responses} == {200}
+    assert len({response.json()["id"] for response in responses}) == 1
+    assert await count_bets(test_db) == 1
+
+
+async def test_key_reused_for_other_bet(client: AsyncClient) -> None:
+    await post_bet(client, "mismatch", amount="10.00")
+
+    response = await post_bet(client, "mismatch", amount="20.00")
+
+    assert response.status_code == 422
+
+
+async def test_conflict_while_first_request_pending(client: AsyncClient, redis: FakeRedis) -> None:
+    fingerprint = f"1:{Decimal('10.00').normalize()}"
+    await redis.set(idempotency_key("pending"), json.dumps({"fingerprint": fingerprint}), ex=30)
+
+    with patch.object(settings, "IDEMPOTENCY_WAIT", 0.1):
+        response = await post_bet(client, "pending")
+
+    assert response.status_code == 409
+
+
+async def test_key_released_when_database_rejects_bet(client: AsyncClient) -> None:
+    rejected = AsyncMock(side_effect=NumericValueOutOfRangeError("numeric field overflow"))
+    with patch.object(bet_writer, "insert", rejected):
+        assert (await post_bet(client, "rejected")).status_code == 500
+
+    assert (await post_bet(client, "rejected")).status_code == 200
+
+
+async def test_key_kept_when_bet_may_be_written(client: AsyncClient, redis: FakeRedis) -> None:
+    dropped = AsyncMock(side_effect=ConnectionResetError("connection lost during COMMIT"))
+    with patch.object(bet_writer, "insert", dropped):
+        assert (await post_bet(client, "unknown")).status_code == 500
+
+    with patch.object(settings, "IDEMPOTENCY_WAIT", 0.1):
+        assert (await post_bet(client, "unknown")).status_code == 409
+    assert await redis.ttl(idempotency_key("unknown")) > 0
+
+
+async def test_expired_request_does_not_touch_retry_reservation(redis: FakeRedis) -> None:
+    await reserve_idempotency_key(redis, "slow", "1:10", "first", pending_ttl=30, wait=0)
+    # Первый запрос работает дольше pending_ttl, ключ резервирует повтор
+    await redis.delete(idempotency_key("slow"))
+    assert await reserve_idempotency_key(redis, "slow", "1:10", "retry", pending_ttl=30, wait=0) is None
+
+    assert not await release_idempotency_key(redis, "slow", "1:10", "first")
+    assert not await save_idempotent_response(redis, "slow", "1:10", "first", 200, {"id": 1}, ttl=60)
+
+    assert json.loads(await redis.get(idempotency_key("slow"))) == {"fingerprint": "1:10", "token": "retry"}
+    assert await save_idempotent_response(redis, "slow", "1:10", "retry", 200, {"id": 2}, ttl=60)
+    assert json.loads(await redis.get(idempotency_key("slow")))["body"] == {"id": 2}
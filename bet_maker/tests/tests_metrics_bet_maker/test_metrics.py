@@ -0,0 +1,43 @@
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.metrics import LoopHistogram, instrument_engine
+
+
+def test_loop_histogram_exports_cumulative_buckets() -> None:
+    histogram = LoopHistogram("test_loop_histogram_seconds", "Test histogram", ("route",), buckets=(0.1, 1.0))
+    for amount in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(("/bet",), amount)
+
+    def sample(suffix: str, **labels) -> float:
+        return REGISTRY.get_sample_value(f"test_loop_histogram_seconds{suffix}", {"route": "/bet", **labels})
+
+    assert sample("_bucket", le="0.1") == 2
+    assert sample("_bucket", le="1.0") == 3
+    assert sample("_bucket", le="+Inf") == 4
+    assert sample("_count") == 4
+    assert sample("_sum") == 3.65
+
+
+async def test_failed_queries_are_timed_and_leave_no_state(test_db: AsyncEngine) -> None:
+    instrument_engine(test_db.sync_engine)
+
+    def sample(outcome: str) -> float:
+        labels = {"statement": "SELECT", "outcome": outcome}
+        return REGISTRY.get_sample_value("db_query_duration_seconds_count", labels) or 0
+
+    ok, error = sample("ok"), sample("error")
+    async with test_db.connect() as connection:
+        with pytest.raises(DBAPIError):
+            await connection.execute(text("SELECT 1 / 0"))
+        await connection.rollback()
+        await connection.execute(text("SELECT 1"))
+
+        raw = await connection.get_raw_connection()
+        assert "query_started_at" not in raw.info
+
+    assert sample("error") == error + 1
+    assert sample("ok") == ok + 1
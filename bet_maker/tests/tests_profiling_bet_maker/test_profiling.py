@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.profiling import ProfilerMiddleware, SamplingProfiler
+
+
+def busy_wait(seconds: float) -> None:
+    started_at = time.perf_counter()
+    while time.perf_counter() - started_at < seconds:
+        pass
+
+
+async def wait_for_io() -> None:
+    await asyncio.sleep(0.05)
+
+
+def make_app(profiler: SamplingProfiler) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/work/{item_id}")
+    async def work(item_id: int) -> dict:
+        busy_wait(0.05)
+        await wait_for_io()
+        return {"id": item_id}
+
+    app.add_middleware(ProfilerMiddleware, profiler=profiler, header="X-Profile")
+    return app
+
+
+async def test_profiles_requests_with_debug_header_per_route() -> None:
+    profiler = SamplingProfiler(interval=0.001)
+    async with AsyncClient(transport=ASGITransport(app=make_app(profiler)), base_url="http://test") as client:
+        await client.get("/work/1")
+        # Запрос без заголовка не профилируется
+        assert profiler.collapsed() == ""
+        await client.get("/work/2", headers={"X-Profile": "1"})
+
+    stacks = {
+        stack.rsplit(" ", 1)[0]: int(stack.rsplit(" ", 1)[1])
+        for stack in profiler.collapsed("GET /work/{item_id}").splitlines()
+    }
+    cpu = sum(weight for stack, weight in stacks.items() if stack.split(";")[-1].startswith("busy_wait"))
+    io = sum(weight for stack, weight in stacks.items() if ";wait_for_io " in stack)
+
+    # В профиль попадает и работа CPU, и ожидание ввода-вывода
+    assert cpu > 0
+    assert io > 0
+
+
+async def test_tracks_background_task_until_it_finishes() -> None:
+    profiler = SamplingProfiler(interval=0.001)
+
+    async def consumer() -> None:
+        for _ in range(5):
+            await wait_for_io()
+
+    task = asyncio.create_task(consumer())
+    profiler.track("task consumer", task)
+    await task
+    await asyncio.sleep(0.05)
+
+    assert "task consumer;consumer" in profiler.collapsed()
+    assert profiler._thread is None
@@ -0,0 +1,101 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.config import settings
+from app.rabbit.rabbit import ATTEMPTS_HEADER, RabbitMQSessionManager
+
+# Пауза перед повтором подменяется, а тесту нужно уступать управление consume_batches
+yield_to_loop = asyncio.sleep
+
+
+def incoming(data: dict, attempts: int | None = None) -> MagicMock:
+    headers = {} if attempts is None else {ATTEMPTS_HEADER: attempts}
+    return MagicMock(
+        body=json.dumps(data).encode(), headers=headers, content_type="application/json", content_encoding=None,
+        ack=AsyncMock(), nack=AsyncMock(),
+    )
+
+
+class FakeBroker:
+    """Соединение с одной очередью: сообщения подаются в consume_batches вручную"""
+
+    def __init__(self):
+        self.deliver = None
+        self.channel = MagicMock(set_qos=AsyncMock(), declare_queue=AsyncMock(side_effect=self.declare_queue))
+        self.channel.default_exchange.publish = AsyncMock()
+        self.connection = MagicMock(channel=AsyncMock(return_value=self.channel), close=AsyncMock())
+
+    async def declare_queue(self, name: str, **kwargs) -> MagicMock:
+        async def consume(callback) -> None:
+            self.deliver = callback
+
+        return MagicMock(consume=consume)
+
+    def published(self) -> list[tuple[str, dict, dict]]:
+        return [
+            (call.kwargs["routing_key"], json.loads(call.args[0].body), call.args[0].headers)
+            for call in self.channel.default_exchange.publish.await_args_list
+        ]
+
+
+async def run_batch(messages: list[MagicMock], handler: AsyncMock) -> FakeBroker:
+    broker = FakeBroker()
+    with patch("app.rabbit.rabbit.aio_pika.connect_robust", AsyncMock(return_value=broker.connection)), \
+            patch("app.rabbit.rabbit.asyncio.sleep", AsyncMock()):
+        task = asyncio.create_task(
+            RabbitMQSessionManager().consume_batches("status_queue", handler, batch_size=len(messages), batch_wait=1)
+        )
+        while broker.deliver is None:
+            await yield_to_loop(0)
+        for message in messages:
+            await broker.deliver(message)
+        while not messages[-1].ack.await_count:
+            await yield_to_loop(0)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    return broker
+
+
+async def test_batch_acked_after_handler() -> None:
+    messages = [incoming({"event_id": 1}), incoming({"event_id": 2})]
+    handler = AsyncMock()
+
+    broker = await run_batch(messages, handler)
+
+    handler.assert_awaited_once_with([{"event_id": 1}, {"event_id": 2}])
+    messages[-1].ack.assert_awaited_once_with(multiple=True)
+    assert broker.published() == []
+
+
+async def test_failed_batch_is_split_and_failing_message_retried() -> None:
+    async def handle(batch: list[dict]) -> None:
+        if {"event_id": 2} in batch:
+            raise ValueError("numeric field overflow")
+
+    handler = AsyncMock(side_effect=handle)
+    messages = [incoming({"event_id": 1}), incoming({"event_id": 2}), incoming({"event_id": 3})]
+
+    broker = await run_batch(messages, handler)
+
+    assert [call.args[0] for call in handler.await_args_list] == [
+        [{"event_id": 1}, {"event_id": 2}, {"event_id": 3}], [{"event_id": 1}], [{"event_id": 2}], [{"event_id": 3}],
+    ]
+    assert broker.published() == [("status_queue", {"event_id": 2}, {ATTEMPTS_HEADER: 1})]
+    messages[-1].ack.assert_awaited_once_with(multiple=True)
+    for message in messages:
+        message.nack.assert_not_awaited()
+
+
+@pytest.mark.parametrize(("attempts", "routing_key"), [
+    (settings.RABBIT_MAX_ATTEMPTS - 2, "status_queue"),
+    (settings.RABBIT_MAX_ATTEMPTS - 1, "status_queue.dead"),
+])
+async def test_message_dead_lettered_after_max_attempts(attempts: int, routing_key: str) -> None:
+    handler = AsyncMock(side_effect=ValueError("numeric field overflow"))
+
+    broker = await run_batch([incoming({"event_id": 2}, attempts)], handler)
+
+    assert broker.published() == [(routing_key, {"event_id": 2}, {ATTEMPTS_HEADER: attempts + 1})]
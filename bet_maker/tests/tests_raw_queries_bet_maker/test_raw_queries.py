@@ -0,0 +1,78 @@
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy import insert, text
+
+from app.db import raw_queries
+from app.db.archive import bets_archiver
+from app.db.raw_queries import bet_to_json, fetch_bets_page, insert_bets
+from app.db.schemas import BetsArchive, Status
+
+
+def new_bet(event_id: int, amount: str = "10.00") -> dict:
+    return {"event_id": event_id, "amount": Decimal(amount), "odds": Decimal("1.5"), "status": Status.IN_PROGRESS}
+
+
+async def test_insert_bets_returns_rows_in_argument_order(test_db) -> None:
+    rows = await insert_bets([new_bet(3, "30.00"), new_bet(1, "10.00"), new_bet(2, "20.50")])
+
+    assert [row["event_id"] for row in rows] == [3, 1, 2]
+    assert [row["amount"] for row in rows] == [30.0, 10.0, 20.5]
+    assert [row["id"] for row in rows] == sorted(row["id"] for row in rows)
+    assert rows[0] == {
+        "id": rows[0]["id"], "event_id": 3, "amount": 30.0, "odds": 1.5,
+        "status": Status.IN_PROGRESS.value, "payout": None,
+    }
+
+
+async def test_insert_bets_rejects_row_count_mismatch() -> None:
+    connection = MagicMock(fetch=AsyncMock(return_value=[]))
+    connection_cm = MagicMock(__aenter__=AsyncMock(return_value=connection), __aexit__=AsyncMock(return_value=None))
+
+    with patch.object(raw_queries, "raw_connection", return_value=connection_cm):
+        with pytest.raises(RuntimeError):
+            await insert_bets([new_bet(1)])
+
+
+def test_bet_to_json() -> None:
+    row = {
+        "id": 7, "event_id": 2, "amount": Decimal("12.34"), "odds": Decimal("1.7500"),
+        "status": Status.WIN.name, "payout": Decimal("21.60"),
+    }
+
+    assert bet_to_json(row) == {
+        "id": 7, "event_id": 2, "amount": 12.34, "odds": 1.75, "status": Status.WIN.value, "payout": 21.6,
+    }
+    assert bet_to_json({**row, "status": Status.IN_PROGRESS.name, "payout": None})["payout"] is None
+
+
+async def test_fetch_bets_page_reads_both_tables_by_cursor(test_db) -> None:
+    settled_at = datetime(2026, 10, 1, 12, 0, tzinfo=timezone.utc)
+    with patch.object(bets_archiver, "engine", test_db), patch.object(bets_archiver, "_partitions", set()):
+        await bets_archiver.ensure_partition(settled_at)
+    async with test_db.begin() as connection:
+        await connection.execute(insert(BetsArchive), [
+            {"id": bet_id, "event_id": 1, "amount": Decimal("10.00"), "odds": Decimal("1.5"),
+             "status": Status.FAIL, "payout": Decimal("0"), "settled_at": settled_at}
+            for bet_id in (1, 2)
+        ])
+        await connection.execute(text("SELECT setval(pg_get_serial_sequence('bets', 'id'), 2)"))
+    await insert_bets([new_bet(2), new_bet(3), new_bet(3)])
+
+    first, cursor = await fetch_bets_page(None, 3)
+    second, last_cursor = await fetch_bets_page(cursor, 3)
+
+    assert json.loads(first) == [
+        {"id": 1, "event_id": 1, "status": Status.FAIL.value},
+        {"id": 2, "event_id": 1, "status": Status.FAIL.value},
+        {"id": 3, "event_id": 2, "status": Status.IN_PROGRESS.value},
+    ]
+    assert cursor == 3
+    assert json.loads(second) == [
+        {"id": 4, "event_id": 3, "status": Status.IN_PROGRESS.value},
+        {"id": 5, "event_id": 3, "status": Status.IN_PROGRESS.value},
+    ]
+    assert last_cursor is None
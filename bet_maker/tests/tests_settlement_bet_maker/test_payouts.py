@@ -0,0 +1,75 @@
+import random
+from decimal import Decimal
+
+import numpy as np
+
+from app.settlement.payouts import (
+    AMOUNT_SCALE,
+    ODDS_SCALE,
+    EventTotals,
+    bet_exposure,
+    calculate_payouts,
+    payout_decimal,
+    settle,
+)
+
+
+def test_payouts_match_decimal_rounding() -> None:
+    rng = random.Random(42)
+    amounts = [Decimal(rng.randint(1, 10_000_000)) / AMOUNT_SCALE for _ in range(10_000)]
+    odds = [Decimal(rng.randint(10_000, 1_000_000)) / ODDS_SCALE for _ in range(10_000)]
+    won = [rng.random() < 0.5 for _ in range(10_000)]
+
+    payouts = calculate_payouts(
+        np.array([int(amount * AMOUNT_SCALE) for amount in amounts], dtype=np.int64),
+        np.array([int(odd * ODDS_SCALE) for odd in odds], dtype=np.int64),
+        np.array(won),
+    )
+
+    expected = [payout_decimal(amount, odd, is_won) * AMOUNT_SCALE for amount, odd, is_won in zip(amounts, odds, won)]
+    assert payouts.tolist() == [int(value) for value in expected]
+
+
+def test_payout_rounds_half_up() -> None:
+    # 10.01 * 1.5 = 15.015
+    assert calculate_payouts(np.array([1001]), np.array([15000]), np.array([True])).tolist() == [1502]
+    assert payout_decimal(Decimal("10.01"), Decimal("1.5"), True) == Decimal("15.02")
+
+
+def test_payouts_without_int64_overflow() -> None:
+    amounts = np.array([2**62, 100], dtype=np.int64)
+    odds = np.array([25_000, 25_000], dtype=np.int64)
+
+    payouts = calculate_payouts(amounts, odds, np.array([True, False]))
+
+    assert payouts.tolist() == [(2**62 * 25_000 + 5_000) // 10_000, 0]
+
+
+def test_settle_totals() -> None:
+    settlement = settle([1, 2, 3], [7, 7, 8], [1000, 2000, 500], [20_000, 15_000, 30_000], [True, False, True])
+
+    assert settlement.bet_ids.tolist() == [1, 2, 3]
+    assert settlement.payouts.tolist() == [2000, 0, 1500]
+    assert settlement.turnover == 3500
+    assert settlement.payout_total == 3500
+    assert settlement.house_pnl == 0
+    assert settlement.totals_by_event() == {
+        7: EventTotals(bets=2, stake=3000, liability=5000, payout=2000),
+        8: EventTotals(bets=1, stake=500, liability=1500, payout=1500),
+    }
+
+
+def test_settle_empty() -> None:
+    settlement = settle([], [], [], [], [])
+
+    assert len(settlement.payouts) == 0
+    assert settlement.turnover == 0
+    assert settlement.house_pnl == 0
+    assert settlement.totals_by_event() == {}
+
+
+def test_bet_exposure_matches_settlement() -> None:
+    stake, liability = bet_exposure(Decimal("10.01"), Decimal("1.50005"))
+
+    assert (stake, liability) == (1001, 1502)
+    assert settle([1], [7], [stake], [15_001], [True]).liabilities.tolist() == [liability]
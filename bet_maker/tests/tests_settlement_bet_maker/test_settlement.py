@@ -0,0 +1,27 @@
+from decimal import Decimal
+
+from fakeredis.aioredis import FakeRedis
+from httpx import AsyncClient
+from sqlalchemy import select
+
+from app.db.custom_models import MAX_BET_AMOUNT
+from app.db.schemas import Bets, Status
+from app.rabbit.queues import apply_status_updates
+from app.redis.events import replace_events
+from tests.conftest import wire_event
+
+WON = "завершено выигрышем первой команды"
+
+
+async def test_settles_maximum_bet_at_maximum_odds(client: AsyncClient, redis: FakeRedis, test_db) -> None:
+    # Коэффициент 150.0000 на проводе
+    await replace_events(redis, [wire_event(1, odds=1_500_000)], 2)
+    response = await client.post("/bet_maker/bet", params={"id": 1, "amount": str(MAX_BET_AMOUNT)})
+    assert response.status_code == 200
+
+    await apply_status_updates([{"event_id": 1, "new_status": WON}], redis)
+
+    async with test_db.connect() as connection:
+        bet = (await connection.execute(select(Bets.status, Bets.payout))).one()
+    assert bet.status == Status.WIN
+    assert bet.payout == Decimal("1499999999998.50")
@@ -1,23 +1,65 @@
+import json
 import logging
+from collections.abc import AsyncIterator
 
-from fastapi import APIRouter, Depends, HTTPException, Body
-from sqlalchemy import select, update
+from fastapi import APIRouter, Depends, HTTPException, Body, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import Select, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.db import get_db
+from app.db.leader import leader_election
 from app.db.models import EventsModel, Status
-from app.db.schemas import Events
-from app.rabbit.rabbit import RabbitMQSessionManager
+from app.db.replicas import get_read_db, read_replicas
+from app.db.schemas import DeletedEvents, Events, events_revision_seq
+from app.rabbit.deadlines import deadline_scheduler
+from app.rabbit.queues import serialize_event
+from app.rabbit.rabbit import RabbitMQSessionManager, get_rabbitmq
 
 logger = logging.getLogger(__name__)
 
 router_line_provider = APIRouter()
 
+STREAM_CHUNK_SIZE = 1000
+
+def events_page_query(after_id: int | None) -> Select:
+    query = select(Events).order_by(Events.id)
+    if after_id is not None:
+        query = query.where(Events.id > after_id)
+    return query
+
+
+async def stream_events(after_id: int | None) -> AsyncIterator[str]:
+    """
+    Отдаёт события в формате NDJSON, читая их серверным курсором порциями.
+    """
+    async with read_replicas.sessionmaker()() as session:
+        result = await session.stream_scalars(
+            events_page_query(after_id).execution_options(yield_per=STREAM_CHUNK_SIZE)
+        )
+        async for events in result.partitions():
+            yield "".join(
+                json.dumps(jsonable_encoder(event), ensure_ascii=False) + "\n" for event in events
+            )
+
+
 @router_line_provider.get("/events")
-async def get_events(session: AsyncSession = Depends(get_db)):
-    query = select(Events)
-    result = await session.execute(query)
+async def get_events(
+        response: Response,
+        after_id: int | None = None,
+        limit: int = Query(default=1000, ge=1, le=10000),
+        stream: bool = False,
+        session: AsyncSession = Depends(get_read_db),
+):
+    if stream:
+        return StreamingResponse(stream_events(after_id), media_type="application/x-ndjson")
+
+    result = await session.execute(events_page_query(after_id).limit(limit))
     events = result.scalars().all()
+    if len(events) == limit:
+        response.headers["X-Next-Cursor"] = str(events[-1].id)
     return events
 
 @router_line_provider.post("/event")
@@ -30,8 +72,71 @@ async def create_event(event: EventsModel=Depends(), session: AsyncSession = Dep
     session.add(new_event)
     await session.commit()
     await session.refresh(new_event)
+    # Дедлайны закрывает только лидер; остальные экземпляры узнают о событии из ленты
+    if leader_election.is_leader:
+        deadline_scheduler.track([serialize_event(new_event)])
     return new_event
 
+def parse_bulk_body(body: bytes, content_type: str) -> tuple[list[tuple[int, object]], list[dict]]:
+    """
+    Разбирает тело запроса (JSON-массив или NDJSON) в пары (номер строки, объект).
+    Строки NDJSON с невалидным JSON попадают в ошибки, остальные разбираются дальше.
+    """
+    if content_type.startswith("application/x-ndjson"):
+        try:
+            text = body.decode()
+        except UnicodeDecodeError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid UTF-8: {e}")
+        rows, errors = [], []
+        for index, line in enumerate(text.splitlines()):
+            if not line.strip():
+                continue
+            try:
+                rows.append((index, json.loads(line)))
+            except json.JSONDecodeError as e:
+                errors.append({"index": index, "errors": [{"type": "json_invalid", "msg": str(e)}]})
+        return rows, errors
+
+    try:
+        data = json.loads(body)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+    if not isinstance(data, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of events")
+    return list(enumerate(data)), []
+
+
+@router_line_provider.post("/events/bulk")
+async def create_events_bulk(request: Request, session: AsyncSession = Depends(get_db)):
+    rows, errors = parse_bulk_body(await request.body(), request.headers.get("content-type", ""))
+
+    valid_rows = []
+    for index, row in rows:
+        try:
+            event = EventsModel.model_validate(row)
+        except ValidationError as e:
+            errors.append({"index": index, "errors": e.errors(include_url=False, include_context=False)})
+            continue
+        valid_rows.append({"odds": event.odds, "deadline": event.deadline, "status": event.status})
+
+    ids = []
+    if valid_rows:
+        result = await session.execute(
+            insert(Events).returning(Events.id, sort_by_parameter_order=True),
+            valid_rows,
+        )
+        ids = list(result.scalars().all())
+        await session.commit()
+        if leader_election.is_leader:
+            deadline_scheduler.track(
+                {"id": event_id, "deadline": row["deadline"], "status": row["status"].value}
+                for event_id, row in zip(ids, valid_rows)
+            )
+
+    # Ошибки разбора NDJSON собраны раньше ошибок валидации
+    errors.sort(key=lambda error: error["index"])
+    return {"ids": ids, "errors": errors}
+
 @router_line_provider.delete("/event/{event_id}")
 async def delete_event(event_id: int, session: AsyncSession = Depends(get_db)):
     result = await session.execute(select(Events).where(Events.id == event_id))
@@ -41,7 +146,10 @@ async def delete_event(event_id: int, session: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Event not found")
 
     await session.delete(event)
+    session.add(DeletedEvents(event_id=event_id))
     await session.commit()
+    if leader_election.is_leader:
+        deadline_scheduler.cancel(event_id)
 
     return {"detail": f"Event with id {event_id} deleted successfully"}
 
@@ -50,7 +158,7 @@ async def update_event_status(
         event_id: int,
         new_status: Status,
         session: AsyncSession = Depends(get_db),
-        rabbitmq: RabbitMQSessionManager = Depends(RabbitMQSessionManager)
+        rabbitmq: RabbitMQSessionManager = Depends(get_rabbitmq)
 ):
     try:
         result = await session.execute(select(Events).where(Events.id == event_id))
@@ -62,16 +170,20 @@ async def update_event_status(
         await session.execute(
             update(Events)
             .where(Events.id == event_id)
-            .values(status=new_status)
+            .values(status=new_status, revision=events_revision_seq.next_value())
         )
         await session.commit()
+        if leader_election.is_leader:
+            deadline_scheduler.track([{"id": event_id, "deadline": event.deadline, "status": new_status.value}])
 
+        # Без подтверждения брокера потерянное сообщение оставило бы ставки нерассчитанными
         await rabbitmq.publish_message(
             queue_name="event_status_update_queue",
             message={
                 "event_id": event_id,
                 "new_status": new_status.value
-            }
+            },
+            wait_for_confirm=True,
         )
 
         return {"message": "Status updated successfully", "event_id": event_id, "new_status": new_status.value}
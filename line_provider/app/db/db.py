@@ -4,8 +4,10 @@ from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from app.config import settings
+from app.metrics import instrument_engine
 
 engine = create_async_engine(settings.get_db_url, echo=False)
+instrument_engine(engine.sync_engine)
 
 AsyncSessionLocal = async_sessionmaker(
     bind=engine,
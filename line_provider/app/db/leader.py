@@ -0,0 +1,128 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from app.config import settings
+from app.db.db import engine
+from app.metrics import LEADER
+
+logger = logging.getLogger(__name__)
+
+TRY_LOCK = text("SELECT pg_try_advisory_lock(hashtext(:name))")
+HEARTBEAT = text("SELECT 1")
+# Если хост лидера пропал, сервер снимает блокировку, только когда закроет сессию.
+# С настройками ОС по умолчанию он замечает обрыв через несколько часов
+SET_KEEPALIVE = text("""
+    SELECT set_config('tcp_keepalives_idle', :idle, false),
+           set_config('tcp_keepalives_interval', :interval, false),
+           set_config('tcp_keepalives_count', :count, false),
+           set_config('tcp_user_timeout', :user_timeout, false)
+""")
+
+
+class LeaderElection:
+    """
+    Выбирает экземпляр, выполняющий фоновые задачи: лидер держит advisory-блокировку Postgres.
+    """
+
+    def __init__(
+            self,
+            engine: AsyncEngine,
+            name: str,
+            retry_interval: float,
+            heartbeat_interval: float,
+            keepalive: tuple[int, int, int] = (5, 2, 3),
+    ):
+        self.engine = engine
+        self.name = name
+        self.retry_interval = retry_interval
+        self.heartbeat_interval = heartbeat_interval
+        # Простой, интервал и число проб TCP keepalive сессии с блокировкой, в секундах
+        self.keepalive = keepalive
+        self.is_leader = False
+
+    async def run(
+            self,
+            tasks: dict[str, Callable[[], Awaitable[None]]],
+            on_elected: Callable[[dict[str, asyncio.Task]], None] | None = None,
+    ) -> None:
+        """
+        Запускает tasks, пока экземпляр остаётся лидером; on_elected получает
+        запущенные задачи при каждом избрании.
+        """
+        while True:
+            try:
+                async with self.engine.connect() as connection:
+                    # Без открытой транзакции лидер не висит в idle in transaction
+                    await connection.execution_options(isolation_level="AUTOCOMMIT")
+                    if await connection.scalar(TRY_LOCK, {"name": self.name}):
+                        try:
+                            await self._set_keepalive(connection)
+                            await self._lead(connection, tasks, on_elected)
+                        finally:
+                            # Закрытое соединение не вернётся в пул с неснятой блокировкой
+                            await connection.invalidate()
+            except Exception as e:
+                logger.error(f"Leader election {self.name} failed: {e}")
+            await asyncio.sleep(self.retry_interval)
+
+    async def _set_keepalive(self, connection: AsyncConnection) -> None:
+        idle, interval, count = self.keepalive
+        await connection.execute(SET_KEEPALIVE, {
+            "idle": str(idle),
+            "interval": str(interval),
+            "count": str(count),
+            "user_timeout": str((idle + interval * count) * 1000),
+        })
+
+    async def _lead(
+            self,
+            connection: AsyncConnection,
+            tasks: dict[str, Callable[[], Awaitable[None]]],
+            on_elected: Callable[[dict[str, asyncio.Task]], None] | None,
+    ) -> None:
+        running = {name: asyncio.create_task(factory()) for name, factory in tasks.items()}
+        self.is_leader = True
+        LEADER.labels(self.name).set(1)
+        logger.info(f"Elected leader for {self.name}, running {', '.join(running)}")
+        if on_elected is not None:
+            on_elected(running)
+
+        loop = asyncio.get_running_loop()
+        next_heartbeat = loop.time() + self.heartbeat_interval
+        try:
+            while True:
+                done, _ = await asyncio.wait(running.values(), timeout=max(next_heartbeat - loop.time(), 0))
+                for task in done:
+                    # Задачи рассчитаны на бесконечную работу: завершившаяся перезапускается с паузой
+                    name = next(name for name, running_task in running.items() if running_task is task)
+                    # exception() у отменённой задачи сама бросает CancelledError
+                    reason = "cancelled" if task.cancelled() else repr(task.exception())
+                    logger.error(f"{name} stopped while leading {self.name}: {reason}, restarting")
+                    running[name] = asyncio.create_task(self._restart(tasks[name]))
+                if loop.time() >= next_heartbeat:
+                    await asyncio.wait_for(connection.execute(HEARTBEAT), self.heartbeat_interval)
+                    next_heartbeat = loop.time() + self.heartbeat_interval
+        finally:
+            self.is_leader = False
+            LEADER.labels(self.name).set(0)
+            for task in running.values():
+                task.cancel()
+            await asyncio.gather(*running.values(), return_exceptions=True)
+            logger.warning(f"Stepped down as leader for {self.name}")
+
+    async def _restart(self, factory: Callable[[], Awaitable[None]]) -> None:
+        await asyncio.sleep(self.retry_interval)
+        await factory()
+
+
+leader_election = LeaderElection(
+    engine,
+    name="line_provider.events_producer",
+    retry_interval=settings.LEADER_RETRY_INTERVAL,
+    heartbeat_interval=settings.LEADER_HEARTBEAT_INTERVAL,
+    keepalive=(settings.LEADER_KEEPALIVE_IDLE, settings.LEADER_KEEPALIVE_INTERVAL, settings.LEADER_KEEPALIVE_COUNT),
+)
@@ -0,0 +1,48 @@
+"""0002
+
+Revision ID: 3f2a9c1d7e44
+Revises: be7c98559065
+Create Date: 2026-10-18 10:12:41.218305
+
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3f2a9c1d7e44"
+down_revision: str | None = "be7c98559065"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(sa.schema.CreateSequence(sa.Sequence("events_revision_seq")))
+    # Существующие строки получают ревизии из последовательности при добавлении колонки
+    op.add_column(
+        "events",
+        sa.Column(
+            "revision",
+            sa.BigInteger(),
+            server_default=sa.text("nextval('events_revision_seq')"),
+            nullable=False,
+        ),
+    )
+    op.create_index(op.f("ix_events_revision"), "events", ["revision"], unique=False)
+    op.create_table("deleted_events",
+    sa.Column("event_id", sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column("revision", sa.BigInteger(), server_default=sa.text("nextval('events_revision_seq')"), nullable=False),
+    sa.PrimaryKeyConstraint("event_id")
+    )
+    op.create_index(op.f("ix_deleted_events_revision"), "deleted_events", ["revision"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_deleted_events_revision"), table_name="deleted_events")
+    op.drop_table("deleted_events")
+    op.drop_index(op.f("ix_events_revision"), table_name="events")
+    op.drop_column("events", "revision")
+    op.execute(sa.schema.DropSequence(sa.Sequence("events_revision_seq")))
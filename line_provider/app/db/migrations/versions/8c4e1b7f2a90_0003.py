@@ -0,0 +1,43 @@
+"""0003
+
+Revision ID: 8c4e1b7f2a90
+Revises: 3f2a9c1d7e44
+Create Date: 2026-10-18 16:40:12.514207
+
+"""
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8c4e1b7f2a90"
+down_revision: str | None = "3f2a9c1d7e44"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+TABLES = ("events", "deleted_events")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Изменяющие события транзакции держат разделяемую блокировку ревизий до фиксации
+    op.execute("""
+        CREATE OR REPLACE FUNCTION events_revision_lock() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_advisory_xact_lock_shared(hashtext('events_revision'));
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    for table_name in TABLES:
+        op.execute(
+            f"CREATE TRIGGER {table_name}_revision_lock BEFORE INSERT OR UPDATE ON {table_name} "
+            f"FOR EACH STATEMENT EXECUTE FUNCTION events_revision_lock()"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table_name in TABLES:
+        op.execute(f"DROP TRIGGER {table_name}_revision_lock ON {table_name}")
+    op.execute("DROP FUNCTION events_revision_lock()")
@@ -1,6 +1,6 @@
 from decimal import Decimal
 
-from sqlalchemy import Numeric
+from sqlalchemy import DDL, BigInteger, Numeric, Sequence, event
 from sqlalchemy.ext.asyncio import AsyncAttrs, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, Mapped, declared_attr, mapped_column
 from stringcase import snakecase
@@ -22,8 +22,58 @@ class Base(AsyncAttrs, DeclarativeBase):
         return snakecase(cls.__name__)
 
 
+# Общий счётчик ревизий для ленты изменений: каждая вставка, изменение
+# или удаление события получает следующее значение.
+events_revision_seq = Sequence("events_revision_seq", metadata=Base.metadata)
+
+
 class Events(Base):
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True, nullable=False)
     odds: Mapped[Decimal] = mapped_column(Numeric, nullable=False)
     deadline: Mapped[int] = mapped_column(nullable=False)
     status: Mapped[Status] = mapped_column(nullable=False)
+    revision: Mapped[int] = mapped_column(
+        BigInteger,
+        server_default=events_revision_seq.next_value(),
+        nullable=False,
+        index=True,
+    )
+
+
+class DeletedEvents(Base):
+    event_id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False, nullable=False)
+    revision: Mapped[int] = mapped_column(
+        BigInteger,
+        server_default=events_revision_seq.next_value(),
+        nullable=False,
+        index=True,
+    )
+
+
+# Транзакция, берущая ревизии, держит разделяемую блокировку до фиксации. Триггер
+# уровня оператора срабатывает до вычисления nextval, поэтому ревизия, выданная до
+# исключительного захвата блокировки лентой изменений, уже зафиксирована или отменена.
+REVISION_LOCK_KEY = "events_revision"
+
+CREATE_REVISION_LOCK_FUNCTION = DDL(f"""
+    CREATE OR REPLACE FUNCTION events_revision_lock() RETURNS trigger AS $$
+    BEGIN
+        PERFORM pg_advisory_xact_lock_shared(hashtext('{REVISION_LOCK_KEY}'));
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+""")
+DROP_REVISION_LOCK_FUNCTION = DDL("DROP FUNCTION IF EXISTS events_revision_lock()")
+
+
+def revision_lock_trigger(table_name: str) -> DDL:
+    return DDL(
+        f"CREATE TRIGGER {table_name}_revision_lock BEFORE INSERT OR UPDATE ON {table_name} "
+        f"FOR EACH STATEMENT EXECUTE FUNCTION events_revision_lock()"
+    )
+
+
+event.listen(Base.metadata, "before_create", CREATE_REVISION_LOCK_FUNCTION)
+event.listen(Base.metadata, "after_drop", DROP_REVISION_LOCK_FUNCTION)
+for table in (Events.__table__, DeletedEvents.__table__):
+    event.listen(table, "after_create", revision_lock_trigger(table.name))
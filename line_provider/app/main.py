@@ -7,7 +7,13 @@ from fastapi import FastAPI
 from app.api.routers_bind import router_base
 from app.config import settings, setup_logging
 from app.db.db import engine
-from app.rabbit.queues import events_producer
+from app.db.leader import leader_election
+from app.db.replicas import read_replicas
+from app.metrics import MetricsMiddleware, metrics_endpoint
+from app.profiling import ProfilerMiddleware, profile_endpoint, profiler
+from app.rabbit.deadlines import deadline_scheduler
+from app.rabbit.queues import events_producer, resync_requests_consumer
+from app.rabbit.rabbit import rabbitmq_manager
 
 setup_logging(settings.LOG_LEVEL)
 logger = logging.getLogger(__name__)
@@ -16,16 +22,38 @@ logger = logging.getLogger(__name__)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("Lifespan_запущен")
-    task = asyncio.create_task(events_producer())
+
+    def on_elected(tasks: dict[str, asyncio.Task]) -> None:
+        if settings.PROFILER_ENABLED and settings.PROFILER_BACKGROUND_TASKS:
+            profiler.track("task events_producer", tasks["events_producer"])
+
+    # Лента событий, запросы снимков и закрытие по дедлайнам нужны в одном
+    # экземпляре сервиса: их выполняет только избранный лидер
+    leader_task = asyncio.create_task(leader_election.run(
+        {
+            "events_producer": events_producer,
+            "resync_requests_consumer": resync_requests_consumer,
+            "deadline_scheduler": deadline_scheduler.run,
+        },
+        on_elected=on_elected,
+    ))
+    replicas_task = asyncio.create_task(read_replicas.monitor())
     yield
-    task.cancel()
-    await engine.dispose()
+    leader_task.cancel()
+    replicas_task.cancel()
     try:
-        await task
+        await asyncio.gather(leader_task, replicas_task)
     except asyncio.CancelledError:
         print("Фоновая задача остановлена")
-
+    await rabbitmq_manager.close()
+    await read_replicas.dispose()
+    await engine.dispose()
 
 app = FastAPI(lifespan=lifespan, title="line_provider", description="API provides information about events that ca be bet on", version="0.0.1")
 
 app.include_router(router_base)
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+if settings.PROFILER_ENABLED:
+    app.add_middleware(ProfilerMiddleware, sample_rate=settings.PROFILER_SAMPLE_RATE, header=settings.PROFILER_HEADER)
+    app.add_route("/admin/profile", profile_endpoint, methods=["GET", "DELETE"], include_in_schema=False)
+app.add_middleware(MetricsMiddleware)
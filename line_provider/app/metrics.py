@@ -0,0 +1,155 @@
+# Общая часть совпадает с bet_maker/app/metrics.py, различаются только метрики сервиса
+import time
+from bisect import bisect_left
+from itertools import accumulate
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import HistogramMetricFamily
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+from starlette.responses import Response
+
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class LoopHistogram:
+    """
+    Гистограмма для горячего пути запроса. В отличие от Histogram из
+    prometheus_client, не берёт блокировку на каждый бакет: замер - это поиск
+    бакета и два сложения, поэтому обновлять её можно только из потока event loop.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets=FAST_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._upper_bounds = list(buckets)
+        self._series: dict[tuple, list] = {}
+        REGISTRY.register(self)
+
+    def observe(self, labelvalues: tuple, amount: float) -> None:
+        series = self._series.get(labelvalues)
+        if series is None:
+            # Сумма, затем счётчики бакетов, последний - +Inf
+            series = self._series[labelvalues] = [0.0] + [0] * (len(self._upper_bounds) + 1)
+        series[0] += amount
+        series[bisect_left(self._upper_bounds, amount) + 1] += 1
+
+    def collect(self):
+        family = HistogramMetricFamily(self.name, self.documentation, labels=self.labelnames)
+        bounds = [str(bound) for bound in self._upper_bounds] + ["+Inf"]
+        for labelvalues, series in list(self._series.items()):
+            family.add_metric(
+                [str(value) for value in labelvalues],
+                list(zip(bounds, accumulate(series[1:]))),
+                series[0],
+            )
+        yield family
+
+
+HTTP_REQUEST_DURATION = LoopHistogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route", "status")
+)
+DB_QUERY_DURATION = LoopHistogram("db_query_duration_seconds", "DB statement latency", ("statement", "outcome"))
+DB_COMMIT_DURATION = LoopHistogram("db_commit_duration_seconds", "DB session commit latency")
+REPLICA_LAG = Gauge("db_replica_lag_seconds", "Replication lag of read replicas", ["replica"])
+RABBIT_PUBLISH_DURATION = Histogram(
+    "rabbitmq_publish_duration_seconds", "RabbitMQ publish latency", ["queue"], buckets=FAST_BUCKETS
+)
+RABBIT_MESSAGE_SIZE = Histogram(
+    "rabbitmq_message_size_bytes", "Published message body size", ["queue"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216),
+)
+RABBIT_MESSAGES_CONSUMED = Counter("rabbitmq_messages_consumed_total", "Consumed messages", ["queue"])
+RABBIT_MESSAGES_FAILED = Counter(
+    "rabbitmq_messages_failed_total", "Messages that failed to decode or process", ["queue"]
+)
+RABBIT_COMPRESSION_BYTES = Counter(
+    "rabbitmq_compression_bytes_total", "Bytes before and after compression", ["direction", "stage"]
+)
+RABBIT_COMPRESSION_CPU = Counter(
+    "rabbitmq_compression_cpu_seconds_total", "CPU time spent on compression", ["direction"]
+)
+PRODUCER_CYCLE_DURATION = Histogram(
+    "events_producer_cycle_duration_seconds", "Duration of one events_producer cycle", ["type"], buckets=FAST_BUCKETS
+)
+LEADER = Gauge("leader_election_is_leader", "1 while this instance holds the leader lock", ["name"])
+SNAPSHOT_EVENTS = Gauge("events_snapshot_events", "Number of events in the last published snapshot")
+
+
+class MetricsMiddleware:
+    """
+    Гистограмма длительности запросов по шаблону маршрута, методу и коду ответа.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.observe(
+                (scope["method"], route.path if route is not None else "unmatched", status_code),
+                time.perf_counter() - started_at,
+            )
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Замеряет время выполнения каждого запроса к БД и фиксации транзакций сессий.
+    """
+
+    # Время начала хранится в контексте выполнения, а не на соединении пула:
+    # после ошибки запроса after_cursor_execute не вызывается
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        context.query_started_at = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        observe_query(statement, "ok", context.query_started_at)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context) -> None:
+        started_at = getattr(exception_context.execution_context, "query_started_at", None)
+        if started_at is not None:
+            observe_query(exception_context.statement, "error", started_at)
+
+
+def observe_query(statement: str, outcome: str, started_at: float) -> None:
+    DB_QUERY_DURATION.observe(
+        (statement.lstrip().split(None, 1)[0].upper(), outcome), time.perf_counter() - started_at
+    )
+
+
+@event.listens_for(Session, "before_commit")
+def before_commit(session) -> None:
+    session.info["commit_started_at"] = time.perf_counter()
+
+
+@event.listens_for(Session, "after_commit")
+def after_commit(session) -> None:
+    started_at = session.info.pop("commit_started_at", None)
+    if started_at is not None:
+        DB_COMMIT_DURATION.observe((), time.perf_counter() - started_at)
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
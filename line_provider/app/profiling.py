@@ -0,0 +1,195 @@
+# Копия bet_maker/app/profiling.py: сервисы собираются отдельно, правки вносятся в обе
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from types import CodeType, FrameType
+
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+
+from app.config import settings
+
+
+class ProfileTarget:
+    __slots__ = ("task", "root", "label", "stacks")
+
+    def __init__(self, task: asyncio.Task, root: FrameType, label: str):
+        self.task = task
+        self.root = root
+        self.label = label
+        self.stacks: Counter[str] = Counter()
+
+
+class SamplingProfiler:
+    """
+    Сэмплирующий профилировщик корутин: копит стеки отслеживаемых задач вместе с ожиданием ввода-вывода.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks: dict[str, Counter[str]] = {}
+        self._targets: list[ProfileTarget] = []
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._loop_thread_id: int | None = None
+        self._frame_names: dict[CodeType, str] = {}
+
+    def track(self, label: str, task: asyncio.Task | None = None, root: FrameType | None = None) -> ProfileTarget:
+        """
+        Начинает профилировать задачу (по умолчанию текущую). Стек берётся от
+        кадра root, по умолчанию от корутины задачи. Вызывается из потока event loop.
+        """
+        task = task or asyncio.current_task()
+        target = ProfileTarget(task, root or task.get_coro().cr_frame, label)
+        with self._lock:
+            self._loop_thread_id = threading.get_ident()
+            self._targets.append(target)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+                self._thread.start()
+        return target
+
+    def untrack(self, target: ProfileTarget) -> None:
+        with self._lock:
+            if target in self._targets:
+                self._finish(target)
+
+    def _finish(self, target: ProfileTarget) -> None:
+        self._targets.remove(target)
+        if target.stacks:
+            self.stacks.setdefault(target.label, Counter()).update(target.stacks)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stacks.clear()
+            for target in self._targets:
+                target.stacks.clear()
+
+    def collapsed(self, label: str | None = None) -> str:
+        """
+        Накопленные стеки строками "метка;кадр;...;кадр микросекунды".
+        """
+        with self._lock:
+            totals: dict[str, Counter[str]] = {name: Counter(stacks) for name, stacks in self.stacks.items()}
+            for target in self._targets:
+                totals.setdefault(target.label, Counter()).update(target.stacks)
+
+        lines = [
+            f"{name};{stack} {count}"
+            for name, stacks in totals.items() if label is None or name == label
+            for stack, count in stacks.items()
+        ]
+        return "\n".join(sorted(lines))
+
+    def _run(self) -> None:
+        sampled_at = time.perf_counter()
+        while True:
+            with self._lock:
+                # Завершившиеся фоновые задачи перестают отслеживаться сами
+                for target in [target for target in self._targets if target.task.done()]:
+                    self._finish(target)
+                if not self._targets:
+                    self._thread = None
+                    return
+                targets = list(self._targets)
+
+            loop_frame = sys._current_frames().get(self._loop_thread_id)
+            samples = [(target, self._sample(target, loop_frame)) for target in targets]
+            # Пока event loop занят CPU, поток ждёт GIL дольше interval; вес сэмпла
+            # по прошедшему времени не даёт недооценить такие участки
+            now = time.perf_counter()
+            weight = max(int((now - sampled_at) * 1_000_000), 1)
+            sampled_at = now
+            with self._lock:
+                for target, stack in samples:
+                    if stack:
+                        target.stacks[stack] += weight
+            time.sleep(self.interval)
+
+    def _sample(self, target: ProfileTarget, loop_frame: FrameType | None) -> str:
+        # Задача выполняется: её кадры лежат на стеке потока event loop
+        running = []
+        frame = loop_frame
+        while frame is not None:
+            running.append(frame)
+            if frame is target.root:
+                return ";".join(self._frame_name(frame.f_code) for frame in reversed(running))
+            frame = frame.f_back
+
+        # Задача приостановлена: идём по цепочке await от корутины задачи
+        names = []
+        awaitable = target.task.get_coro()
+        while awaitable is not None:
+            frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+            if frame is None:
+                # Future, задача или иной объект, которого ждёт корутина
+                if names:
+                    names.append(f"<{type(awaitable).__name__}>")
+                break
+            if names or frame is target.root:
+                names.append(self._frame_name(frame.f_code))
+            awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+        return ";".join(names)
+
+    def _frame_name(self, code: CodeType) -> str:
+        name = self._frame_names.get(code)
+        if name is None:
+            path = code.co_filename.rsplit("site-packages" + os.sep, 1)[-1]
+            if path == code.co_filename:
+                path = os.path.relpath(path)
+            name = self._frame_names[code] = f"{code.co_name} ({path}:{code.co_firstlineno})"
+        return name
+
+
+profiler = SamplingProfiler(interval=settings.PROFILER_INTERVAL_MS / 1000)
+
+
+class ProfilerMiddleware:
+    """
+    Профилирует долю sample_rate запросов и все запросы с заголовком header.
+    Стеки запроса учитываются под меткой "МЕТОД шаблон_маршрута".
+    """
+
+    def __init__(
+            self,
+            app,
+            profiler: SamplingProfiler = profiler,
+            sample_rate: float = 0.0,
+            header: str = "x-profile",
+    ):
+        self.app = app
+        self.profiler = profiler
+        self.sample_rate = sample_rate
+        self.header = header.lower().encode()
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        target = self.profiler.track("unmatched", root=sys._getframe())
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route = scope.get("route")
+            target.label = f"{scope['method']} {route.path if route is not None else 'unmatched'}"
+            self.profiler.untrack(target)
+
+    def _should_profile(self, scope) -> bool:
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        return any(name == self.header for name, _ in scope["headers"])
+
+
+async def profile_endpoint(request: Request) -> Response:
+    """
+    GET отдаёт накопленные стеки (параметр label - только одной метки), DELETE их сбрасывает.
+    """
+    if request.method == "DELETE":
+        profiler.reset()
+        return Response(status_code=204)
+    return PlainTextResponse(profiler.collapsed(request.query_params.get("label")))
@@ -0,0 +1,138 @@
+# Форк bet_maker/app/rabbit/codecs.py: сервисы собираются отдельно, общие правки вносятся в оба
+import gzip
+import json
+import time
+import zlib
+from collections.abc import Iterator
+from dataclasses import dataclass
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any
+
+import msgpack
+
+GZIP_ENCODING = "gzip"
+DECOMPRESS_CHUNK_SIZE = 64 * 1024
+
+# Коэффициенты передаются целым числом базисных пунктов: 1.5 -> 15000
+ODDS_SCALE = 10_000
+
+
+class JsonCodec:
+    content_type = "application/json"
+
+    @staticmethod
+    def encode(message: Any) -> bytes:
+        return json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode()
+
+    @staticmethod
+    def decode(body: bytes) -> Any:
+        return json.loads(body)
+
+
+class MsgpackCodec:
+    content_type = "application/msgpack"
+
+    @staticmethod
+    def encode(message: Any) -> bytes:
+        return msgpack.packb(message)
+
+    @staticmethod
+    def decode(body: bytes) -> Any:
+        return msgpack.unpackb(body)
+
+
+CODECS = {codec.content_type: codec for codec in (JsonCodec, MsgpackCodec)}
+
+
+def get_codec(content_type: str | None) -> type[JsonCodec] | type[MsgpackCodec]:
+    """
+    Кодек по заголовку content_type; сообщения без заголовка считаются JSON.
+    """
+    if not content_type:
+        return JsonCodec
+    try:
+        return CODECS[content_type]
+    except KeyError:
+        raise ValueError(f"Unsupported content type: {content_type}") from None
+
+
+@dataclass
+class CompressionStats:
+    """
+    Накопленные с запуска объёмы сжатых сообщений и затраченное на сжатие или распаковку время CPU.
+    """
+    messages: int = 0
+    raw_bytes: int = 0
+    compressed_bytes: int = 0
+    cpu_seconds: float = 0.0
+
+    @property
+    def ratio(self) -> float:
+        return self.raw_bytes / self.compressed_bytes if self.compressed_bytes else 1.0
+
+    def record(self, raw_size: int, compressed_size: int, cpu_seconds: float) -> None:
+        self.messages += 1
+        self.raw_bytes += raw_size
+        self.compressed_bytes += compressed_size
+        self.cpu_seconds += cpu_seconds
+
+
+def compress_body(body: bytes, level: int) -> tuple[bytes, float]:
+    """
+    Сжимает тело сообщения gzip; возвращает его вместе с затраченным временем CPU.
+    """
+    started_at = time.thread_time()
+    compressed = gzip.compress(body, compresslevel=level, mtime=0)
+    return compressed, time.thread_time() - started_at
+
+
+def _decompress_chunks(body: bytes, max_size: int) -> Iterator[bytes]:
+    decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+    raw_size = 0
+    for offset in range(0, len(body), DECOMPRESS_CHUNK_SIZE):
+        chunk = decompressor.decompress(body[offset:offset + DECOMPRESS_CHUNK_SIZE])
+        raw_size += len(chunk)
+        if raw_size > max_size:
+            raise ValueError(f"Decompressed message exceeds {max_size} bytes")
+        yield chunk
+    yield decompressor.flush()
+
+
+def decode_compressed(
+        body: bytes,
+        content_type: str | None,
+        content_encoding: str,
+        max_size: int,
+) -> tuple[Any, int, float]:
+    """
+    Распаковывает и декодирует сжатое сообщение; возвращает данные, размер
+    распакованного тела и затраченное время CPU. Сообщение, которое распаковывается
+    больше чем в max_size байт, отклоняется. Тело msgpack подаётся в Unpacker
+    порциями по мере распаковки: несжатое тело целиком лежит только в буфере Unpacker.
+    """
+    if content_encoding != GZIP_ENCODING:
+        raise ValueError(f"Unsupported content encoding: {content_encoding}")
+    codec = get_codec(content_type)
+
+    started_at = time.thread_time()
+    chunks = _decompress_chunks(body, max_size)
+    try:
+        if codec is MsgpackCodec:
+            # Буфер по умолчанию ограничен 100 МиБ, больший снимок не декодировался бы
+            unpacker = msgpack.Unpacker(max_buffer_size=max_size)
+            raw_size = 0
+            for chunk in chunks:
+                unpacker.feed(chunk)
+                raw_size += len(chunk)
+            data = unpacker.unpack()
+        else:
+            raw_body = b"".join(chunks)
+            data = codec.decode(raw_body)
+            raw_size = len(raw_body)
+    except (zlib.error, msgpack.UnpackException) as e:
+        raise ValueError(str(e)) from e
+    return data, raw_size, time.thread_time() - started_at
+
+
+def odds_to_wire(odds: Decimal) -> int:
+    return int((odds * ODDS_SCALE).to_integral_value(rounding=ROUND_HALF_UP))
@@ -0,0 +1,132 @@
+import asyncio
+import heapq
+import logging
+import time
+from collections.abc import Iterable
+
+from app.db.models import Status
+from app.rabbit.rabbit import rabbitmq_manager
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineScheduler:
+    """
+    Закрывает приём ставок на события ровно в момент дедлайна.
+
+    Ближайшие дедлайны незавершённых событий хранятся в куче; планировщик спит
+    до первого из них и сразу публикует уведомление о закрытии в events_queue.
+    Изменённые и удалённые события из кучи не удаляются: устаревшая запись
+    отбрасывается, когда доходит до вершины, если дедлайн события уже другой.
+    """
+
+    def __init__(self):
+        self._heap: list[tuple[int, int]] = []
+        self._deadlines: dict[int, int] = {}
+        self._changed = asyncio.Event()
+        self._loaded = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def schedule(self, event_id: int, deadline: int) -> None:
+        if self._deadlines.get(event_id) == deadline:
+            return
+        self._deadlines[event_id] = deadline
+        heapq.heappush(self._heap, (deadline, event_id))
+        if self._heap[0] == (deadline, event_id):
+            self._changed.set()
+
+    def cancel(self, event_id: int) -> None:
+        self._deadlines.pop(event_id, None)
+        # Устаревшие записи копятся в куче, пока не дойдут до вершины
+        if len(self._heap) > 2 * len(self._deadlines) + 1024:
+            self._heap = [(deadline, event_id) for event_id, deadline in self._deadlines.items()]
+            heapq.heapify(self._heap)
+
+    def track(self, events: Iterable[dict], deleted: Iterable[int] = ()) -> None:
+        """
+        Обновляет расписание по сериализованным событиям из ленты изменений.
+        Прошедшие дедлайны не планируются: такие события уже закрыты.
+        """
+        now = time.time()
+        for event in events:
+            if event["status"] == Status.IN_PROGRESS.value and event["deadline"] > now:
+                self.schedule(event["id"], event["deadline"])
+            else:
+                self.cancel(event["id"])
+        for event_id in deleted:
+            self.cancel(event_id)
+
+    def replace(self, events: Iterable[dict]) -> None:
+        """
+        Заменяет расписание целиком по полному снимку событий.
+        """
+        self._heap.clear()
+        self._deadlines.clear()
+        self.track(events)
+        self._changed.set()
+        self._loaded.set()
+
+    def clear(self) -> None:
+        """
+        Сбрасывает расписание до следующего полного снимка.
+        """
+        self._heap.clear()
+        self._deadlines.clear()
+        self._loaded.clear()
+
+    def _discard_stale(self) -> None:
+        while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def next_deadline(self) -> int | None:
+        self._discard_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float) -> list[dict]:
+        """
+        Снимает с расписания события, чей дедлайн наступил к моменту now.
+        """
+        due = []
+        while (deadline := self.next_deadline()) is not None and deadline <= now:
+            _, event_id = heapq.heappop(self._heap)
+            del self._deadlines[event_id]
+            due.append({"id": event_id, "deadline": deadline})
+        return due
+
+    async def run(self) -> None:
+        try:
+            # До первого снимка расписание может быть устаревшим
+            await self._loaded.wait()
+            await self._run()
+        except asyncio.CancelledError:
+            # Остановка при потере лидерства: следующий запуск дождётся свежего снимка
+            self.clear()
+            raise
+
+    async def _run(self) -> None:
+        while True:
+            self._changed.clear()
+            deadline = self.next_deadline()
+            timeout = None if deadline is None else max(deadline - time.time(), 0)
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=timeout)
+                continue
+            except asyncio.TimeoutError:
+                pass
+
+            due = self.pop_due(time.time())
+            if not due:
+                continue
+            try:
+                await rabbitmq_manager.publish_message(
+                    queue_name="events_queue",
+                    message={"type": "close", "events": due},
+                )
+                logger.info(f"Published close for {len(due)} events with passed deadline")
+            except Exception as e:
+                logger.error(f"Error publishing event close: {e}")
+
+
+deadline_scheduler = DeadlineScheduler()
@@ -1,41 +1,167 @@
 import asyncio
 import logging
+import time
 
+from app.config import settings
 from app.db.db import AsyncSessionLocal
-from app.db.schemas import Events
-from app.rabbit.rabbit import RabbitMQSessionManager
-from sqlalchemy import select
+from app.db.replicas import read_replicas
+from app.db.schemas import REVISION_LOCK_KEY, DeletedEvents, Events
+from app.metrics import PRODUCER_CYCLE_DURATION, SNAPSHOT_EVENTS
+from app.rabbit.codecs import odds_to_wire
+from app.rabbit.deadlines import deadline_scheduler
+from app.rabbit.rabbit import RabbitMQSessionManager, rabbitmq_manager
+from sqlalchemy import select, text
 
 logger = logging.getLogger(__name__)
 
+snapshot_requested = asyncio.Event()
+
+LOCK_REVISIONS = text(f"SELECT pg_advisory_xact_lock(hashtext('{REVISION_LOCK_KEY}'))")
+LAST_REVISION = text("""
+    SELECT CASE WHEN is_called THEN last_value ELSE 0 END, pg_current_wal_lsn()::text FROM events_revision_seq
+""")
+# На первичном сервере pg_last_wal_replay_lsn() возвращает NULL
+WAL_REPLAYED = text("SELECT COALESCE(pg_last_wal_replay_lsn() >= CAST(:lsn AS pg_lsn), true)")
+
+
+def serialize_event(event: Events) -> dict:
+    return {
+        "id": event.id,
+        "odds": odds_to_wire(event.odds),
+        "deadline": event.deadline,
+        "status": event.status.value,
+    }
+
+
+async def committed_revision(session) -> tuple[int, str]:
+    """
+    Ревизия, до которой включительно все изменения событий зафиксированы, и позиция
+    WAL первичного сервера в этот момент. Блокировка ждёт фиксации транзакций,
+    которые уже взяли ревизии, и сразу снимается.
+    """
+    await session.execute(LOCK_REVISIONS)
+    revision, lsn = (await session.execute(LAST_REVISION)).one()
+    await session.commit()
+    return revision, lsn
+
+
+async def build_snapshot(session, revision: int) -> dict:
+    """
+    Полный снимок событий на момент не раньше ревизии revision из committed_revision.
+    Строки с большей ревизией, попавшие в снимок, повторятся в следующей дельте.
+    """
+    result = await session.execute(select(Events))
+    events = result.scalars().all()
+    return {
+        "type": "snapshot",
+        "revision": revision,
+        "events": [serialize_event(event) for event in events],
+    }
+
+
+async def build_delta(session, from_revision: int, to_revision: int) -> dict | None:
+    """
+    Изменения с ревизиями в (from_revision, to_revision]. Ревизии выдаются при записи,
+    а не при фиксации, поэтому to_revision берётся из committed_revision: выше неё ещё
+    могут зафиксироваться строки с меньшими ревизиями.
+    """
+    result = await session.execute(
+        select(Events)
+        .where(Events.revision > from_revision, Events.revision <= to_revision)
+        .order_by(Events.revision)
+    )
+    events = result.scalars().all()
+    result = await session.execute(
+        select(DeletedEvents)
+        .where(DeletedEvents.revision > from_revision, DeletedEvents.revision <= to_revision)
+        .order_by(DeletedEvents.revision)
+    )
+    deleted = result.scalars().all()
+
+    if not events and not deleted:
+        return None
+
+    revision = max(row.revision for row in (*events, *deleted))
+    return {
+        "type": "delta",
+        "from_revision": from_revision,
+        "revision": revision,
+        "events": [serialize_event(event) for event in events],
+        "deleted": [row.event_id for row in deleted],
+    }
+
+
 async def events_producer():
-    session = AsyncSessionLocal()
-    rabbitmq = RabbitMQSessionManager()
+    """
+    Публикует ленту изменений событий в events_queue.
 
-    try:
-        while True:
-            try:
-                result = await session.execute(select(Events))
-                events = result.scalars().all()
-
-                events_data = [{
-                    "id": event.id,
-                    "odds": str(event.odds),
-                    "deadline": event.deadline,
-                    "status": event.status.value
-                } for event in events]
-
-                await rabbitmq.publish_message(
+    Каждые EVENTS_DELTA_INTERVAL секунд уходят строки с ревизией больше последней
+    опубликованной, но не выше той, до которой все изменения уже зафиксированы.
+    Полный снимок отправляется при старте, раз в EVENTS_SNAPSHOT_INTERVAL секунд и
+    по запросу консьюмера (events_resync_queue). По той же ленте обновляется
+    расписание дедлайнов, в том числе для событий, созданных другими экземплярами сервиса.
+    """
+    last_revision = 0
+    last_snapshot_at = None
+
+    while True:
+        started_at = time.perf_counter()
+        try:
+            snapshot_due = (
+                last_snapshot_at is None
+                or snapshot_requested.is_set()
+                or time.monotonic() - last_snapshot_at >= settings.EVENTS_SNAPSHOT_INTERVAL
+            )
+            async with AsyncSessionLocal() as session:
+                revision, lsn = await committed_revision(session)
+                if not snapshot_due:
+                    message = await build_delta(session, last_revision, revision)
+                    if message is not None:
+                        deadline_scheduler.track(message["events"], message["deleted"])
+
+            if snapshot_due:
+                snapshot_requested.clear()
+                # Снимок читается с реплики, если она уже воспроизвела изменения до revision
+                session_factory = read_replicas.sessionmaker()
+                async with session_factory() as session:
+                    if not await session.scalar(WAL_REPLAYED, {"lsn": lsn}):
+                        session_factory = AsyncSessionLocal
+                async with session_factory() as session:
+                    message = await build_snapshot(session, revision)
+                last_snapshot_at = time.monotonic()
+                deadline_scheduler.replace(message["events"])
+                SNAPSHOT_EVENTS.set(len(message["events"]))
+
+            if message is not None:
+                await rabbitmq_manager.publish_message(
                     queue_name="events_queue",
-                    message=events_data
+                    message=message,
+                    wait_for_confirm=True
                 )
-                logger.info(f"Published {len(events_data)} events to RabbitMQ")
+                last_revision = message["revision"]
+                logger.info(
+                    f"Published {message['type']} with {len(message['events'])} events "
+                    f"up to revision {last_revision} to RabbitMQ"
+                )
+            PRODUCER_CYCLE_DURATION.labels(message["type"] if message is not None else "idle").observe(
+                time.perf_counter() - started_at
+            )
+
+        except Exception as e:
+            logger.error(f"Error in producer: {e}")
+
+        try:
+            await asyncio.wait_for(snapshot_requested.wait(), timeout=settings.EVENTS_DELTA_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
 
-            except Exception as e:
-                await session.rollback()
-                logger.error(f"Error in producer: {e}")
 
-            await asyncio.sleep(10)
+async def resync_requests_consumer():
+    rabbitmq = RabbitMQSessionManager()
+
+    try:
+        async for data in rabbitmq.consume_messages("events_resync_queue"):
+            logger.info(f"Запрошен полный снимок событий: {data}")
+            snapshot_requested.set()
     finally:
-        await session.close()
         await rabbitmq.close()
@@ -1,29 +1,73 @@
-import json
+import asyncio
 import logging
+import time
 from collections.abc import AsyncIterator
-from contextlib import asynccontextmanager
+from contextlib import AsyncExitStack, asynccontextmanager
 from typing import Any
 
 import aio_pika
+from aio_pika.pool import Pool
 from app.config import settings
+from app.metrics import (
+    RABBIT_COMPRESSION_BYTES,
+    RABBIT_COMPRESSION_CPU,
+    RABBIT_MESSAGE_SIZE,
+    RABBIT_MESSAGES_CONSUMED,
+    RABBIT_MESSAGES_FAILED,
+    RABBIT_PUBLISH_DURATION,
+)
+from app.rabbit.codecs import GZIP_ENCODING, CompressionStats, compress_body, decode_compressed, get_codec
 
 logger = logging.getLogger(__name__)
 
 
 class RabbitMQSessionManager:
-    def __init__(self):
+    """
+    Соединение с RabbitMQ на всё приложение.
+
+    Публикация идёт через пул долгоживущих каналов с включёнными publisher
+    confirms, очереди объявляются один раз. Канал занят публикацией до
+    подтверждения брокера, так что пул ограничивает число сообщений в полёте.
+    По умолчанию publish_message ждёт только свободного канала: отправка и
+    подтверждение разбираются в фоне, неподтверждённые сообщения попадают в лог.
+
+    Формат тела задаётся заголовком content_type: сообщения кодируются форматом
+    RABBIT_CONTENT_TYPE, входящие декодируются по своему заголовку. Крупные
+    сообщения сжимаются gzip, что отмечается заголовком content_encoding.
+    """
+
+    def __init__(self, channel_pool_size: int = 10):
+        self.channel_pool_size = channel_pool_size
         self._connection: aio_pika.RobustConnection | None = None
+        self._channel_pool: Pool[aio_pika.abc.AbstractChannel] | None = None
+        self._declared_queues: set[str] = set()
+        self._pending_confirms: set[asyncio.Future] = set()
+        self._connect_lock = asyncio.Lock()
+        self.compression_stats = CompressionStats()
+        self.decompression_stats = CompressionStats()
 
     async def connect(self) -> None:
-        if not self._connection or self._connection.is_closed:
-            self._connection = await aio_pika.connect_robust(settings.get_rabbitmq_url)
-            logger.info("Connected to RabbitMQ")
+        if self._connection and not self._connection.is_closed:
+            return
+        # Одновременные первые публикации иначе открыли бы по соединению и пулу каналов каждая
+        async with self._connect_lock:
+            if not self._connection or self._connection.is_closed:
+                self._connection = await aio_pika.connect_robust(settings.get_rabbitmq_url)
+                self._channel_pool = Pool(self._open_channel, max_size=self.channel_pool_size)
+                self._declared_queues.clear()
+                logger.info("Connected to RabbitMQ")
 
     async def close(self) -> None:
+        await self.wait_for_confirms()
+        if self._channel_pool and not self._channel_pool.is_closed:
+            await self._channel_pool.close()
         if self._connection and not self._connection.is_closed:
             await self._connection.close()
             logger.info("Disconnected from RabbitMQ")
 
+    async def _open_channel(self) -> aio_pika.abc.AbstractChannel:
+        return await self._connection.channel(publisher_confirms=True)
+
     @asynccontextmanager
     async def get_channel(self) -> AsyncIterator[aio_pika.RobustChannel]:
         await self.connect()
@@ -41,29 +85,119 @@ class RabbitMQSessionManager:
             self,
             queue_name: str,
             message: dict | list | str,
-            persistent: bool = True
+            persistent: bool = True,
+            wait_for_confirm: bool = False,
     ) -> None:
-        async with self.get_channel() as channel:
-            await self.declare_queue(channel, queue_name)
+        started_at = time.perf_counter()
+        await self.connect()
 
-            if isinstance(message, (dict, list)):
-                message_body = json.dumps(message).encode()
-            else:
-                message_body = str(message).encode()
+        if isinstance(message, (dict, list)):
+            codec = get_codec(settings.RABBIT_CONTENT_TYPE)
+            message_body = codec.encode(message)
+            content_type = codec.content_type
+        else:
+            message_body = str(message).encode()
+            content_type = "text/plain"
+        message_body, content_encoding = await self._compress(message_body, queue_name)
+        RABBIT_MESSAGE_SIZE.labels(queue_name).observe(len(message_body))
 
-            delivery_mode = (
-                aio_pika.DeliveryMode.PERSISTENT if persistent
-                else aio_pika.DeliveryMode.NOT_PERSISTENT
-            )
+        delivery_mode = (
+            aio_pika.DeliveryMode.PERSISTENT if persistent
+            else aio_pika.DeliveryMode.NOT_PERSISTENT
+        )
+
+        async with AsyncExitStack() as stack:
+            channel = await stack.enter_async_context(self._channel_pool.acquire())
+            if queue_name not in self._declared_queues:
+                await self.declare_queue(channel, queue_name)
+                self._declared_queues.add(queue_name)
+            # Канал переходит к фоновой публикации и вернётся в пул после подтверждения
+            lease = stack.pop_all()
 
-            await channel.default_exchange.publish(
+        confirmation = asyncio.ensure_future(
+            self._publish(
+                lease,
+                channel,
+                queue_name,
                 aio_pika.Message(
                     body=message_body,
+                    content_type=content_type,
+                    content_encoding=content_encoding,
                     delivery_mode=delivery_mode
                 ),
-                routing_key=queue_name
             )
-            logger.debug(f"Message published to {queue_name}")
+        )
+
+        if wait_for_confirm:
+            await confirmation
+        else:
+            self._pending_confirms.add(confirmation)
+            confirmation.add_done_callback(lambda future: self._on_confirm(future, queue_name))
+        RABBIT_PUBLISH_DURATION.labels(queue_name).observe(time.perf_counter() - started_at)
+        logger.debug(f"Message published to {queue_name}")
+
+    @staticmethod
+    async def _publish(
+            lease: AsyncExitStack,
+            channel: aio_pika.abc.AbstractChannel,
+            queue_name: str,
+            message: aio_pika.Message,
+    ) -> None:
+        async with lease:
+            await channel.default_exchange.publish(message, routing_key=queue_name)
+
+    async def _compress(self, body: bytes, queue_name: str) -> tuple[bytes, str | None]:
+        """
+        Сжимает тело не меньше RABBIT_COMPRESS_MIN_SIZE байт вне event loop;
+        если сжатие не уменьшило размер, тело уходит как есть.
+        """
+        if len(body) < settings.RABBIT_COMPRESS_MIN_SIZE:
+            return body, None
+        compressed, cpu_seconds = await asyncio.to_thread(compress_body, body, settings.RABBIT_COMPRESS_LEVEL)
+        self.compression_stats.record(len(body), len(compressed), cpu_seconds)
+        RABBIT_COMPRESSION_BYTES.labels("compress", "raw").inc(len(body))
+        RABBIT_COMPRESSION_BYTES.labels("compress", "compressed").inc(len(compressed))
+        RABBIT_COMPRESSION_CPU.labels("compress").inc(cpu_seconds)
+        logger.info(
+            f"Compressed message to {queue_name}: {len(body)} -> {len(compressed)} bytes "
+            f"in {cpu_seconds * 1000:.1f} ms CPU, total ratio {self.compression_stats.ratio:.1f}"
+        )
+        if len(compressed) >= len(body):
+            return body, None
+        return compressed, GZIP_ENCODING
+
+    async def _decode(self, message: aio_pika.abc.AbstractIncomingMessage) -> Any:
+        if not message.content_encoding:
+            return get_codec(message.content_type).decode(message.body)
+        data, raw_size, cpu_seconds = await asyncio.to_thread(
+            decode_compressed,
+            message.body,
+            message.content_type,
+            message.content_encoding,
+            settings.RABBIT_MAX_DECOMPRESSED_SIZE,
+        )
+        self.decompression_stats.record(raw_size, len(message.body), cpu_seconds)
+        RABBIT_COMPRESSION_BYTES.labels("decompress", "raw").inc(raw_size)
+        RABBIT_COMPRESSION_BYTES.labels("decompress", "compressed").inc(len(message.body))
+        RABBIT_COMPRESSION_CPU.labels("decompress").inc(cpu_seconds)
+        logger.debug(
+            f"Decompressed message: {len(message.body)} -> {raw_size} bytes in {cpu_seconds * 1000:.1f} ms CPU"
+        )
+        return data
+
+    def _on_confirm(self, confirmation: asyncio.Future, queue_name: str) -> None:
+        self._pending_confirms.discard(confirmation)
+        if confirmation.cancelled():
+            logger.error(f"Publishing to {queue_name} was cancelled before broker confirmation")
+        elif confirmation.exception() is not None:
+            logger.error(f"Message to {queue_name} was not confirmed by broker: {confirmation.exception()}")
+
+    async def wait_for_confirms(self) -> None:
+        """
+        Ожидает подтверждения всех опубликованных, но ещё не подтверждённых сообщений.
+        """
+        if self._pending_confirms:
+            await asyncio.gather(*self._pending_confirms, return_exceptions=True)
 
     async def consume_messages(self, queue_name: str) -> AsyncIterator[dict[str, Any]]:
         async with self.get_channel() as channel:
@@ -76,11 +210,21 @@ class RabbitMQSessionManager:
                 async for message in queue_iter:
                     try:
                         async with message.process():
-                            data = json.loads(message.body.decode())
+                            data = await self._decode(message)
                             logger.debug(f"Получено сообщение: {data}")
+                            RABBIT_MESSAGES_CONSUMED.labels(queue_name).inc()
                             yield data
-                    except json.JSONDecodeError as e:
-                        logger.error(f"Ошибка декодирования JSON: {e}")
+                    except ValueError as e:
+                        RABBIT_MESSAGES_FAILED.labels(queue_name).inc()
+                        logger.error(f"Ошибка декодирования сообщения: {e}")
                     except Exception as e:
+                        RABBIT_MESSAGES_FAILED.labels(queue_name).inc()
                         logger.error(f"Ошибка обработки сообщения: {e}")
-                        raise
\ No newline at end of file
+                        raise
+
+
+rabbitmq_manager = RabbitMQSessionManager()
+
+
+async def get_rabbitmq() -> RabbitMQSessionManager:
+    return rabbitmq_manager
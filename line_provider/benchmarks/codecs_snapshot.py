@@ -0,0 +1,94 @@
+"""
+Сравнение форматов сообщений events_queue на полном снимке событий.
+
+Запуск из каталога line_provider:
+    python -m benchmarks.codecs_snapshot [--events 50000] [--repeat 20]
+"""
+import argparse
+import json
+import random
+import time
+from collections.abc import Callable
+from decimal import Decimal
+from typing import Any
+
+from app.config import settings
+from app.db.models import Status
+from app.rabbit.codecs import GZIP_ENCODING, JsonCodec, MsgpackCodec, compress_body, decode_compressed, odds_to_wire
+
+COMPRESS_LEVEL = 6
+
+
+def build_snapshot(events: int, wire_odds: bool) -> dict:
+    rng = random.Random(0)
+    statuses = [status.value for status in Status]
+    return {
+        "type": "snapshot",
+        "revision": events,
+        "events": [
+            {
+                "id": event_id,
+                "odds": odds_to_wire(odds) if wire_odds else str(odds),
+                "deadline": 1_760_000_000 + rng.randint(0, 86_400 * 30),
+                "status": rng.choice(statuses),
+            }
+            for event_id in range(1, events + 1)
+            for odds in [Decimal(rng.randint(101, 1000)) / 100]
+        ],
+    }
+
+
+def gzip_encoder(codec: type[JsonCodec] | type[MsgpackCodec]) -> Callable[[Any], bytes]:
+    def encode(message: Any) -> bytes:
+        return compress_body(codec.encode(message), COMPRESS_LEVEL)[0]
+    return encode
+
+
+def gzip_decoder(codec: type[JsonCodec] | type[MsgpackCodec]) -> Callable[[bytes], Any]:
+    def decode(body: bytes) -> Any:
+        return decode_compressed(body, codec.content_type, GZIP_ENCODING, settings.RABBIT_MAX_DECOMPRESSED_SIZE)[0]
+    return decode
+
+
+def measure(func: Callable[[Any], Any], argument: Any, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        func(argument)
+        best = min(best, time.perf_counter() - started_at)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    legacy = build_snapshot(args.events, wire_odds=False)
+    snapshot = build_snapshot(args.events, wire_odds=True)
+
+    cases = [
+        # Прежний формат: json.dumps с настройками по умолчанию и коэффициенты строками
+        ("json, odds строкой", lambda message: json.dumps(message).encode(),
+         lambda body: json.loads(body.decode()), legacy),
+        ("json, odds в б.п.", JsonCodec.encode, JsonCodec.decode, snapshot),
+        ("msgpack, odds в б.п.", MsgpackCodec.encode, MsgpackCodec.decode, snapshot),
+        ("json + gzip", gzip_encoder(JsonCodec), gzip_decoder(JsonCodec), snapshot),
+        ("msgpack + gzip", gzip_encoder(MsgpackCodec), gzip_decoder(MsgpackCodec), snapshot),
+    ]
+
+    print(f"Снимок из {args.events} событий, лучшее из {args.repeat} повторов")
+    print(f"{'формат':<24}{'размер, КБ':>12}{'encode, мс':>12}{'decode, мс':>12}")
+    for name, encode, decode, message in cases:
+        body = encode(message)
+        assert decode(body) == message
+        print(
+            f"{name:<24}{len(body) / 1024:>12.1f}"
+            f"{measure(encode, message, args.repeat):>12.2f}"
+            f"{measure(decode, body, args.repeat):>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Нагрузочный прогон line_provider в одном процессе: реальные ASGI-приложение и
+events_producer поверх брокера в памяти и временной базы Postgres.
+
+Замеряются время цикла events_producer со снимком всего каталога, задержка от
+фиксации изменений до публикации дельты и пропускная способность с p50/p99
+задержки GET /events. Результат сохраняется в JSON; с --baseline выводится
+сравнение с прошлым прогоном.
+
+Нужен доступный Postgres (по умолчанию из настроек DB_*): для прогона на нём
+создаётся и затем удаляется отдельная база. Запуск из каталога line_provider:
+    python -m benchmarks.load [--events 50000] [--snapshots 10] [--deltas 50]
+        [--delta-size 100] [--requests 2000] [--concurrency 50]
+        [--output results.json] [--baseline previous.json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import subprocess
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest.mock import patch
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import settings
+from app.db.db import AsyncSessionLocal
+from app.main import app
+from app.rabbit import queues
+from app.rabbit.queues import events_producer, snapshot_requested
+from benchmarks.stand_ins import InMemoryBroker, disposable_database
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+EVENTS_QUEUE = "events_queue"
+COMPARED_METRICS = ("throughput_per_second", "p50_ms", "p99_ms", "seconds")
+
+
+def summarize(latencies: list[float], elapsed: float) -> dict:
+    ordered = sorted(latencies)
+
+    def percentile(q: float) -> float:
+        return round(ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000, 3)
+
+    return {
+        "seconds": round(elapsed, 3),
+        "throughput_per_second": round(len(ordered) / elapsed, 1),
+        "p50_ms": percentile(0.5),
+        "p99_ms": percentile(0.99),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+async def run_load(total: int, concurrency: int, request: Callable[[int], Awaitable[int]]) -> dict:
+    """
+    Выполняет total запросов в concurrency параллельных потоков; request
+    возвращает HTTP-статус, ответы 4xx и 5xx считаются ошибками.
+    """
+    latencies = []
+    statuses = Counter()
+    indexes = iter(range(total))
+
+    async def worker() -> None:
+        for index in indexes:
+            started_at = time.perf_counter()
+            statuses[await request(index)] += 1
+            latencies.append(time.perf_counter() - started_at)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return {
+        "requests": total,
+        "errors": sum(count for status_code, count in statuses.items() if status_code >= 400),
+        "statuses": {str(status_code): count for status_code, count in sorted(statuses.items())},
+        **summarize(latencies, time.perf_counter() - started_at),
+    }
+
+
+async def seed_events(engine: AsyncEngine, events: int) -> dict:
+    started_at = time.perf_counter()
+    async with engine.begin() as connection:
+        await connection.execute(
+            text(
+                "INSERT INTO events (odds, deadline, status) "
+                "SELECT 1 + (g % 900) / 100.0, :deadline, 'IN_PROGRESS' FROM generate_series(1, :events) AS g"
+            ),
+            {"events": events, "deadline": int(time.time()) + 86_400},
+        )
+    return {"events": events, "seconds": round(time.perf_counter() - started_at, 3)}
+
+
+async def receive(broker: InMemoryBroker, message_type: str) -> dict:
+    while True:
+        message = await broker.receive(EVENTS_QUEUE)
+        if message["type"] == message_type:
+            return message
+
+
+async def bench_snapshots(broker: InMemoryBroker, events: int, cycles: int) -> dict:
+    """
+    Время цикла со снимком: от запроса снимка до его публикации.
+    """
+    latencies = []
+    started_at = time.perf_counter()
+    for _ in range(cycles):
+        requested_at = time.perf_counter()
+        snapshot_requested.set()
+        await receive(broker, "snapshot")
+        latencies.append(time.perf_counter() - requested_at)
+    report = summarize(latencies, time.perf_counter() - started_at)
+    return {
+        "cycles": cycles,
+        "events": events,
+        "events_per_second": round(events * 1000 / report["p50_ms"], 1),
+        **report,
+    }
+
+
+async def bench_deltas(engine: AsyncEngine, broker: InMemoryBroker, events: int, cycles: int, size: int) -> dict:
+    """
+    Задержка от фиксации изменений size событий до публикации дельты с ними.
+    """
+    rng = random.Random(0)
+    latencies = []
+    started_at = time.perf_counter()
+    for _ in range(cycles):
+        async with engine.begin() as connection:
+            await connection.execute(
+                text("UPDATE events SET revision = nextval('events_revision_seq') WHERE id = ANY(:ids)"),
+                {"ids": rng.sample(range(1, events + 1), size)},
+            )
+        committed_at = time.perf_counter()
+        changed = 0
+        while changed < size:
+            changed += len((await receive(broker, "delta"))["events"])
+        latencies.append(time.perf_counter() - committed_at)
+    return {"cycles": cycles, "changes": size, **summarize(latencies, time.perf_counter() - started_at)}
+
+
+async def run(args: argparse.Namespace) -> dict:
+    broker = InMemoryBroker()
+    results = {}
+
+    async with disposable_database(args.database_url or settings.get_db_url) as engine:
+        AsyncSessionLocal.configure(bind=engine)
+        results["seed_events"] = await seed_events(engine, args.events)
+
+        with (
+            patch.object(queues, "rabbitmq_manager", broker),
+            patch.object(settings, "EVENTS_DELTA_INTERVAL", args.delta_interval),
+        ):
+            producer = asyncio.create_task(events_producer())
+            try:
+                # Первый цикл после запуска всегда публикует снимок
+                await receive(broker, "snapshot")
+                results["events_producer_snapshot"] = await bench_snapshots(broker, args.events, args.snapshots)
+                results["events_producer_delta"] = await bench_deltas(
+                    engine, broker, args.events, args.deltas, args.delta_size
+                )
+            finally:
+                producer.cancel()
+                await asyncio.gather(producer, return_exceptions=True)
+
+        rng = random.Random(0)
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+            async def get_events(index: int) -> int:
+                response = await client.get(
+                    "/bet_maker/events",
+                    params={"after_id": rng.randrange(args.events), "limit": args.page_size},
+                )
+                return response.status_code
+
+            results["get_events"] = await run_load(args.requests, args.concurrency, get_events)
+
+    return results
+
+
+def current_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: dict, report: dict) -> None:
+    print(f"Сравнение с {baseline.get('commit')} ({baseline.get('created_at')})")
+    for scenario, metrics in report["results"].items():
+        previous = baseline.get("results", {}).get(scenario, {})
+        for metric in COMPARED_METRICS:
+            if metric in metrics and previous.get(metric):
+                change = (metrics[metric] - previous[metric]) / previous[metric] * 100
+                print(f"{scenario:<28}{metric:<24}{previous[metric]:>12}{metrics[metric]:>12}{change:>+9.1f}%")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=50_000)
+    parser.add_argument("--snapshots", type=int, default=10)
+    parser.add_argument("--deltas", type=int, default=50)
+    parser.add_argument("--delta-size", type=int, default=100)
+    parser.add_argument("--delta-interval", type=float, default=0.05, help="пауза events_producer между дельтами, с")
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--database-url", help="сервер Postgres для временной базы, по умолчанию из настроек")
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--baseline", type=Path)
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    # Логи запросов на уровне INFO заметно искажают замеры
+    logging.getLogger().setLevel(args.log_level)
+
+    report = {
+        "service": "line_provider",
+        "commit": current_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "parameters": {
+            key: value for key, value in vars(args).items() if key not in ("output", "baseline", "database_url")
+        },
+        "results": asyncio.run(run(args)),
+    }
+
+    output = args.output or RESULTS_DIR / f"load-{report['commit'] or 'unknown'}-{int(time.time())}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+    print(json.dumps(report["results"], ensure_ascii=False, indent=2))
+    print(f"Результаты сохранены в {output}")
+
+    if args.baseline:
+        compare(json.loads(args.baseline.read_text()), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Локальные заменители внешних сервисов для нагрузочных прогонов: брокер в
+памяти процесса и одноразовая база в локальном Postgres.
+"""
+import asyncio
+import uuid
+from collections import defaultdict
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.config import settings
+from app.db.schemas import Base
+from app.rabbit.codecs import get_codec
+from app.rabbit.rabbit import RabbitMQSessionManager
+
+
+@dataclass
+class InMemoryMessage:
+    body: bytes
+    content_type: str | None
+    content_encoding: str | None
+
+
+class InMemoryBroker(RabbitMQSessionManager):
+    """
+    Брокер в памяти процесса с интерфейсом RabbitMQSessionManager.
+
+    Сообщения проходят те же кодеки и сжатие, что и при работе с RabbitMQ,
+    поэтому их стоимость входит в замеры. Публикация подтверждается сразу.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.queues: defaultdict[str, asyncio.Queue[InMemoryMessage]] = defaultdict(asyncio.Queue)
+
+    async def connect(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def publish_message(
+            self,
+            queue_name: str,
+            message: dict | list | str,
+            persistent: bool = True,
+            wait_for_confirm: bool = False,
+    ) -> None:
+        if isinstance(message, (dict, list)):
+            codec = get_codec(settings.RABBIT_CONTENT_TYPE)
+            body, content_type = codec.encode(message), codec.content_type
+        else:
+            body, content_type = str(message).encode(), "text/plain"
+        body, content_encoding = await self._compress(body, queue_name)
+        await self.queues[queue_name].put(InMemoryMessage(body, content_type, content_encoding))
+
+    async def receive(self, queue_name: str) -> Any:
+        """
+        Забирает и декодирует следующее сообщение очереди.
+        """
+        message = await self.queues[queue_name].get()
+        self.queues[queue_name].task_done()
+        return await self._decode(message)
+
+
+@asynccontextmanager
+async def disposable_database(server_url: str) -> AsyncIterator[AsyncEngine]:
+    """
+    Создаёт на сервере Postgres временную базу со схемой line_provider и удаляет её после прогона.
+    """
+    url = make_url(server_url)
+    name = f"bench_{uuid.uuid4().hex[:12]}"
+    admin = create_async_engine(url.set(database="postgres"), isolation_level="AUTOCOMMIT")
+    async with admin.connect() as connection:
+        await connection.execute(text(f'CREATE DATABASE "{name}"'))
+
+    engine = create_async_engine(url.set(database=name))
+    try:
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        yield engine
+    finally:
+        await engine.dispose()
+        async with admin.connect() as connection:
+            await connection.execute(text(f'DROP DATABASE IF EXISTS "{name}"'))
+        await admin.dispose()
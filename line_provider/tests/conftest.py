@@ -7,6 +7,7 @@ from sqlalchemy.orm import sessionmaker
 from starlette.testclient import TestClient
 
 from app.db.db import get_db
+from app.db.replicas import get_read_db
 from app.db.schemas import Base
 from app.main import app
 from app.config import settings
@@ -65,6 +66,7 @@ async def client(session):
             await session.close()
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
 
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
         yield ac
@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.config import settings
+from app.db.leader import LeaderElection
+
+pytestmark = [pytest.mark.asyncio]
+
+
+async def wait_until(condition) -> None:
+    async def poll() -> None:
+        while not condition():
+            await asyncio.sleep(0.01)
+
+    await asyncio.wait_for(poll(), timeout=5)
+
+
+async def test_only_one_instance_leads_and_standby_takes_over() -> None:
+    engine = create_async_engine(settings.get_test_db_url)
+    started: list[str] = []
+
+    def instance(name: str) -> tuple[LeaderElection, asyncio.Task]:
+        async def produce() -> None:
+            started.append(name)
+            await asyncio.Event().wait()
+
+        election = LeaderElection(engine, "test.leader", retry_interval=0.05, heartbeat_interval=0.05)
+        return election, asyncio.create_task(election.run({"producer": produce}))
+
+    first, first_task = instance("first")
+    await wait_until(lambda: first.is_leader)
+    second, second_task = instance("second")
+    await asyncio.sleep(0.3)
+
+    assert started == ["first"]
+    assert not second.is_leader
+
+    first_task.cancel()
+    await asyncio.gather(first_task, return_exceptions=True)
+    await wait_until(lambda: second.is_leader)
+
+    assert started == ["first", "second"]
+    second_task.cancel()
+    await asyncio.gather(second_task, return_exceptions=True)
+    await engine.dispose()
+
+
+async def test_stopped_task_is_restarted_while_leading() -> None:
+    engine = create_async_engine(settings.get_test_db_url)
+    runs = 0
+
+    async def short_lived() -> None:
+        nonlocal runs
+        runs += 1
+
+    election = LeaderElection(engine, "test.restart", retry_interval=0.05, heartbeat_interval=0.05)
+    task = asyncio.create_task(election.run({"short_lived": short_lived}))
+    await wait_until(lambda: runs >= 3)
+
+    assert election.is_leader
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    await engine.dispose()
+
+
+async def test_cancelled_task_is_restarted_while_leading() -> None:
+    engine = create_async_engine(settings.get_test_db_url)
+    runs = 0
+
+    async def cancelled() -> None:
+        nonlocal runs
+        runs += 1
+        raise asyncio.CancelledError
+
+    election = LeaderElection(engine, "test.cancelled", retry_interval=0.05, heartbeat_interval=0.05)
+    task = asyncio.create_task(election.run({"cancelled": cancelled}))
+    await wait_until(lambda: runs >= 3)
+
+    assert election.is_leader
+    assert not task.done()
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    await engine.dispose()
+
+
+async def test_lock_session_uses_short_tcp_keepalive() -> None:
+    engine = create_async_engine(settings.get_test_db_url)
+    keepalive: list[tuple] = []
+
+    async def produce() -> None:
+        await asyncio.Event().wait()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany) -> None:
+        if "tcp_keepalives_idle" in statement:
+            keepalive.append(cursor.fetchone())
+
+    election = LeaderElection(
+        engine, "test.keepalive", retry_interval=0.05, heartbeat_interval=0.05, keepalive=(4, 1, 2)
+    )
+    task = asyncio.create_task(election.run({"producer": produce}))
+    await wait_until(lambda: election.is_leader and keepalive)
+
+    # set_config возвращает новые значения: сервер их принял для сессии с блокировкой
+    assert keepalive == [("4", "1", "2", "6000")]
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    await engine.dispose()
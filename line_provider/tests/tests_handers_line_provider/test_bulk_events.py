@@ -0,0 +1,71 @@
+import json
+
+import pytest
+from httpx import AsyncClient
+
+from app.db.models import Status
+
+pytestmark = [pytest.mark.asyncio]
+
+
+def event_row(deadline: int = 80) -> dict:
+    return {"odds": "1.5", "deadline": deadline, "status": Status.IN_PROGRESS.value}
+
+
+async def test_bulk_create_json_array(client: AsyncClient) -> None:
+    response = await client.post("/bet_maker/events/bulk", json=[event_row(80), event_row(90)])
+
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["ids"]) == 2
+    assert data["errors"] == []
+
+    events = (await client.get("/bet_maker/events")).json()
+    assert [event["id"] for event in events] == data["ids"]
+    assert [event["deadline"] for event in events] == [80, 90]
+
+
+async def test_bulk_create_reports_invalid_rows(client: AsyncClient) -> None:
+    rows = [event_row(), {"odds": "1.5", "status": "unknown"}, event_row()]
+
+    response = await client.post("/bet_maker/events/bulk", json=rows)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["ids"]) == 2
+    assert [error["index"] for error in data["errors"]] == [1]
+    assert {error["loc"][0] for error in data["errors"][0]["errors"]} == {"deadline", "status"}
+
+
+async def test_bulk_create_ndjson(client: AsyncClient) -> None:
+    body = "\n".join([
+        json.dumps(event_row()), json.dumps({"odds": "1.5"}), "{not json", "", json.dumps(event_row()),
+    ])
+
+    response = await client.post(
+        "/bet_maker/events/bulk",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["ids"]) == 2
+    assert [error["index"] for error in data["errors"]] == [1, 2]
+
+
+@pytest.mark.parametrize("content_type", ["application/x-ndjson", "application/json"])
+async def test_bulk_create_rejects_invalid_utf8(client: AsyncClient, content_type: str) -> None:
+    response = await client.post(
+        "/bet_maker/events/bulk",
+        content=b"\xff\xfe" + json.dumps(event_row()).encode(),
+        headers={"Content-Type": content_type},
+    )
+
+    assert response.status_code == 400
+
+
+async def test_bulk_create_rejects_non_array(client: AsyncClient) -> None:
+    response = await client.post("/bet_maker/events/bulk", json=event_row())
+
+    assert response.status_code == 400
@@ -1,11 +1,14 @@
+import json
 from decimal import Decimal
 from unittest.mock import AsyncMock, patch
 
 import pytest
 from httpx import AsyncClient
 from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
 
 from app.db.models import EventsModel, Status
+from app.db.replicas import read_replicas
 from app.db.schemas import Events
 from app.main import app
 from app.rabbit.rabbit import RabbitMQSessionManager
@@ -28,6 +31,42 @@ async def test_get_events_with_data(client: AsyncClient, event: Events) -> None:
     assert data[0]["odds"] == event.odds
     assert data[0]["status"] == event.status.value
 
+async def test_get_events_keyset_pagination(client: AsyncClient, session) -> None:
+    events = [Events(odds=Decimal("1.5"), deadline=80, status=Status.IN_PROGRESS) for _ in range(5)]
+    session.add_all(events)
+    await session.commit()
+    ids = sorted(event.id for event in events)
+
+    first_page = await client.get("/bet_maker/events", params={"limit": 2})
+    assert [event["id"] for event in first_page.json()] == ids[:2]
+    assert first_page.headers["X-Next-Cursor"] == str(ids[1])
+
+    second_page = await client.get(
+        "/bet_maker/events", params={"limit": 3, "after_id": first_page.headers["X-Next-Cursor"]}
+    )
+    assert [event["id"] for event in second_page.json()] == ids[2:]
+    assert second_page.headers["X-Next-Cursor"] == str(ids[4])
+
+    last_page = await client.get(
+        "/bet_maker/events", params={"limit": 3, "after_id": second_page.headers["X-Next-Cursor"]}
+    )
+    assert last_page.json() == []
+    assert "X-Next-Cursor" not in last_page.headers
+
+
+async def test_get_events_stream(client: AsyncClient, event: Events, test_db_setup) -> None:
+    test_session_maker = async_sessionmaker(test_db_setup, expire_on_commit=False)
+    with patch.object(read_replicas, "primary", test_session_maker):
+        response = await client.get("/bet_maker/events", params={"stream": True})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 1
+    assert lines[0]["id"] == event.id
+    assert lines[0]["status"] == event.status.value
+
 async def test_delete_events(client: AsyncClient, event: Events) -> None:
     response_delete = await client.delete(f"/bet_maker/event/{event.id}")
 
@@ -55,3 +94,20 @@ async def test_update_event_status(rabbit_mock: AsyncMock, client: AsyncClient,
 
 
 
+    rabbit_mock.assert_awaited_once_with(
+        queue_name="event_status_update_queue",
+        message={"event_id": event.id, "new_status": Status.TEAM_ONE_WON.value},
+        wait_for_confirm=True,
+    )
+
+
+@patch("app.rabbit.rabbit.RabbitMQSessionManager.publish_message")
+async def test_update_event_status_fails_when_not_confirmed(
+        rabbit_mock: AsyncMock, client: AsyncClient, event: Events
+) -> None:
+    rabbit_mock.side_effect = RuntimeError("Message was not confirmed")
+    response_update = await client.patch(
+        f"/bet_maker/event/{event.id}/status?new_status={Status.TEAM_ONE_WON.value}"
+    )
+
+    assert response_update.status_code == 500
@@ -0,0 +1,31 @@
+import pytest
+from httpx import AsyncClient
+from prometheus_client import REGISTRY
+
+from app.db.schemas import Events
+
+pytestmark = [pytest.mark.asyncio]
+
+
+def request_count(method: str, route: str, status: str) -> float:
+    labels = {"method": method, "route": route, "status": status}
+    return REGISTRY.get_sample_value("http_request_duration_seconds_count", labels) or 0.0
+
+
+async def test_request_latency_labelled_by_route_template(client: AsyncClient, event: Events) -> None:
+    before = request_count("DELETE", "/bet_maker/event/{event_id}", "404")
+
+    await client.delete(f"/bet_maker/event/{event.id + 1}")
+    await client.delete(f"/bet_maker/event/{event.id + 2}")
+
+    assert request_count("DELETE", "/bet_maker/event/{event_id}", "404") == before + 2
+
+
+async def test_metrics_endpoint(client: AsyncClient) -> None:
+    await client.get("/bet_maker/events")
+
+    response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_count{method="GET",route="/bet_maker/events",status="200"}' in response.text
@@ -0,0 +1,72 @@
+from decimal import Decimal
+
+import pytest
+
+from app.rabbit.codecs import (
+    GZIP_ENCODING,
+    CompressionStats,
+    JsonCodec,
+    MsgpackCodec,
+    compress_body,
+    decode_compressed,
+    get_codec,
+    odds_to_wire,
+)
+
+
+@pytest.mark.parametrize("content_type", [None, "application/json", "application/msgpack"])
+def test_codec_round_trip(content_type: str | None) -> None:
+    message = {"type": "delta", "events": [{"id": 1, "odds": 15000, "status": "незавершённое"}], "deleted": []}
+    codec = get_codec(content_type)
+
+    assert codec.decode(codec.encode(message)) == message
+
+
+def test_codec_selected_by_content_type() -> None:
+    assert get_codec(None) is JsonCodec
+    assert get_codec("application/msgpack") is MsgpackCodec
+    with pytest.raises(ValueError):
+        get_codec("text/xml")
+
+
+def test_odds_to_wire() -> None:
+    assert odds_to_wire(Decimal("1.5")) == 15000
+    assert odds_to_wire(Decimal("2.00005")) == 20001
+
+
+@pytest.mark.parametrize("content_type", ["application/json", "application/msgpack"])
+def test_compressed_message_round_trip(content_type: str) -> None:
+    message = {"type": "snapshot", "events": [{"id": event_id, "odds": 15000} for event_id in range(20000)]}
+    body = get_codec(content_type).encode(message)
+
+    compressed, _ = compress_body(body, level=6)
+    data, raw_size, _ = decode_compressed(compressed, content_type, GZIP_ENCODING, max_size=len(body))
+
+    assert len(compressed) < len(body)
+    assert data == message
+    assert raw_size == len(body)
+
+
+def test_unknown_or_broken_encoding_rejected() -> None:
+    with pytest.raises(ValueError):
+        decode_compressed(b"data", "application/json", "br", max_size=1024)
+    with pytest.raises(ValueError):
+        decode_compressed(b"not gzip", "application/msgpack", GZIP_ENCODING, max_size=1024)
+
+
+@pytest.mark.parametrize("content_type", ["application/json", "application/msgpack"])
+def test_oversized_message_rejected(content_type: str) -> None:
+    body = get_codec(content_type).encode({"events": [{"id": event_id} for event_id in range(50000)]})
+    compressed, _ = compress_body(body, level=6)
+
+    with pytest.raises(ValueError):
+        decode_compressed(compressed, content_type, GZIP_ENCODING, max_size=len(body) - 1)
+
+
+def test_compression_stats_ratio() -> None:
+    stats = CompressionStats()
+    stats.record(raw_size=1000, compressed_size=100, cpu_seconds=0.01)
+    stats.record(raw_size=3000, compressed_size=300, cpu_seconds=0.02)
+
+    assert stats.messages == 2
+    assert stats.ratio == 10
@@ -0,0 +1,108 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from httpx import AsyncClient
+
+from app.db.leader import leader_election
+from app.db.models import Status
+from app.rabbit.deadlines import DeadlineScheduler
+
+pytestmark = [pytest.mark.asyncio]
+
+
+def open_event(event_id: int, deadline: int) -> dict:
+    return {"id": event_id, "deadline": deadline, "status": Status.IN_PROGRESS.value}
+
+
+async def test_pop_due_in_deadline_order() -> None:
+    now = int(time.time())
+    scheduler = DeadlineScheduler()
+    scheduler.track([open_event(1, now + 30), open_event(2, now + 10), open_event(3, now + 20)])
+
+    assert scheduler.pop_due(now + 20) == [{"id": 2, "deadline": now + 10}, {"id": 3, "deadline": now + 20}]
+    assert scheduler.next_deadline() == now + 30
+    assert len(scheduler) == 1
+
+
+async def test_rescheduled_and_cancelled_events_do_not_fire() -> None:
+    now = int(time.time())
+    scheduler = DeadlineScheduler()
+    scheduler.track([open_event(1, now + 10), open_event(2, now + 10), open_event(3, now + 10)])
+
+    scheduler.schedule(1, now + 100)
+    scheduler.cancel(2)
+    scheduler.track([{"id": 3, "deadline": now + 10, "status": Status.TEAM_ONE_WON.value}])
+
+    assert scheduler.pop_due(now + 50) == []
+    assert scheduler.pop_due(now + 100) == [{"id": 1, "deadline": now + 100}]
+
+
+async def test_passed_deadlines_are_not_scheduled() -> None:
+    scheduler = DeadlineScheduler()
+    scheduler.replace([open_event(1, 80)])
+
+    assert scheduler.next_deadline() is None
+
+
+@patch("app.rabbit.rabbit.RabbitMQSessionManager.publish_message")
+async def test_close_published_at_deadline(rabbit_mock: AsyncMock) -> None:
+    deadline = 1_800_000_000
+    published = asyncio.Event()
+    rabbit_mock.side_effect = lambda **kwargs: published.set()
+    scheduler = DeadlineScheduler()
+    # Часы планировщика стоят на дедлайне: ждать его в реальном времени не нужно
+    with patch("app.rabbit.deadlines.time", MagicMock(time=MagicMock(return_value=deadline))):
+        task = asyncio.create_task(scheduler.run())
+        scheduler.replace([])
+        scheduler.schedule(7, deadline)
+        await asyncio.wait_for(published.wait(), 1)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    rabbit_mock.assert_awaited_once_with(
+        queue_name="events_queue",
+        message={"type": "close", "events": [{"id": 7, "deadline": deadline}]},
+    )
+
+
+@patch("app.rabbit.rabbit.RabbitMQSessionManager.publish_message")
+async def test_run_waits_for_snapshot_and_clears_on_stop(rabbit_mock: AsyncMock) -> None:
+    scheduler = DeadlineScheduler()
+    scheduler.schedule(7, 1)
+    task = asyncio.create_task(scheduler.run())
+    await asyncio.sleep(0.05)
+
+    rabbit_mock.assert_not_awaited()
+
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    assert len(scheduler) == 0
+    assert scheduler.next_deadline() is None
+
+
+@patch.object(leader_election, "is_leader", True)
+@patch("app.api.handlers_line_provider.deadline_scheduler", new_callable=DeadlineScheduler)
+async def test_created_event_is_scheduled(deadline_scheduler: DeadlineScheduler, client: AsyncClient) -> None:
+    deadline = int(time.time()) + 3600
+    response = await client.post(
+        "/bet_maker/event",
+        params={"odds": "1.5", "deadline": deadline, "status": Status.IN_PROGRESS.value},
+    )
+    event_id = response.json()["id"]
+
+    assert deadline_scheduler.pop_due(deadline) == [{"id": event_id, "deadline": deadline}]
+
+
+@patch.object(leader_election, "is_leader", False)
+@patch("app.api.handlers_line_provider.deadline_scheduler", new_callable=DeadlineScheduler)
+async def test_standby_does_not_schedule(deadline_scheduler: DeadlineScheduler, client: AsyncClient) -> None:
+    deadline = int(time.time()) + 3600
+    await client.post(
+        "/bet_maker/event",
+        params={"odds": "1.5", "deadline": deadline, "status": Status.IN_PROGRESS.value},
+    )
+
+    assert len(deadline_scheduler) == 0
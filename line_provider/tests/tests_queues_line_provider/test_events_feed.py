@@ -0,0 +1,106 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import insert
+
+from app.db.models import Status
+from app.db.schemas import Events
+from app.rabbit.queues import build_delta, build_snapshot, committed_revision
+
+pytestmark = [pytest.mark.asyncio]
+
+
+async def create_event(client: AsyncClient, deadline: int = 80) -> dict:
+    response = await client.post(
+        "/bet_maker/event",
+        params={"odds": "1.5", "deadline": deadline, "status": Status.IN_PROGRESS.value},
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+async def snapshot_of(session) -> dict:
+    revision, _ = await committed_revision(session)
+    return await build_snapshot(session, revision)
+
+
+async def delta_since(session, from_revision: int) -> dict | None:
+    revision, _ = await committed_revision(session)
+    return await build_delta(session, from_revision, revision)
+
+
+async def test_delta_empty_without_changes(client: AsyncClient, session) -> None:
+    await create_event(client)
+    snapshot = await snapshot_of(session)
+
+    assert await delta_since(session, snapshot["revision"]) is None
+
+
+async def test_snapshot_contains_all_events(client: AsyncClient, session) -> None:
+    first = await create_event(client)
+    second = await create_event(client)
+
+    snapshot = await snapshot_of(session)
+
+    assert snapshot["type"] == "snapshot"
+    assert {event["id"] for event in snapshot["events"]} == {first["id"], second["id"]}
+    assert snapshot["revision"] == second["revision"]
+
+
+async def test_delta_contains_only_changed_events(client: AsyncClient, session) -> None:
+    first = await create_event(client)
+    snapshot = await snapshot_of(session)
+    second = await create_event(client)
+
+    delta = await delta_since(session, snapshot["revision"])
+
+    assert delta["from_revision"] == snapshot["revision"]
+    assert delta["revision"] == second["revision"]
+    assert [event["id"] for event in delta["events"]] == [second["id"]]
+    assert delta["deleted"] == []
+    assert first["id"] not in [event["id"] for event in delta["events"]]
+
+
+@patch("app.rabbit.rabbit.RabbitMQSessionManager.publish_message")
+async def test_delta_tracks_status_updates_and_deletes(
+        rabbit_mock: AsyncMock, client: AsyncClient, session
+) -> None:
+    rabbit_mock.return_value = None
+    updated = await create_event(client)
+    deleted = await create_event(client)
+    snapshot = await snapshot_of(session)
+
+    await client.patch(f"/bet_maker/event/{updated['id']}/status?new_status={Status.TEAM_ONE_WON.value}")
+    await client.delete(f"/bet_maker/event/{deleted['id']}")
+    delta = await delta_since(session, snapshot["revision"])
+
+    assert [event["id"] for event in delta["events"]] == [updated["id"]]
+    assert delta["events"][0]["status"] == Status.TEAM_ONE_WON.value
+    assert delta["deleted"] == [deleted["id"]]
+    assert delta["revision"] > snapshot["revision"]
+
+
+async def test_revision_waits_for_uncommitted_writes(client: AsyncClient, session, test_db_setup) -> None:
+    snapshot = await snapshot_of(session)
+
+    async with test_db_setup.connect() as writer:
+        transaction = await writer.begin()
+        pending = (await writer.execute(
+            insert(Events)
+            .values(odds=1.5, deadline=80, status=Status.IN_PROGRESS)
+            .returning(Events.id, Events.revision)
+        )).one()
+        later = await create_event(client)
+
+        horizon = asyncio.create_task(delta_since(session, snapshot["revision"]))
+        await asyncio.sleep(0.2)
+        assert not horizon.done()
+
+        await transaction.commit()
+        delta = await asyncio.wait_for(horizon, 5)
+
+    assert later["revision"] > pending.revision
+    assert delta["revision"] == later["revision"]
+    assert [event["id"] for event in delta["events"]] == [pending.id, later["id"]]
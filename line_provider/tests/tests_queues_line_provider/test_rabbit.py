@@ -0,0 +1,57 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from aio_pika.pool import Pool
+
+from app.rabbit.rabbit import RabbitMQSessionManager
+
+pytestmark = [pytest.mark.asyncio]
+
+
+async def test_concurrent_connect_opens_one_connection() -> None:
+    manager = RabbitMQSessionManager()
+
+    async def connect_robust(url: str) -> MagicMock:
+        await asyncio.sleep(0.01)
+        return MagicMock(is_closed=False)
+
+    with patch("app.rabbit.rabbit.aio_pika.connect_robust", AsyncMock(side_effect=connect_robust)) as connect_mock:
+        await asyncio.gather(*(manager.connect() for _ in range(5)))
+        pool = manager._channel_pool
+        await manager.connect()
+
+    connect_mock.assert_awaited_once()
+    assert manager._channel_pool is pool
+
+
+async def test_channel_is_held_until_publish_is_confirmed() -> None:
+    manager = RabbitMQSessionManager(channel_pool_size=1)
+    confirms: list[asyncio.Future] = []
+
+    async def publish(message, routing_key: str) -> None:
+        confirms.append(asyncio.get_running_loop().create_future())
+        await confirms[-1]
+
+    channel = MagicMock()
+    channel.default_exchange.publish = AsyncMock(side_effect=publish)
+    manager._connection = MagicMock(is_closed=False)
+    manager._channel_pool = Pool(AsyncMock(return_value=channel), max_size=1)
+    manager._declared_queues.add("bets")
+
+    await manager.publish_message("bets", {"event_id": 1})
+    second = asyncio.create_task(manager.publish_message("bets", {"event_id": 2}))
+    await asyncio.sleep(0.01)
+
+    # Единственный канал занят первой публикацией, пока брокер её не подтвердил
+    assert len(confirms) == 1
+    assert not second.done()
+
+    confirms[0].set_result(None)
+    await second
+    await asyncio.sleep(0)
+    assert len(confirms) == 2
+
+    confirms[1].set_result(None)
+    await manager.wait_for_confirms()
+    assert not manager._pending_confirms